@@ -0,0 +1,117 @@
+"""
+JWT authentication with the user resolved from a cache instead of the DB.
+
+Users are looked up in a small per-process LRU, then Redis, then a single
+query that also fetches the doctor/patient profile id. The resulting
+``User`` carries ``profile_id`` so role-scoped querysets need no extra
+lookup. Redis entries are dropped whenever the user or their profile is
+saved (see signals.py); the per-process LRU is only trusted for
+``AUTH_LOCAL_CACHE_TTL`` seconds because other workers cannot clear it.
+
+The password hash is never cached, so these users must not be saved --
+views that update the user reload it first.
+"""
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from .models import User
+
+CACHE_TIMEOUT = getattr(settings, 'AUTH_USER_CACHE_TIMEOUT', 60 * 15)
+LOCAL_CACHE_TTL = getattr(settings, 'AUTH_LOCAL_CACHE_TTL', 30)
+LOCAL_CACHE_SIZE = 1024
+
+USER_FIELDS = tuple(f.attname for f in User._meta.concrete_fields if f.attname != 'password')
+
+class LocalLRU:
+    """Thread-safe LRU whose entries expire after ``ttl`` seconds."""
+    def __init__(self, maxsize, ttl):
+        self.maxsize, self.ttl = maxsize, ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+_local = LocalLRU(LOCAL_CACHE_SIZE, LOCAL_CACHE_TTL)
+
+def _key(user_id):
+    return f'auth_user:{user_id}'
+
+def _from_db(user_id):
+    row = User.objects.filter(pk=user_id).values(
+        *USER_FIELDS, 'doctor_profile__id', 'patient_profile__id').first()
+    if row is None:
+        return None
+    doctor_id, patient_id = row.pop('doctor_profile__id'), row.pop('patient_profile__id')
+    row['profile_id'] = {User.Role.DOCTOR: doctor_id, User.Role.PATIENT: patient_id}.get(row['role'])
+    return row
+
+def load_user_data(user_id):
+    """Cached field values of a user plus ``profile_id``, or None if the user doesn't exist."""
+    user_id = str(user_id)  # tokens carry the id as a string, signals as an int
+    data = _local.get(user_id)
+    if data is None:
+        data = cache.get(_key(user_id))
+        if data is None:
+            data = _from_db(user_id)
+            if data is None:
+                return None
+            cache.set(_key(user_id), data, CACHE_TIMEOUT)
+        _local.set(user_id, data)
+    return data
+
+def build_user(data):
+    data = dict(data)
+    profile_id = data.pop('profile_id')
+    user = User(**data)
+    user._state.adding = False
+    user._state.db = 'default'
+    user.__dict__['profile_id'] = profile_id  # pre-fills the cached_property
+    return user
+
+def invalidate_user(user_id):
+    user_id = str(user_id)
+    _local.pop(user_id)
+    cache.delete(_key(user_id))
+
+class CachedJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        if api_settings.CHECK_REVOKE_TOKEN:
+            # revocation compares the password hash, which is deliberately not cached
+            return super().get_user(validated_token)
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+
+        data = load_user_data(user_id)
+        if data is None:
+            raise AuthenticationFailed(_('User not found'), code='user_not_found')
+        if api_settings.CHECK_USER_IS_ACTIVE and not data['is_active']:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+        return build_user(data)
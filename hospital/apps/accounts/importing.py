@@ -0,0 +1,264 @@
+"""
+CSV onboarding of doctors and patients.
+
+``import_users`` reads the CSV lazily and handles it ``batch_size`` rows at a
+time. Each row is validated on its own: a bad row is reported with its line
+number and skipped while the rest of its batch is still imported. Usernames
+and license numbers are checked against the file and, once per batch, the
+database. Initial passwords are hashed on a process pool (rows without one
+get an unusable password), then the users and their profiles are written with
+``core.bulk.insert``, i.e. COPY on PostgreSQL, so the per-user post_save
+receivers never run; ``users_bulk_created`` keeps the dashboard counters and the
+available-doctors cache in step.
+"""
+import csv
+import io
+import multiprocessing
+import os
+import secrets
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import closing
+from itertools import islice
+from django.conf import settings
+from django.contrib.auth.hashers import UNUSABLE_PASSWORD_PREFIX, make_password
+from django.contrib.auth.password_validation import validate_password
+from django.contrib.auth.validators import UnicodeUsernameValidator
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from redis.exceptions import RedisError
+from rest_framework import serializers
+from hospital.apps.core.bulk import insert
+from hospital.apps.core.jobs import RESULT_TTL, job
+from hospital.apps.core.redis import get_redis
+from hospital.apps.doctors.models import Doctor
+from hospital.apps.patients.models import Patient
+from .models import User
+from .signals import users_bulk_created
+
+BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+# larger uploads are imported by a worker; hashing a few thousand passwords outlasts any request timeout
+INLINE_MAX_BYTES = getattr(settings, 'USER_IMPORT_INLINE_MAX_BYTES', 2048)
+UPLOAD_KEY = 'imports:upload:{}'
+
+REQUIRED_COLUMNS = ('username', 'role')
+USER_FIELDS = ('username', 'email', 'first_name', 'last_name', 'role', 'phone')
+PATIENT_FIELDS = ('date_of_birth', 'blood_group', 'address', 'emergency_contact', 'medical_history')
+
+class ImportRowSerializer(serializers.Serializer):
+    """One CSV row; empty cells count as absent, so every column but username and role is optional."""
+    username = serializers.CharField(max_length=150, validators=[UnicodeUsernameValidator()])
+    email = serializers.EmailField(max_length=254, required=False)
+    first_name = serializers.CharField(max_length=150, required=False)
+    last_name = serializers.CharField(max_length=150, required=False)
+    role = serializers.ChoiceField(choices=[User.Role.DOCTOR, User.Role.PATIENT])
+    phone = serializers.CharField(max_length=15, required=False)
+    password = serializers.CharField(required=False, trim_whitespace=False)
+    specialization = serializers.ChoiceField(choices=Doctor.Specialization.choices, required=False)
+    license_number = serializers.CharField(max_length=50, required=False)
+    experience_years = serializers.IntegerField(min_value=0, required=False)
+    consultation_fee = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0, required=False)
+    date_of_birth = serializers.DateField(required=False)
+    blood_group = serializers.ChoiceField(choices=Patient.BloodGroup.choices, required=False)
+    address = serializers.CharField(required=False)
+    emergency_contact = serializers.CharField(max_length=15, required=False)
+    medical_history = serializers.CharField(required=False)
+
+    def validate(self, attrs):
+        if 'password' in attrs:
+            user = User(**{name: attrs[name] for name in USER_FIELDS if name in attrs})
+            try:
+                validate_password(attrs['password'], user)
+            except ValidationError as e:
+                raise serializers.ValidationError({'password': list(e.messages)})
+        return attrs
+
+def _clean(row):
+    return {name: value if name == 'password' else value.strip()
+            for name, value in row.items()
+            if name in ImportRowSerializer._declared_fields and isinstance(value, str) and value.strip()}
+
+def _unusable_password():
+    # what make_password(None) returns, without drawing each random character separately
+    return UNUSABLE_PASSWORD_PREFIX + secrets.token_urlsafe(30)
+
+class PasswordHashers:
+    """``make_password`` on up to ``workers`` processes, started the first time a batch needs them."""
+    def __init__(self, workers=None):
+        self.workers = workers or getattr(settings, 'USER_IMPORT_HASH_WORKERS', 0) or os.cpu_count() or 1
+        self.pool = None
+
+    def hash(self, passwords):
+        """Hashes of ``passwords`` in order; None gets an unusable password."""
+        given = [password for password in passwords if password is not None]
+        if self.workers > 1 and len(given) > 1:
+            if self.pool is None:
+                # spawn, not fork: the caller may be a threaded server process
+                self.pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+            hashed = self.pool.map(make_password, given, chunksize=max(1, len(given) // (self.workers * 4)))
+        else:
+            hashed = map(make_password, given)
+        hashed = iter(hashed)
+        return [_unusable_password() if password is None else next(hashed) for password in passwords]
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+
+def _fail(report, line, username, errors):
+    report['failed'] += 1
+    if len(report['errors']) < MAX_REPORTED_ERRORS:
+        report['errors'].append({'line': line, 'username': username, 'errors': errors})
+
+def _rows(reader, report):
+    """(line, row) pairs; a row csv cannot parse or decode ends the import with an error at its line."""
+    try:
+        for row in reader:
+            yield reader.line_num, row
+    except (csv.Error, UnicodeDecodeError) as e:
+        _fail(report, reader.line_num + 1, None, {'non_field_errors': [f'Unreadable CSV: {e}']})
+
+def import_users(file, batch_size=BATCH_SIZE, workers=None, dry_run=False):
+    """
+    Create the doctors and patients listed in the CSV text stream ``file``;
+    returns counts and the first ``MAX_REPORTED_ERRORS`` row errors. Each
+    batch commits on its own. Raises ValueError if the header is unusable.
+    """
+    reader = csv.DictReader(file)
+    try:
+        columns = reader.fieldnames or ()
+    except (csv.Error, UnicodeDecodeError) as e:
+        raise ValueError(f'Unreadable CSV: {e}')
+    missing = [name for name in REQUIRED_COLUMNS if name not in columns]
+    if missing:
+        raise ValueError(f"CSV header lacks column(s): {', '.join(missing)}.")
+
+    report = {'rows': 0, 'created': 0, 'doctors': 0, 'patients': 0, 'failed': 0, 'errors': [], 'dry_run': dry_run}
+    seen = {'username': {}, 'license_number': {}}  # value -> line it was first accepted on
+    rows = _rows(reader, report)
+    with closing(PasswordHashers(workers)) as hashers:
+        while batch := list(islice(rows, batch_size)):
+            report['rows'] += len(batch)
+            valid = _validate(batch, seen, report)
+            if not valid:
+                continue
+            if not dry_run:
+                passwords = hashers.hash([attrs.get('password') for _, attrs in valid])
+                valid = [(None, {'role': user.role}) for user in _load(valid, passwords, report)]
+            for _, attrs in valid:
+                report[f"{attrs['role']}s"] += 1
+            report['created'] += len(valid)
+    report['errors'].sort(key=lambda error: error['line'])
+    return report
+
+def _validate(batch, seen, report):
+    # reused like a ListSerializer's child: building the fields per row costs more than validating
+    serializer = ImportRowSerializer()
+    checked = []
+    for line, row in batch:
+        try:
+            checked.append((line, serializer.run_validation(_clean(row))))
+        except serializers.ValidationError as e:
+            _fail(report, line, row.get('username'), serializers.as_serializer_error(e))
+    taken = _taken([attrs for _, attrs in checked])
+    valid = []
+    for line, attrs in checked:
+        errors = {}
+        for name, values in seen.items():
+            value = attrs.get(name)
+            if value in values:
+                errors[name] = [f'Already used on line {values[value]}.']
+            elif value in taken[name]:
+                errors[name] = [f'A record with this {name.replace("_", " ")} already exists.']
+        if errors:
+            _fail(report, line, attrs['username'], errors)
+            continue
+        for name, values in seen.items():
+            if name in attrs:
+                values[attrs[name]] = line
+        valid.append((line, attrs))
+    return valid
+
+def _taken(rows):
+    """Usernames and license numbers of ``rows`` that are already in the database."""
+    usernames = [attrs['username'] for attrs in rows]
+    licenses = [attrs['license_number'] for attrs in rows if 'license_number' in attrs]
+    return {
+        'username': set(User.objects.filter(username__in=usernames).values_list('username', flat=True)),
+        'license_number': set(Doctor.objects.filter(license_number__in=licenses)
+                              .values_list('license_number', flat=True)) if licenses else set(),
+    }
+
+def _load(valid, passwords, report):
+    """Insert one batch's users and profiles; returns the users, with ids, that were created."""
+    hashed = {attrs['username']: password for (_, attrs), password in zip(valid, passwords)}
+    # Retry once without the rows a concurrent registration took between the check and the insert.
+    for attempt in range(2):
+        try:
+            with transaction.atomic():
+                users = _insert(valid, hashed)
+            break
+        except IntegrityError as e:
+            if attempt:
+                for line, attrs in valid:
+                    _fail(report, line, attrs['username'], {'non_field_errors': [f'Could not be saved: {e}']})
+                return []
+            taken = _taken([attrs for _, attrs in valid])
+            retry = []
+            for line, attrs in valid:
+                errors = {name: [f'A record with this {name.replace("_", " ")} already exists.']
+                          for name, values in taken.items() if attrs.get(name) in values}
+                if errors:
+                    _fail(report, line, attrs['username'], errors)
+                else:
+                    retry.append((line, attrs))
+            valid = retry
+    users_bulk_created.send(sender=User, instances=users)
+    return users
+
+def _insert(valid, hashed):
+    users = [User(password=hashed[attrs['username']], **{name: attrs[name] for name in USER_FIELDS if name in attrs})
+             for _, attrs in valid]
+    insert(User, users, BATCH_SIZE)
+    ids = dict(User.objects.filter(username__in=[user.username for user in users]).values_list('username', 'id'))
+    for user in users:
+        user.pk = ids[user.username]
+    doctors, patients = [], []
+    for user, (_, attrs) in zip(users, valid):
+        if user.role == User.Role.DOCTOR:
+            doctors.append(Doctor(
+                user_id=user.pk,
+                specialization=attrs.get('specialization', Doctor.Specialization.GENERAL),
+                # same default as the post_save receiver that creates profiles on registration
+                license_number=attrs.get('license_number', f'LIC-{user.pk:06d}'),
+                **{name: attrs[name] for name in ('experience_years', 'consultation_fee') if name in attrs}))
+        else:
+            patients.append(Patient(user_id=user.pk, **{name: attrs[name] for name in PATIENT_FIELDS if name in attrs}))
+    insert(Doctor, doctors, BATCH_SIZE)
+    insert(Patient, patients, BATCH_SIZE)
+    return users
+
+def stash_upload(upload):
+    """Keep an uploaded CSV in Redis for ``import_upload``; returns its id, or None when Redis is unavailable."""
+    client = get_redis()
+    if client is None:
+        return None
+    upload_id = uuid.uuid4().hex
+    try:
+        client.set(UPLOAD_KEY.format(upload_id), upload.read(), ex=RESULT_TTL)
+    except RedisError:
+        upload.seek(0)
+        return None
+    return upload_id
+
+@job(retries=0)
+def import_upload(upload_id, dry_run=False):
+    """Background ``import_users`` of a stashed upload, which is deleted on read (it holds passwords)."""
+    with get_redis().pipeline() as pipe:
+        pipe.get(UPLOAD_KEY.format(upload_id))
+        pipe.delete(UPLOAD_KEY.format(upload_id))
+        data, _ = pipe.execute()
+    if data is None:
+        raise ValueError('The uploaded CSV has expired.')
+    return import_users(io.StringIO(data.decode('utf-8-sig'), newline=''), dry_run=dry_run)
@@ -0,0 +1,46 @@
+import json
+import sys
+import time
+from django.core.management.base import BaseCommand, CommandError
+from hospital.apps.accounts.importing import BATCH_SIZE, import_users
+
+class Command(BaseCommand):
+    help = ('Create doctors and patients from a CSV (username and role columns, optional email, names, phone, '
+            'password and profile fields); bad rows are reported and skipped')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV file, or '-' for stdin")
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                            help='Rows validated and inserted per transaction')
+        parser.add_argument('--workers', type=int, help='Password hashing processes (default USER_IMPORT_HASH_WORKERS)')
+        parser.add_argument('--dry-run', action='store_true', help='Only validate; nothing is written')
+        parser.add_argument('--report', help='Write the JSON report, with every reported row error, here')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            if options['path'] == '-':
+                sys.stdin.reconfigure(encoding='utf-8-sig', newline='')
+                report = self._import(sys.stdin, options)
+            else:
+                with open(options['path'], encoding='utf-8-sig', newline='') as file:
+                    report = self._import(file, options)
+        except (OSError, ValueError) as e:
+            raise CommandError(e)
+
+        for error in report['errors'][:20]:
+            messages = '; '.join(f'{field}: {" ".join(map(str, errors))}' for field, errors in error['errors'].items())
+            self.stderr.write(f"Line {error['line']} ({error['username'] or '?'}): {messages}")
+        if report['failed'] > 20:
+            self.stderr.write(f"... and {report['failed'] - 20} more rows with errors.")
+        if options['report']:
+            with open(options['report'], 'w') as output:
+                json.dump(report, output, indent=2)
+        verb = 'Would create' if options['dry_run'] else 'Created'
+        self.stdout.write(f"{verb} {report['created']} of {report['rows']} users ({report['doctors']} doctors, "
+                          f"{report['patients']} patients); {report['failed']} rows failed. "
+                          f"{time.perf_counter() - started:.1f}s")
+
+    def _import(self, file, options):
+        return import_users(file, batch_size=options['batch_size'], workers=options['workers'],
+                            dry_run=options['dry_run'])
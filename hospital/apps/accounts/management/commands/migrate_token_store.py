@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from hospital.apps.accounts.tokens import BLACKLIST_KEY, OUTSTANDING_KEY, _use_redis, store
+
+class Command(BaseCommand):
+    help = ('Copy unexpired blacklisted refresh tokens into Redis and delete expired token rows '
+            '(JWT_TOKEN_STORE=redis only)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--outstanding', action='store_true',
+                            help='Also copy unexpired outstanding tokens')
+        parser.add_argument('--purge', action='store_true',
+                            help='Also delete the copied rows; only once Redis persists its data')
+
+    def handle(self, *args, **options):
+        if not _use_redis():
+            # with the db store the tables are the blacklist: purging them would revive revoked tokens
+            raise CommandError('JWT_TOKEN_STORE is not redis; the token tables are still in use.')
+        now = timezone.now()
+        blacklisted = BlacklistedToken.objects.filter(token__expires_at__gt=now) \
+            .values_list('token__jti', 'token__expires_at')
+        copied = self._copy(BLACKLIST_KEY, ((jti, 1, exp) for jti, exp in blacklisted.iterator()))
+        self.stdout.write(f'Copied {copied} blacklisted tokens to Redis.')
+        if options['outstanding']:
+            outstanding = OutstandingToken.objects.filter(expires_at__gt=now) \
+                .values_list('jti', 'user_id', 'expires_at')
+            copied = self._copy(OUTSTANDING_KEY, ((jti, user_id or '', exp)
+                                                   for jti, user_id, exp in outstanding.iterator()))
+            self.stdout.write(f'Copied {copied} outstanding tokens to Redis.')
+
+        rows = OutstandingToken.objects.all() if options['purge'] \
+            else OutstandingToken.objects.filter(expires_at__lte=now)
+        # BlacklistedToken rows cascade with their OutstandingToken
+        deleted, _ = rows.delete()
+        self.stdout.write(f'Deleted {deleted} token rows.')
+
+    def _copy(self, key_template, entries):
+        copied = 0
+        for jti, value, expires_at in entries:
+            if not store(key_template, jti, value, expires_at.timestamp()):
+                raise CommandError('Redis is unavailable; nothing was purged.')
+            copied += 1
+        return copied
@@ -1,5 +1,6 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.utils.functional import cached_property
 
 class User(AbstractUser):
     class Role(models.TextChoices):
@@ -9,6 +10,7 @@ class User(AbstractUser):
 
     role = models.CharField(max_length=10, choices=Role.choices, default=Role.PATIENT)
     phone = models.CharField(max_length=15, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def is_admin(self):
         return self.role == self.Role.ADMIN
@@ -19,5 +21,14 @@ class User(AbstractUser):
     def is_patient(self):
         return self.role == self.Role.PATIENT
 
+    @cached_property
+    def profile_id(self):
+        """Id of the doctor/patient profile (None for admins); preset by CachedJWTAuthentication."""
+        accessor = {self.Role.DOCTOR: 'doctor_profile', self.Role.PATIENT: 'patient_profile'}.get(self.role)
+        if accessor is None:
+            return None
+        profile_model = self._meta.get_field(accessor).related_model
+        return profile_model.objects.filter(user_id=self.pk).values_list('id', flat=True).first()
+
     def __str__(self):
         return f"{self.username} ({self.role})"
\ No newline at end of file
@@ -1,6 +1,8 @@
 from rest_framework import serializers
 from django.contrib.auth.password_validation import validate_password
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
 from .models import User
+from .tokens import RefreshToken
 
 class RegisterSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, validators=[validate_password])
@@ -33,4 +35,10 @@ class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ('id', 'username', 'email', 'first_name', 'last_name', 'role', 'phone')
-        read_only_fields = ('id',)
\ No newline at end of file
+        read_only_fields = ('id',)
+
+class LoginSerializer(TokenObtainPairSerializer):
+    token_class = RefreshToken
+
+class RefreshSerializer(TokenRefreshSerializer):
+    token_class = RefreshToken
@@ -1,8 +1,13 @@
-from django.db.models.signals import post_save
-from django.dispatch import receiver
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver, Signal
 from .models import User
 from hospital.apps.doctors.models import Doctor
 from hospital.apps.patients.models import Patient
+from .authentication import invalidate_user
+
+# bulk imports skip post_save (and the profile receiver below); sent with ``instances``
+users_bulk_created = Signal()
 
 @receiver(post_save, sender=User)
 def create_user_profile(sender, instance, created, **kwargs):
@@ -14,4 +19,19 @@ def create_user_profile(sender, instance, created, **kwargs):
                 license_number=f'LIC-{instance.id:06d}',
             )
         elif instance.role == User.Role.PATIENT:
-            Patient.objects.create(user=instance)
\ No newline at end of file
+            Patient.objects.create(user=instance)
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    # on commit, or a concurrent request could re-cache the old row until the cache timeout
+    user_id = instance.pk
+    transaction.on_commit(lambda: invalidate_user(user_id))
+
+@receiver(post_save, sender=Doctor)
+@receiver(post_delete, sender=Doctor)
+@receiver(post_save, sender=Patient)
+@receiver(post_delete, sender=Patient)
+def invalidate_cached_profile(sender, instance, **kwargs):
+    user_id = instance.user_id
+    transaction.on_commit(lambda: invalidate_user(user_id))
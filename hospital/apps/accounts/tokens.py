@@ -0,0 +1,76 @@
+"""
+Refresh tokens whose outstanding/blacklisted JTIs live in Redis.
+
+With ``JWT_TOKEN_STORE = 'redis'`` each JTI is stored under a key that
+expires with the token itself, so nothing accumulates and refresh/logout
+write no rows. Whenever Redis is unreachable the simplejwt
+OutstandingToken/BlacklistedToken tables are used instead, and blacklist
+checks consult them too.
+"""
+import time
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from redis.exceptions import RedisError
+from rest_framework_simplejwt import tokens
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+from hospital.apps.core.redis import get_redis
+
+OUTSTANDING_KEY = 'jwt:outstanding:{}'
+BLACKLIST_KEY = 'jwt:blacklist:{}'
+
+def _use_redis():
+    return getattr(settings, 'JWT_TOKEN_STORE', 'redis') == 'redis'
+
+def _ttl(exp):
+    return max(1, int(exp - time.time()))
+
+def store(key_template, jti, value, exp):
+    """SET the JTI with a TTL ending at ``exp``; False if Redis couldn't take it."""
+    client = get_redis()
+    if client is None:
+        return False
+    try:
+        client.set(key_template.format(jti), value, ex=_ttl(exp))
+        return True
+    except RedisError:
+        return False
+
+def is_blacklisted(jti):
+    client = get_redis()
+    if client is not None:
+        try:
+            if client.exists(BLACKLIST_KEY.format(jti)):
+                return True
+        except RedisError:
+            pass
+    # Fallback writes (and rows from before the switch) are only in the DB.
+    return BlacklistedToken.objects.filter(token__jti=jti).exists()
+
+class RefreshToken(tokens.RefreshToken):
+    def check_blacklist(self):
+        if not _use_redis():
+            return super().check_blacklist()
+        if is_blacklisted(self.payload[api_settings.JTI_CLAIM]):
+            raise TokenError(_('Token is blacklisted'))
+
+    def blacklist(self):
+        if _use_redis() and store(BLACKLIST_KEY, self.payload[api_settings.JTI_CLAIM], 1, self.payload['exp']):
+            return None
+        return super().blacklist()
+
+    def outstand(self):
+        if _use_redis() and store(OUTSTANDING_KEY, self.payload[api_settings.JTI_CLAIM],
+                                  self.payload.get(api_settings.USER_ID_CLAIM, ''), self.payload['exp']):
+            return None
+        return super().outstand()
+
+    @classmethod
+    def for_user(cls, user):
+        if not _use_redis():
+            return super().for_user(user)
+        # Skip BlacklistMixin.for_user, which writes an OutstandingToken row.
+        token = super(tokens.BlacklistMixin, cls).for_user(user)
+        token.outstand()
+        return token
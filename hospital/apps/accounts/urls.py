@@ -1,8 +1,9 @@
 from django.urls import path
-from .views import RegisterView, ProfileView, LogoutView
+from .views import RegisterView, ProfileView, LogoutView, ImportUsersView
 
 urlpatterns = [
     path('', RegisterView.as_view(), name='register'),
     path('profile/', ProfileView.as_view(), name='profile'),
     path('logout/', LogoutView.as_view(), name='logout'),
+    path('import/', ImportUsersView.as_view(), name='import-users'),
 ]
\ No newline at end of file
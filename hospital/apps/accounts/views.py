@@ -1,10 +1,13 @@
+import io
 from rest_framework import generics, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.permissions import AllowAny, IsAuthenticated
-from rest_framework_simplejwt.tokens import RefreshToken
+from .importing import INLINE_MAX_BYTES, import_upload, import_users, stash_upload
+from .permissions import IsAdmin
 from .serializers import RegisterSerializer, UserSerializer
 from .models import User
+from .tokens import RefreshToken
 
 class RegisterView(generics.CreateAPIView):
     queryset = User.objects.all()
@@ -16,7 +19,10 @@ class ProfileView(generics.RetrieveUpdateAPIView):
     permission_classes = [IsAuthenticated]
 
     def get_object(self):
-        return self.request.user
+        if self.request.method in ('GET', 'HEAD', 'OPTIONS'):
+            return self.request.user
+        # request.user comes from the auth cache without a password hash; never save it
+        return User.objects.get(pk=self.request.user.pk)
 
 class LogoutView(APIView):
     permission_classes = [IsAuthenticated]
@@ -28,4 +34,33 @@ class LogoutView(APIView):
             token.blacklist()
             return Response({"message": "Logged out successfully."}, status=status.HTTP_200_OK)
         except Exception:
-            return Response({"error": "Invalid token."}, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+            return Response({"error": "Invalid token."}, status=status.HTTP_400_BAD_REQUEST)
+
+class ImportUsersView(APIView):
+    """
+    Create doctors and patients from an uploaded CSV (multipart ``file``); see
+    importing.py for the columns. Dry runs and files of up to
+    ``USER_IMPORT_INLINE_MAX_BYTES`` are imported in the request, anything
+    larger (or with ``background``) on a worker.
+    """
+    permission_classes = [IsAdmin]
+
+    def post(self, request):
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'error': "Upload the CSV as 'file'."}, status=status.HTTP_400_BAD_REQUEST)
+        dry_run = request.data.get('dry_run') in (True, 'true', '1')
+        inline = dry_run or upload.size <= INLINE_MAX_BYTES
+        if not inline or request.data.get('background') in (True, 'true', '1'):
+            upload_id = stash_upload(upload)
+            if upload_id is not None:
+                job_id = import_upload.enqueue(upload_id, dry_run=dry_run)
+                return Response({'job': job_id}, status=status.HTTP_202_ACCEPTED)
+            if not inline:
+                return Response({'error': 'The job queue is unavailable; import large files with '
+                                          'manage.py import_users.'}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        try:
+            report = import_users(io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline=''), dry_run=dry_run)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(report, status=status.HTTP_200_OK if dry_run else status.HTTP_201_CREATED)
@@ -0,0 +1,8 @@
+from django.apps import AppConfig
+
+class AppointmentsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'hospital.apps.appointments'
+
+    def ready(self):
+        import hospital.apps.appointments.signals
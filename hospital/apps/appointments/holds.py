@@ -0,0 +1,152 @@
+"""
+Short-lived slot holds that settle booking races before any DB write.
+
+A hold claims one (doctor, date, time) slot for ``SLOT_HOLD_SECONDS`` with a
+single ``SET NX EX`` on ``holds:<doctor_id>:<date>:<time>`` whose value is
+the holder's user id. Booking, or moving an appointment to a new slot,
+confirms the holder's own hold (or claims the slot on the spot), so when a popular day opens every request but one is
+turned away by one Redis round trip instead of racing to the unique
+constraint. A confirmed hold is left to expire: it keeps rejecting the
+stragglers of the burst as cheaply as it rejected the first ones.
+
+Holds taken ahead of booking through ``hold`` are also listed, with their
+expiry, in the holder's ``holds:user:<user_id>`` sorted set: a user may keep
+``SLOT_HOLD_MAX_PER_USER`` of them at a time and asking again does not
+extend one, so nobody can block a doctor's day by re-holding it. A booked
+hold no longer counts.
+
+Without Redis, ``lock`` takes a transaction-scoped PostgreSQL advisory lock
+on the same slot instead; on other databases the unique constraint is the
+only guard and its IntegrityError becomes a 409 in the view.
+"""
+from time import time as now
+from django.conf import settings
+from django.db import connections, router
+from redis.exceptions import RedisError
+from hospital.apps.core.redis import get_redis
+from .models import Appointment
+
+HOLD_SECONDS = getattr(settings, 'SLOT_HOLD_SECONDS', 120)
+MAX_PER_USER = getattr(settings, 'SLOT_HOLD_MAX_PER_USER', 5)
+OWNER_KEY = 'holds:user:{}'
+
+class TooManyHolds(Exception):
+    pass
+
+def _key(doctor_id, day, time):
+    return f'holds:{doctor_id}:{day.isoformat()}:{time.strftime("%H:%M:%S")}'
+
+def hold(doctor_id, day, time, owner, seconds=HOLD_SECONDS, limit=MAX_PER_USER):
+    """
+    Hold the slot for user ``owner`` ahead of booking it: the seconds the hold
+    has left (a hold they already have keeps its expiry), 0 if someone else
+    holds it, None if Redis is down. Raises TooManyHolds if ``owner`` already
+    has ``limit`` other live holds.
+    """
+    client = get_redis()
+    if client is None:
+        return None
+    key, owned = _key(doctor_id, day, time), OWNER_KEY.format(owner)
+    try:
+        # counted in one MULTI, so racing requests of one user never get past the limit together
+        pipe = client.pipeline()
+        pipe.zremrangebyscore(owned, '-inf', now())
+        pipe.zadd(owned, {key: now() + seconds}, nx=True)
+        pipe.zcard(owned)
+        pipe.expire(owned, seconds)
+        added, count = pipe.execute()[1:3]
+        if added and count > limit:
+            client.zrem(owned, key)
+            raise TooManyHolds()
+        if client.set(key, owner, nx=True, ex=seconds):
+            if not added:  # their earlier hold had lapsed
+                client.zadd(owned, {key: now() + seconds})
+            return seconds
+        if client.get(key) == str(owner).encode():
+            return max(client.ttl(key), 1)
+        client.zrem(owned, key)
+        return 0
+    except RedisError:
+        return None
+
+def claim(doctor_id, day, time, owner, seconds=HOLD_SECONDS):
+    """
+    Hold the slot for user ``owner`` (refreshing a hold they already have):
+    True if it is theirs, False if someone else holds it, None if Redis is down.
+    """
+    claimed = claim_many([(doctor_id, day, time)], owner, seconds)
+    return None if claimed is None else claimed[(doctor_id, day, time)]
+
+def claim_many(slots, owner, seconds=HOLD_SECONDS):
+    """``claim`` for many ``(doctor_id, day, time)`` slots in at most three round trips; None if Redis is down."""
+    client = get_redis()
+    if client is None:
+        return None
+    keys = {slot: _key(*slot) for slot in slots}
+    try:
+        pipe = client.pipeline(transaction=False)
+        for key in keys.values():
+            pipe.set(key, owner, nx=True, ex=seconds)
+        claimed = {slot: bool(done) for slot, done in zip(keys, pipe.execute())}
+        taken = [slot for slot, done in claimed.items() if not done]
+        if taken:
+            pipe = client.pipeline(transaction=False)
+            for slot in taken:
+                pipe.get(keys[slot])
+            mine = [slot for slot, holder in zip(taken, pipe.execute()) if holder == str(owner).encode()]
+            pipe = client.pipeline(transaction=False)
+            for slot in mine:
+                pipe.expire(keys[slot], seconds)
+                claimed[slot] = True
+            pipe.execute()
+        return claimed
+    except RedisError:
+        return None
+
+def confirm(doctor_id, day, time, owner):
+    """``owner`` has booked the slot: stop counting its hold against their limit and leave the hold to expire."""
+    confirm_many([(doctor_id, day, time)], owner)
+
+def confirm_many(slots, owner):
+    client = get_redis()
+    if client is None or not slots:
+        return
+    try:
+        client.zrem(OWNER_KEY.format(owner), *(_key(*slot) for slot in slots))
+    except RedisError:
+        pass
+
+def release(doctor_id, day, time, owner):
+    """Drop ``owner``'s hold so others can book the slot at once."""
+    release_many([(doctor_id, day, time)], owner)
+
+def release_many(slots, owner):
+    """``release`` for many ``(doctor_id, day, time)`` slots in two round trips."""
+    client = get_redis()
+    if client is None or not slots:
+        return
+    keys = [_key(*slot) for slot in slots]
+    try:
+        mine = [key for key, holder in zip(keys, client.mget(keys)) if holder == str(owner).encode()]
+        if mine:
+            pipe = client.pipeline(transaction=False)
+            pipe.delete(*mine)
+            pipe.zrem(OWNER_KEY.format(owner), *mine)
+            pipe.execute()
+    except RedisError:
+        pass
+
+def lock(doctor_id, day, time):
+    """
+    Try a PostgreSQL advisory lock on the slot for the rest of the current
+    transaction: False if another transaction is booking it right now. Always
+    True on other databases.
+    """
+    connection = connections[router.db_for_write(Appointment)]
+    if connection.vendor != 'postgresql':
+        return True
+    # (doctor id, minute of the era) -- two int4 keys, so distinct slots never share a lock
+    minute = day.toordinal() * 24 * 60 + time.hour * 60 + time.minute
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT pg_try_advisory_xact_lock(%s, %s)', [doctor_id, minute])
+        return cursor.fetchone()[0]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 12:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['-appointment_date', '-appointment_time', '-id'], name='appt_ordering_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-18 12:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0002_appointment_ordering_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['patient', '-appointment_date', '-appointment_time'], name='appt_patient_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['status', 'appointment_date'], name='appt_status_date_idx'),
+        ),
+    ]
@@ -22,6 +22,13 @@ class Appointment(models.Model):
     class Meta:
         ordering = ['-appointment_date', '-appointment_time']
         unique_together = ['doctor', 'appointment_date', 'appointment_time']  # prevent double booking
+        indexes = [
+            # keyset pagination over Meta.ordering + id
+            models.Index(fields=['-appointment_date', '-appointment_time', '-id'], name='appt_ordering_idx'),
+            # patient-scoped lists (doctor-scoped ones use the unique_together index)
+            models.Index(fields=['patient', '-appointment_date', '-appointment_time'], name='appt_patient_date_idx'),
+            models.Index(fields=['status', 'appointment_date'], name='appt_status_date_idx'),
+        ]
 
     def __str__(self):
         return f"{self.patient} → Dr.{self.doctor.user.last_name} on {self.appointment_date}"
\ No newline at end of file
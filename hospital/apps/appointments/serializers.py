@@ -12,9 +12,16 @@
 #                   'created_at', 'updated_at')
 #         read_only_fields = ('created_at', 'updated_at')
 
+from datetime import timedelta
 from rest_framework import serializers
 from .models import Appointment
 
+def doctor_name(first_name, last_name, username):
+    return f"Dr. {first_name} {last_name}".strip() or username
+
+def patient_name(first_name, last_name, username):
+    return f"{first_name} {last_name}".strip() or username
+
 class AppointmentSerializer(serializers.ModelSerializer):
     doctor_name = serializers.SerializerMethodField()
     patient_name = serializers.SerializerMethodField()
@@ -28,11 +35,11 @@ class AppointmentSerializer(serializers.ModelSerializer):
 
     def get_doctor_name(self, obj):
         u = obj.doctor.user
-        return f"Dr. {u.first_name} {u.last_name}".strip() or u.username
+        return doctor_name(u.first_name, u.last_name, u.username)
 
     def get_patient_name(self, obj):
         u = obj.patient.user
-        return f"{u.first_name} {u.last_name}".strip() or u.username
+        return patient_name(u.first_name, u.last_name, u.username)
 
     def validate(self, attrs):
         doctor = attrs.get('doctor')
@@ -43,4 +50,69 @@ class AppointmentSerializer(serializers.ModelSerializer):
             qs = qs.exclude(pk=self.instance.pk)
         if qs.exists():
             raise serializers.ValidationError("This doctor already has an appointment at this time.")
-        return attrs
\ No newline at end of file
+        return attrs
+
+MAX_BULK_APPOINTMENTS = 100
+MAX_RECURRENCE_INTERVAL = 52
+
+class SlotSerializer(serializers.Serializer):
+    # plain ids: doctors are checked once per batch by bulk booking, and by the hold action
+    doctor = serializers.IntegerField()
+    appointment_date = serializers.DateField()
+    appointment_time = serializers.TimeField()
+
+class BulkAppointmentItemSerializer(SlotSerializer):
+    reason = serializers.CharField(required=False, allow_blank=True, default='')
+
+class RecurrenceSerializer(serializers.Serializer):
+    FREQUENCIES = {'daily': 1, 'weekly': 7}
+
+    doctor = serializers.IntegerField()
+    start_date = serializers.DateField()
+    appointment_time = serializers.TimeField()
+    frequency = serializers.ChoiceField(choices=list(FREQUENCIES), default='weekly')
+    interval = serializers.IntegerField(min_value=1, max_value=MAX_RECURRENCE_INTERVAL, default=1)
+    count = serializers.IntegerField(min_value=1, max_value=MAX_BULK_APPOINTMENTS)
+    reason = serializers.CharField(required=False, allow_blank=True, default='')
+
+    @classmethod
+    def step(cls, data):
+        return timedelta(days=cls.FREQUENCIES[data['frequency']] * data['interval'])
+
+    def validate(self, attrs):
+        try:
+            attrs['start_date'] + self.step(attrs) * (attrs['count'] - 1)
+        except OverflowError:
+            raise serializers.ValidationError('The series would run past the last supported date.')
+        return attrs
+
+    @classmethod
+    def expand(cls, data):
+        """The booking items of a validated rule."""
+        step = cls.step(data)
+        return [{
+            'doctor': data['doctor'],
+            'appointment_date': data['start_date'] + step * i,
+            'appointment_time': data['appointment_time'],
+            'reason': data['reason'],
+        } for i in range(data['count'])]
+
+class BulkAppointmentSerializer(serializers.Serializer):
+    """Either an explicit ``appointments`` list or a ``recurrence`` rule."""
+    patient = serializers.IntegerField(required=False)
+    appointments = BulkAppointmentItemSerializer(many=True, required=False)
+    recurrence = RecurrenceSerializer(required=False)
+
+    def validate(self, attrs):
+        if ('appointments' in attrs) == ('recurrence' in attrs):
+            raise serializers.ValidationError("Provide either 'appointments' or 'recurrence'.")
+        if 'recurrence' in attrs:
+            attrs['items'] = RecurrenceSerializer.expand(attrs['recurrence'])
+        else:
+            attrs['items'] = attrs['appointments']
+        if not attrs['items']:
+            raise serializers.ValidationError('No appointments to book.')
+        if len(attrs['items']) > MAX_BULK_APPOINTMENTS:
+            raise serializers.ValidationError(
+                f'Cannot book more than {MAX_BULK_APPOINTMENTS} appointments at once.')
+        return attrs
@@ -0,0 +1,80 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver, Signal
+from hospital.apps.billing.models import Invoice
+from hospital.apps.billing.signals import invoices_bulk_created
+from hospital.apps.core import events
+from hospital.apps.core.tracking import track, previous_values, loaded_values
+from .models import Appointment
+from . import slots
+
+# bulk_create() skips post_save; sent with ``instances`` after a bulk booking
+appointments_bulk_created = Signal()
+
+SLOT_FIELDS = ('doctor_id', 'appointment_date', 'appointment_time')
+track(Appointment, *SLOT_FIELDS, 'patient_id')
+
+INVOICE_EVENT_FIELDS = ('id', 'appointment_id', 'appointment__doctor_id', 'appointment__patient_id',
+                        'payment_status', 'total_amount')
+
+@receiver(post_save, sender=Appointment)
+def update_slot_index(sender, instance, created, **kwargs):
+    before = previous_values(instance)
+    current = tuple(getattr(instance, f) for f in SLOT_FIELDS)
+    old = tuple(before.get(f) for f in SLOT_FIELDS)
+    if not created and old == current:
+        return
+    changes = [(*current, True)]
+    if not created:
+        changes.insert(0, (*old, False))
+    slots.mark(changes)
+
+@receiver(post_delete, sender=Appointment)
+def release_slot(sender, instance, **kwargs):
+    values = loaded_values(instance)
+    slots.mark([(*(values.get(f) for f in SLOT_FIELDS), False)])
+
+@receiver(appointments_bulk_created)
+def book_slots(sender, instances, **kwargs):
+    slots.mark([(*(getattr(a, f) for f in SLOT_FIELDS), True) for a in instances])
+
+def appointment_event(action, appointment, before={}):
+    event = {'type': 'appointment', 'action': action, 'id': appointment.pk, 'doctor': appointment.doctor_id,
+             'patient': appointment.patient_id, 'status': appointment.status,
+             'date': appointment.appointment_date, 'time': appointment.appointment_time}
+    # a reassigned appointment is news to its previous doctor or patient too
+    return (event, (appointment.doctor_id, before.get('doctor_id')),
+            (appointment.patient_id, before.get('patient_id')))
+
+def invoice_event(action, invoice_id, appointment_id, doctor_id, patient_id, payment_status, total_amount):
+    event = {'type': 'invoice', 'action': action, 'id': invoice_id, 'appointment': appointment_id,
+             'payment_status': payment_status, 'total_amount': total_amount}
+    return event, (doctor_id,), (patient_id,)
+
+@receiver(post_save, sender=Appointment)
+def publish_appointment_saved(sender, instance, created, **kwargs):
+    events.publish([appointment_event('created' if created else 'updated', instance, previous_values(instance))])
+
+@receiver(post_delete, sender=Appointment)
+def publish_appointment_deleted(sender, instance, **kwargs):
+    events.publish([appointment_event('deleted', instance)])
+
+@receiver(appointments_bulk_created)
+def publish_booked(sender, instances, **kwargs):
+    events.publish([appointment_event('created', a) for a in instances])
+
+@receiver(post_save, sender=Invoice)
+@receiver(post_delete, sender=Invoice)
+def publish_invoice(sender, instance, signal, created=False, **kwargs):
+    if Invoice.appointment.is_cached(instance):  # mark_paid and retrieve select_related it
+        owners = (instance.appointment.doctor_id, instance.appointment.patient_id)
+    else:
+        owners = Appointment.objects.filter(pk=instance.appointment_id).values_list(
+            'doctor_id', 'patient_id').first() or (None, None)
+    action = 'deleted' if signal is post_delete else 'created' if created else 'updated'
+    events.publish([invoice_event(action, instance.pk, instance.appointment_id, *owners,
+                                  instance.payment_status, instance.total_amount)])
+
+@receiver(invoices_bulk_created)
+def publish_invoiced(sender, appointment_ids, **kwargs):
+    events.publish([invoice_event('created', *row) for row in
+                    Invoice.objects.filter(appointment_id__in=appointment_ids).values_list(*INVOICE_EVENT_FIELDS)])
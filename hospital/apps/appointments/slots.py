@@ -0,0 +1,155 @@
+"""
+Per-doctor, per-day slot bitmaps kept in Redis.
+
+Each day is split into ``SLOT_MINUTES`` slots between ``SLOT_DAY_START`` and
+``SLOT_DAY_END``. A day's bitmap lives under ``slots:<doctor_id>:<date>``;
+bit 0 marks the bitmap as built and bit ``i + 1`` is set when slot ``i`` is
+booked. Missing bitmaps are built from one query over the requested range,
+and appointment writes flip single bits (see signals.py).
+
+Writes set their bit whether or not the bitmap is built yet, and a build
+WATCHes its keys from before the query until its SET, so a booking that
+commits mid-build aborts that SET instead of being overwritten by it.
+"""
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from redis.exceptions import RedisError, WatchError
+
+from hospital.apps.core.redis import get_redis
+from .models import Appointment
+
+SLOT_CACHE_TTL = 60 * 60 * 24  # rebuilt from the DB at most once a day
+
+def _parse_time(value):
+    return datetime.strptime(value, '%H:%M')
+
+DAY_START = _parse_time(getattr(settings, 'SLOT_DAY_START', '09:00'))
+DAY_END = _parse_time(getattr(settings, 'SLOT_DAY_END', '17:00'))
+SLOT_MINUTES = getattr(settings, 'SLOT_MINUTES', 30)
+SLOT_COUNT = int((DAY_END - DAY_START).total_seconds() // 60) // SLOT_MINUTES
+SLOT_TIMES = [(DAY_START + timedelta(minutes=i * SLOT_MINUTES)).strftime('%H:%M')
+              for i in range(SLOT_COUNT)]
+
+def slot_index(time):
+    """Index of the slot starting exactly at ``time``, or None if it's off the grid."""
+    minutes = time.hour * 60 + time.minute - (DAY_START.hour * 60 + DAY_START.minute)
+    if time.second or minutes < 0 or minutes % SLOT_MINUTES:
+        return None
+    index = minutes // SLOT_MINUTES
+    return index if index < SLOT_COUNT else None
+
+def _key(doctor_id, day):
+    return f'slots:{doctor_id}:{day.isoformat()}'
+
+def _encode(busy):
+    bits = bytearray((SLOT_COUNT + 8) // 8)
+    for bit in [0] + [i + 1 for i in busy]:
+        bits[bit // 8] |= 0x80 >> (bit % 8)
+    return bytes(bits)
+
+def _decode(raw):
+    """Set of busy slot indexes, or None if the bitmap was never built."""
+    if not raw or not raw[0] & 0x80:
+        return None
+    return {i for i in range(SLOT_COUNT)
+            if len(raw) > (i + 1) // 8 and raw[(i + 1) // 8] & (0x80 >> ((i + 1) % 8))}
+
+def _busy_from_db(doctor_ids, days):
+    busy = {(doctor_id, day): set() for doctor_id in doctor_ids for day in days}
+    rows = Appointment.objects.filter(
+        doctor_id__in=doctor_ids,
+        appointment_date__range=(days[0], days[-1]),
+    ).values_list('doctor_id', 'appointment_date', 'appointment_time')
+    for doctor_id, day, time in rows:
+        index = slot_index(time)
+        if index is not None:
+            busy[(doctor_id, day)].add(index)
+    return busy
+
+def busy_slots(doctor_ids, days):
+    """
+    Map ``(doctor_id, day)`` to the set of booked slot indexes. Bitmaps that are
+    cached cost one pipelined round trip; the rest come from a single query.
+    """
+    doctor_ids, days = list(doctor_ids), sorted(days)
+    if not doctor_ids or not days:
+        return {}
+    client = get_redis()
+    pairs = [(doctor_id, day) for doctor_id in doctor_ids for day in days]
+    cached = {}
+    if client is not None:
+        try:
+            pipe = client.pipeline(transaction=False)
+            for doctor_id, day in pairs:
+                pipe.get(_key(doctor_id, day))
+            cached = {pair: _decode(raw) for pair, raw in zip(pairs, pipe.execute())}
+        except RedisError:
+            client = None
+
+    missing = [pair for pair in pairs if cached.get(pair) is None]
+    if not missing:
+        return cached
+
+    result = dict(cached)
+    keys = [_key(doctor_id, day) for doctor_id, day in missing]
+    pipe = None
+    if client is not None:
+        try:
+            pipe = client.pipeline()
+            pipe.watch(*keys)
+        except RedisError:
+            pipe = None
+    try:
+        loaded = _busy_from_db(sorted({d for d, _ in missing}), sorted({day for _, day in missing}))
+        for pair in missing:
+            result[pair] = loaded[pair]
+        if pipe is not None:
+            pipe.multi()
+            for key, pair in zip(keys, missing):
+                pipe.set(key, _encode(result[pair]), ex=SLOT_CACHE_TTL)
+            pipe.execute()
+    except WatchError:
+        pass  # a booking landed during the query; the next read rebuilds
+    except RedisError:
+        pass
+    finally:
+        if pipe is not None:
+            pipe.reset()
+    return result
+
+def free_slots(busy):
+    return [t for i, t in enumerate(SLOT_TIMES) if i not in busy]
+
+def _set_bits(changes):
+    """
+    Apply ``(doctor_id, day, time, booked)`` changes. Bitmaps that aren't
+    built get the bit too, which aborts any build racing with this write.
+    """
+    client = get_redis()
+    if client is None:
+        return
+    changes = [(d, day, slot_index(t), booked) for d, day, t, booked in changes if t is not None]
+    changes = [c for c in changes if c[2] is not None]
+    if not changes:
+        return
+    try:
+        pipe = client.pipeline(transaction=False)
+        for doctor_id, day, _, _ in changes:
+            pipe.getbit(_key(doctor_id, day), 0)
+        built = pipe.execute()
+        pipe = client.pipeline(transaction=False)
+        for (doctor_id, day, index, booked), is_built in zip(changes, built):
+            pipe.setbit(_key(doctor_id, day), index + 1, int(booked))
+            if not is_built:
+                pipe.expire(_key(doctor_id, day), SLOT_CACHE_TTL)
+        pipe.execute()
+    except RedisError:
+        pass
+
+def mark(changes):
+    """Flip slot bits once the surrounding transaction commits."""
+    changes = list(changes)
+    if changes:
+        transaction.on_commit(lambda: _set_bits(changes))
@@ -1,14 +1,46 @@
+from operator import itemgetter
+from django.db import IntegrityError, transaction
+from django.utils import timezone
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from .models import Appointment
-from .serializers import AppointmentSerializer
+from .serializers import AppointmentSerializer, BulkAppointmentSerializer, SlotSerializer, doctor_name, patient_name
+from .signals import appointments_bulk_created
+from . import holds, slots
+from hospital.apps.doctors.models import Doctor
+from hospital.apps.patients.models import Patient
 from hospital.apps.accounts.permissions import IsAdmin, IsAdminOrDoctor
+from hospital.apps.core.db_router import ReplicaReadMixin
+from hospital.apps.core.export import ExportMixin
+from hospital.apps.core.fastread import FastReadMixin, ValuesSerializer
+from hospital.apps.core.pagination import KeysetPagination
 
-class AppointmentViewSet(viewsets.ModelViewSet):
+slot_of = itemgetter('doctor', 'appointment_date', 'appointment_time')
+SLOT_TAKEN = 'This doctor already has an appointment at this time.'
+SLOT_HELD = 'This slot is being booked by someone else, please pick another time.'
+
+class AppointmentViewSet(ReplicaReadMixin, ExportMixin, FastReadMixin, viewsets.ModelViewSet):
     serializer_class = AppointmentSerializer
+    fast_serializer = ValuesSerializer(AppointmentSerializer, computed={
+        'doctor_name': (('doctor__user__first_name', 'doctor__user__last_name', 'doctor__user__username'),
+                        doctor_name),
+        'patient_name': (('patient__user__first_name', 'patient__user__last_name', 'patient__user__username'),
+                         patient_name),
+    })
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    export_name = 'appointments'
+    export_columns = [
+        ('id', 'id'), ('doctor_id', 'doctor_id'),
+        ('doctor_first_name', 'doctor__user__first_name'), ('doctor_last_name', 'doctor__user__last_name'),
+        ('patient_id', 'patient_id'),
+        ('patient_first_name', 'patient__user__first_name'), ('patient_last_name', 'patient__user__last_name'),
+        ('appointment_date', 'appointment_date'), ('appointment_time', 'appointment_time'),
+        ('status', 'status'), ('reason', 'reason'), ('notes', 'notes'),
+        ('created_at', 'created_at'), ('updated_at', 'updated_at'),
+    ]
 
     def get_queryset(self):
         user = self.request.user
@@ -16,16 +48,88 @@ class AppointmentViewSet(viewsets.ModelViewSet):
             return Appointment.objects.select_related('doctor__user', 'patient__user').all()
         elif user.is_doctor():
             return Appointment.objects.select_related('doctor__user', 'patient__user').filter(
-                doctor=user.doctor_profile)
+                doctor_id=user.profile_id)
         else:
             return Appointment.objects.select_related('doctor__user', 'patient__user').filter(
-                patient=user.patient_profile)
+                patient_id=user.profile_id)
 
     def get_permissions(self):
-        if self.action in ['list', 'retrieve', 'create', 'update', 'partial_update', 'update_status']:
+        if self.action in ['list', 'retrieve', 'create', 'update', 'partial_update', 'update_status', 'bulk', 'export',
+                           'hold']:
             return [IsAuthenticated()]
         return [IsAdmin()]
 
+    def create(self, request, *args, **kwargs):
+        slot = SlotSerializer(data=request.data)
+        if not slot.is_valid():
+            return super().create(request, *args, **kwargs)  # reports the errors in full
+        return self._in_slot(request, slot_of(slot.validated_data), status.HTTP_201_CREATED,
+                             lambda: super(AppointmentViewSet, self).create(request, *args, **kwargs))
+
+    def update(self, request, *args, **kwargs):
+        instance = self.get_object()
+        current = (instance.doctor_id, instance.appointment_date, instance.appointment_time)
+        fields = ('doctor', 'appointment_date', 'appointment_time')
+        slot = SlotSerializer(data={name: request.data.get(name, value) for name, value in zip(fields, current)})
+        if slot.is_valid() and slot_of(slot.validated_data) != current:
+            # a reschedule takes its new slot the way a booking does
+            return self._in_slot(request, slot_of(slot.validated_data), status.HTTP_200_OK,
+                                 lambda: super(AppointmentViewSet, self).update(request, *args, **kwargs))
+        try:
+            with transaction.atomic():
+                return super().update(request, *args, **kwargs)
+        except IntegrityError:
+            return Response({'error': SLOT_TAKEN}, status=status.HTTP_409_CONFLICT)
+
+    def _in_slot(self, request, slot, success, write):
+        """Run ``write`` once the slot is the caller's; their hold is released unless it answers ``success``."""
+        doctor_id, day, time = slot
+        # Settle races for the slot before validating or writing anything.
+        claimed = holds.claim(doctor_id, day, time, request.user.pk)
+        if claimed is False:
+            return Response({'error': SLOT_HELD}, status=status.HTTP_409_CONFLICT)
+        response = None
+        try:
+            with transaction.atomic():
+                if claimed is None and not holds.lock(doctor_id, day, time):
+                    return Response({'error': SLOT_HELD}, status=status.HTTP_409_CONFLICT)
+                response = write()
+        except IntegrityError:
+            response = Response({'error': SLOT_TAKEN}, status=status.HTTP_409_CONFLICT)
+        finally:
+            if claimed and response is not None and response.status_code == success:
+                holds.confirm(doctor_id, day, time, request.user.pk)
+            elif claimed:
+                holds.release(doctor_id, day, time, request.user.pk)
+        return response
+
+    @action(detail=False, methods=['post', 'delete'], permission_classes=[IsAuthenticated])
+    def hold(self, request):
+        slot = SlotSerializer(data=request.data)
+        slot.is_valid(raise_exception=True)
+        doctor_id, day, time = slot_of(slot.validated_data)
+        if request.method == 'DELETE':
+            holds.release(doctor_id, day, time, request.user.pk)
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        if day < timezone.now().date():
+            return Response({'error': 'Cannot hold a slot in the past.'}, status=status.HTTP_400_BAD_REQUEST)
+        if not Doctor.objects.filter(pk=doctor_id).exists():
+            return Response({'error': 'Doctor not found.'}, status=status.HTTP_400_BAD_REQUEST)
+        index = slots.slot_index(time)
+        if index is not None and index in slots.busy_slots([doctor_id], [day])[(doctor_id, day)]:
+            return Response({'error': SLOT_TAKEN}, status=status.HTTP_409_CONFLICT)
+        try:
+            expires_in = holds.hold(doctor_id, day, time, request.user.pk)
+        except holds.TooManyHolds:
+            return Response({'error': f'You can hold at most {holds.MAX_PER_USER} slots at a time.'},
+                            status=status.HTTP_429_TOO_MANY_REQUESTS)
+        if expires_in is None:
+            return Response({'error': 'Slot holds are unavailable right now; book directly.'},
+                            status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        if not expires_in:
+            return Response({'error': SLOT_HELD}, status=status.HTTP_409_CONFLICT)
+        return Response({**slot.data, 'expires_in': expires_in}, status=status.HTTP_201_CREATED)
+
     @action(detail=True, methods=['patch'], permission_classes=[IsAdminOrDoctor])
     def update_status(self, request, pk=None):
         appointment = self.get_object()
@@ -34,4 +138,82 @@ class AppointmentViewSet(viewsets.ModelViewSet):
             return Response({'error': 'Invalid status.'}, status=status.HTTP_400_BAD_REQUEST)
         appointment.status = new_status
         appointment.save()
-        return Response(AppointmentSerializer(appointment).data)
\ No newline at end of file
+        return Response(AppointmentSerializer(appointment).data)
+
+    @action(detail=False, methods=['post'], permission_classes=[IsAuthenticated])
+    def bulk(self, request):
+        serializer = BulkAppointmentSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        items = serializer.validated_data['items']
+        if request.user.is_patient():
+            patient_id = request.user.profile_id
+            if patient_id is None:
+                return Response({'error': 'Patient profile not found.'}, status=status.HTTP_404_NOT_FOUND)
+        elif 'patient' in serializer.validated_data:
+            patient_id = serializer.validated_data['patient']
+            if not Patient.objects.filter(pk=patient_id).exists():
+                return Response({'error': 'Patient not found.'}, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            return Response({'error': 'patient is required.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        claimed = holds.claim_many({slot_of(item) for item in items}, request.user.pk) or {}
+        held = {slot for slot, mine in claimed.items() if not mine}
+        created = []
+        try:
+            # Retry once if a concurrent booking wins a slot between the check and the insert.
+            for attempt in range(2):
+                try:
+                    with transaction.atomic():
+                        results, created = self._book(patient_id, items, held)
+                    break
+                except IntegrityError:
+                    created = []
+                    if attempt:
+                        return Response({'error': 'Slots changed while booking, please retry.'},
+                                        status=status.HTTP_409_CONFLICT)
+        finally:
+            booked = {(a.doctor_id, a.appointment_date, a.appointment_time) for a in created}
+            holds.confirm_many(booked, request.user.pk)
+            holds.release_many([slot for slot, mine in claimed.items() if mine and slot not in booked],
+                               request.user.pk)
+        appointments_bulk_created.send(sender=Appointment, instances=created)
+
+        for result, appointment in zip([r for r in results if r['status'] == 'created'], created):
+            result['id'] = appointment.id
+        return Response({
+            'created': len(created),
+            'conflicts': len(results) - len(created),
+            'results': results,
+        }, status=status.HTTP_201_CREATED if created else status.HTTP_409_CONFLICT)
+
+    def _book(self, patient_id, items, held):
+        """Check every item against existing bookings in one query, then insert the free ones not ``held`` by others."""
+        doctor_ids = {item['doctor'] for item in items}
+        known_doctors = set(Doctor.objects.filter(id__in=doctor_ids).values_list('id', flat=True))
+        taken = set(Appointment.objects.filter(
+            doctor_id__in=doctor_ids,
+            appointment_date__in={item['appointment_date'] for item in items},
+            appointment_time__in={item['appointment_time'] for item in items},
+        ).values_list('doctor_id', 'appointment_date', 'appointment_time'))
+
+        results, new = [], []
+        for index, item in enumerate(items):
+            slot = (item['doctor'], item['appointment_date'], item['appointment_time'])
+            result = {'index': index, 'doctor': item['doctor'],
+                      'appointment_date': item['appointment_date'],
+                      'appointment_time': item['appointment_time']}
+            if item['doctor'] not in known_doctors:
+                result.update(status='invalid', error='Doctor not found.')
+            elif slot in taken:
+                result.update(status='conflict', error=SLOT_TAKEN)
+            elif slot in held:
+                result.update(status='conflict', error=SLOT_HELD)
+            else:
+                taken.add(slot)
+                result['status'] = 'created'
+                new.append(Appointment(doctor_id=item['doctor'], patient_id=patient_id,
+                                       appointment_date=item['appointment_date'],
+                                       appointment_time=item['appointment_time'],
+                                       reason=item['reason']))
+            results.append(result)
+        return results, Appointment.objects.bulk_create(new)
@@ -0,0 +1,67 @@
+"""
+Batched invoice generation for completed appointments.
+
+Invoices are priced from the doctor's consultation fee with the configured
+tax and discount rates and inserted with bulk_create, so ``Invoice.save`` and
+its per-row ``total_amount`` computation are bypassed -- totals are computed
+here instead, and ``invoices_bulk_created`` stands in for post_save.
+"""
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from django.conf import settings
+from django.db import transaction
+from hospital.apps.appointments.models import Appointment
+from hospital.apps.core.jobs import job
+from .models import Invoice
+from .signals import invoices_bulk_created
+
+CENT = Decimal('0.01')
+DEFAULT_BATCH_SIZE = 1000
+
+def rate(value):
+    """``value`` as a Decimal fraction; ValueError unless it is a finite number from 0 to 1."""
+    try:
+        value = Decimal(str(value))
+    except InvalidOperation:
+        value = None
+    if value is None or not value.is_finite() or not 0 <= value <= 1:
+        raise ValueError('Rates must be decimal fractions between 0 and 1.')
+    return value
+
+def price(fee, tax_rate, discount_rate):
+    """(amount, tax, discount, total) for a consultation fee."""
+    amount = Decimal(fee).quantize(CENT, ROUND_HALF_UP)
+    tax = (amount * tax_rate).quantize(CENT, ROUND_HALF_UP)
+    discount = (amount * discount_rate).quantize(CENT, ROUND_HALF_UP)
+    return amount, tax, discount, amount + tax - discount
+
+def uninvoiced():
+    return Appointment.objects.filter(
+        status=Appointment.Status.COMPLETED, invoice__isnull=True)
+
+@job
+def generate_invoices(tax_rate=None, discount_rate=None, batch_size=DEFAULT_BATCH_SIZE):
+    """Create pending invoices for every completed appointment without one; returns how many were inserted."""
+    tax_rate = rate(settings.INVOICE_TAX_RATE if tax_rate is None else tax_rate)
+    discount_rate = rate(settings.INVOICE_DISCOUNT_RATE if discount_rate is None else discount_rate)
+    created = 0
+    while True:
+        with transaction.atomic():
+            # Lock the batch so two concurrent runs cannot invoice the same appointment.
+            rows = list(uninvoiced().order_by('id').select_for_update(skip_locked=True, of=('self',))
+                        .values_list('id', 'doctor__consultation_fee')[:batch_size])
+            if not rows:
+                return created
+            batch = Invoice.objects.filter(appointment_id__in=[row[0] for row in rows])
+            # invoices committed by hand since the appointments were picked are skipped, not counted;
+            # later ones wait on the appointment locks (the FK check) and then conflict with ours
+            existing = set(batch.values_list('appointment_id', flat=True))
+            invoices = []
+            for appointment_id, fee in rows:
+                if appointment_id in existing:
+                    continue
+                amount, tax, discount, total = price(fee, tax_rate, discount_rate)
+                invoices.append(Invoice(appointment_id=appointment_id, amount=amount, tax=tax,
+                                        discount=discount, total_amount=total))
+            Invoice.objects.bulk_create(invoices, ignore_conflicts=True)
+            invoices_bulk_created.send(sender=Invoice, appointment_ids=[i.appointment_id for i in invoices])
+            created += batch.count() - len(existing)
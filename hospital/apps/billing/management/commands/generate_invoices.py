@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand, CommandError
+from hospital.apps.billing.invoicing import generate_invoices, rate, DEFAULT_BATCH_SIZE
+
+class Command(BaseCommand):
+    help = 'Create pending invoices for all completed appointments that have none'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tax-rate', help='Fraction of the fee, e.g. 0.18 (default: INVOICE_TAX_RATE)')
+        parser.add_argument('--discount-rate', help='Fraction of the fee (default: INVOICE_DISCOUNT_RATE)')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            rates = [rate(options[name]) if options[name] is not None else None
+                     for name in ('tax_rate', 'discount_rate')]
+        except ValueError as e:
+            raise CommandError(str(e))
+        created = generate_invoices(*rates, options['batch_size'])
+        self.stdout.write(f'Created {created} invoices.')
@@ -29,6 +29,11 @@ class Invoice(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # keyset pagination over Meta.ordering + id
+            models.Index(fields=['-created_at', '-id'], name='invoice_ordering_idx'),
+            models.Index(fields=['payment_status', 'created_at'], name='invoice_status_created_idx'),
+        ]
 
     def __str__(self):
         return f"Invoice #{self.id} - {self.payment_status}"
\ No newline at end of file
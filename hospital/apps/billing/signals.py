@@ -0,0 +1,4 @@
+from django.dispatch import Signal
+
+# bulk_create() skips post_save; sent with ``appointment_ids`` after each invoicing batch
+invoices_bulk_created = Signal()
@@ -5,11 +5,25 @@ from rest_framework.permissions import IsAuthenticated
 from django.utils import timezone
 from .models import Invoice
 from .serializers import InvoiceSerializer
+from .invoicing import generate_invoices, rate
 from hospital.apps.accounts.permissions import IsAdmin
+from hospital.apps.core.db_router import ReplicaReadMixin
+from hospital.apps.core.export import ExportMixin
+from hospital.apps.core.pagination import KeysetPagination
 
-class InvoiceViewSet(viewsets.ModelViewSet):
+class InvoiceViewSet(ReplicaReadMixin, ExportMixin, viewsets.ModelViewSet):
     serializer_class = InvoiceSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    export_name = 'invoices'
+    export_columns = [
+        ('id', 'id'), ('appointment_id', 'appointment_id'),
+        ('appointment_date', 'appointment__appointment_date'),
+        ('doctor_id', 'appointment__doctor_id'), ('patient_id', 'appointment__patient_id'),
+        ('amount', 'amount'), ('tax', 'tax'), ('discount', 'discount'), ('total_amount', 'total_amount'),
+        ('payment_status', 'payment_status'), ('payment_method', 'payment_method'),
+        ('paid_at', 'paid_at'), ('created_at', 'created_at'),
+    ]
 
     def get_queryset(self):
         user = self.request.user
@@ -17,13 +31,13 @@ class InvoiceViewSet(viewsets.ModelViewSet):
             return Invoice.objects.select_related('appointment').all()
         elif user.is_doctor():
             return Invoice.objects.select_related('appointment').filter(
-                appointment__doctor=user.doctor_profile)
+                appointment__doctor_id=user.profile_id)
         else:
             return Invoice.objects.select_related('appointment').filter(
-                appointment__patient=user.patient_profile)
+                appointment__patient_id=user.profile_id)
 
     def get_permissions(self):
-        if self.action in ['list', 'retrieve', 'mark_paid']:
+        if self.action in ['list', 'retrieve', 'mark_paid', 'export']:
             return [IsAuthenticated()]
         if self.action in ['create', 'update', 'partial_update']:
             return [IsAdmin()]
@@ -36,4 +50,17 @@ class InvoiceViewSet(viewsets.ModelViewSet):
         invoice.payment_method = request.data.get('payment_method', Invoice.PaymentMethod.CASH)
         invoice.paid_at = timezone.now()
         invoice.save()
-        return Response(InvoiceSerializer(invoice).data)
\ No newline at end of file
+        return Response(InvoiceSerializer(invoice).data)
+
+    @action(detail=False, methods=['post'], permission_classes=[IsAdmin])
+    def generate(self, request):
+        try:
+            rates = {name: rate(request.data[name])
+                     for name in ('tax_rate', 'discount_rate') if name in request.data}
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if request.data.get('background') in (True, 'true', '1'):
+            job_id = generate_invoices.enqueue(**rates)
+            return Response({'job': job_id}, status=status.HTTP_202_ACCEPTED)
+        created = generate_invoices(**rates)
+        return Response({'created': created}, status=status.HTTP_201_CREATED)
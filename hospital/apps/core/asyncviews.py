@@ -0,0 +1,95 @@
+"""
+Plumbing for async (ASGI) versions of hot GET endpoints.
+
+``async_api`` authenticates with the same JWT backend as the DRF views and
+applies the same permission classes, then lets the view build its response
+with the async ORM and cache, so a slow query parks only its own request
+instead of a whole worker. Any other method is handed to the DRF view.
+Bodies are rendered by the DRF views' default renderer and are identical to
+their responses.
+"""
+import functools
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.paginator import InvalidPage, Paginator
+from django.http import HttpResponse
+from rest_framework import exceptions
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from hospital.apps.accounts.authentication import CachedJWTAuthentication
+from .db_router import is_sticky, replica_configured, replica_reads
+
+authenticator = CachedJWTAuthentication()
+_renderer = api_settings.DEFAULT_RENDERER_CLASSES[0]()
+
+def json_response(data, status=200):
+    return HttpResponse(_renderer.render(data), status=status, content_type='application/json')
+
+def error_response(exc):
+    # same body shape as rest_framework.views.exception_handler
+    data = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+    response = json_response(data, status=exc.status_code)
+    if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+        response['WWW-Authenticate'] = authenticator.authenticate_header(None)
+    return response
+
+async def _authenticate(request):
+    result = await sync_to_async(authenticator.authenticate)(request)
+    if result is None:
+        raise exceptions.NotAuthenticated()
+    request.user, request.auth = result
+
+def async_api(fallback, permission_classes, replica=False):
+    """
+    Serve GET/HEAD with the decorated coroutine after authentication and
+    ``permission_classes`` pass; route every other method to ``fallback``.
+    ``replica`` reads from the replica like ``ReplicaReadMixin`` does.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def view(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return await sync_to_async(fallback)(request, *args, **kwargs)
+            try:
+                await _authenticate(request)
+                for permission in permission_classes:
+                    if not permission().has_permission(request, None):
+                        raise exceptions.PermissionDenied()
+                use_replica = replica and replica_configured() and not await sync_to_async(is_sticky)(request.user)
+                with replica_reads(use_replica):
+                    return await func(request, *args, **kwargs)
+            except exceptions.APIException as exc:
+                return error_response(exc)
+        view.csrf_exempt = True
+        return view
+    return decorator
+
+async def paginate(request, queryset, render_rows):
+    """
+    The async equivalent of DRF's PageNumberPagination: ``{count, next,
+    previous, results}`` with ``render_rows`` applied to the page's rows.
+    """
+    page_size = api_settings.PAGE_SIZE
+    count = await queryset.acount()
+    paginator = Paginator(range(count), page_size)
+    page_number = request.GET.get('page', 1)
+    if page_number == 'last':
+        page_number = paginator.num_pages
+    try:
+        page = paginator.page(page_number)
+    except InvalidPage:
+        raise exceptions.NotFound('Invalid page.')
+    offset = (page.number - 1) * page_size
+    rows = [row async for row in queryset[offset:offset + page_size]]
+
+    url = request.build_absolute_uri()
+    next_link = replace_query_param(url, 'page', page.next_page_number()) if page.has_next() else None
+    previous_link = None
+    if page.has_previous():
+        previous_number = page.previous_page_number()
+        previous_link = remove_query_param(url, 'page') if previous_number == 1 \
+            else replace_query_param(url, 'page', previous_number)
+    return {'count': count, 'next': next_link, 'previous': previous_link, 'results': render_rows(rows)}
+
+def enabled():
+    return getattr(settings, 'ASYNC_VIEWS', False)
@@ -0,0 +1,22 @@
+from itertools import islice
+from django.db import connections, router
+from django.db.backends.postgresql.psycopg_any import is_psycopg3
+
+def insert(model, objs, batch_size):
+    """
+    Insert ``objs`` without signals or returned ids: COPY on PostgreSQL with
+    psycopg 3, ``bulk_create`` elsewhere.
+    """
+    connection = connections[router.db_for_write(model)]
+    if connection.vendor != 'postgresql' or not is_psycopg3:
+        objs = iter(objs)
+        while batch := list(islice(objs, batch_size)):
+            model.objects.bulk_create(batch)
+        return
+    fields = [field for field in model._meta.concrete_fields if not field.primary_key]
+    columns = ', '.join(connection.ops.quote_name(field.column) for field in fields)
+    # the raw psycopg cursor skips Django's error translation, so IntegrityError would escape as psycopg's own
+    with connection.cursor() as cursor, connection.wrap_database_errors:
+        with cursor.cursor.copy(f'COPY {connection.ops.quote_name(model._meta.db_table)} ({columns}) FROM STDIN') as copy:
+            for obj in objs:
+                copy.write_row([field.get_db_prep_save(field.pre_save(obj, True), connection) for field in fields])
@@ -0,0 +1,93 @@
+"""
+Stampede-protected caching for view results.
+
+``get_or_compute`` stores ``(value, compute_seconds, expires_at)`` and combines:
+
+* single flight -- a short cache lock lets one process recompute a key while
+  the others keep serving the previous value or wait briefly for the new one;
+* early refresh -- a hit may recompute before expiry with a probability that
+  grows as expiry nears and with how long the value takes to compute (XFetch);
+* stale-while-revalidate -- entries are kept ``stale_ttl`` seconds past their
+  expiry so a slow recompute never turns into a burst of misses.
+"""
+import math
+import random
+import time
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from redis.exceptions import LockError, RedisError
+
+LOCK_TIMEOUT = 30
+WAIT_INTERVAL = 0.05
+
+def _acquire(key):
+    """Held lock if this process may recompute ``key``, False if someone else is, None if the cache is down."""
+    try:
+        # django-redis returns None instead of raising when IGNORE_EXCEPTIONS is on
+        lock = cache.lock(f'{key}:lock', timeout=LOCK_TIMEOUT)
+        if lock is None:
+            return None
+        return lock if lock.acquire(blocking=False) else False
+    except RedisError:
+        return None
+
+def _release(lock):
+    try:
+        # compare-and-delete in one script, so a lock that expired during a slow
+        # compute() and was taken by another process is left alone
+        lock.release()
+    except (LockError, RedisError):
+        pass
+
+def _refresh(key, compute, timeout, stale_ttl):
+    started = time.monotonic()
+    value = compute()
+    delta = time.monotonic() - started
+    cache.set(key, (value, delta, time.time() + timeout), timeout + stale_ttl)
+    return value
+
+def _fresh(delta, expires_at, beta):
+    return time.time() - delta * beta * math.log(1.0 - random.random()) < expires_at
+
+def get_or_compute(key, compute, timeout, stale_ttl=None, beta=1.0, wait=2.0):
+    """Return the cached value for ``key``, calling ``compute()`` in at most one process at a time."""
+    stale_ttl = timeout if stale_ttl is None else stale_ttl
+    entry = cache.get(key)
+    if entry is not None:
+        value, delta, expires_at = entry
+        if _fresh(delta, expires_at, beta):
+            return value
+        lock = _acquire(key)
+        if not lock:
+            return value
+        try:
+            return _refresh(key, compute, timeout, stale_ttl)
+        finally:
+            _release(lock)
+
+    deadline = time.monotonic() + wait
+    while True:
+        lock = _acquire(key)
+        if lock is None:
+            return compute()
+        if lock:
+            try:
+                return _refresh(key, compute, timeout, stale_ttl)
+            finally:
+                _release(lock)
+        time.sleep(WAIT_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry[0]
+        if time.monotonic() > deadline:
+            return compute()
+
+async def aget_or_compute(key, compute, timeout, stale_ttl=None, beta=1.0, wait=2.0):
+    """Async ``get_or_compute``: fresh hits are served without leaving the event loop."""
+    entry = await cache.aget(key)
+    if entry is not None and _fresh(entry[1], entry[2], beta):
+        return entry[0]
+    return await sync_to_async(get_or_compute)(key, compute, timeout, stale_ttl, beta, wait)
+
+def invalidate(key):
+    cache.delete(key)
@@ -0,0 +1,20 @@
+from django_redis.client import DefaultClient
+from . import metrics
+
+_missing = object()
+
+class MetricsCacheClient(DefaultClient):
+    """django-redis client that counts cache hits and misses for /metrics."""
+    def get(self, key, default=None, version=None, client=None):
+        value = super().get(key, default=_missing, version=version, client=client)
+        if value is _missing:
+            metrics.record_cache(0, 1)
+            return default
+        metrics.record_cache(1, 0)
+        return value
+
+    def get_many(self, keys, version=None, client=None):
+        keys = list(keys)
+        values = super().get_many(keys, version=version, client=client)
+        metrics.record_cache(len(values), len(keys) - len(values))
+        return values
@@ -0,0 +1,78 @@
+"""
+Negotiated gzip/brotli compression of API responses.
+
+Unlike Django's GZipMiddleware this leaves streaming responses alone -- the
+CSV/NDJSON exports and the /api/events/ stream must reach the client as they
+are produced -- and only compresses JSON and text bodies of at least
+``COMPRESSION_MIN_SIZE`` bytes, below which the header overhead and the CPU
+outweigh the saving. Brotli is preferred when the client accepts it and the
+``brotli`` package is installed; a compressed response that comes out larger
+than the original is sent uncompressed.
+"""
+import gzip
+import re
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+MIN_SIZE = getattr(settings, 'COMPRESSION_MIN_SIZE', 1024)
+GZIP_LEVEL = getattr(settings, 'COMPRESSION_GZIP_LEVEL', 6)
+BROTLI_QUALITY = getattr(settings, 'COMPRESSION_BROTLI_QUALITY', 4)
+
+COMPRESSIBLE = ('application/json', 'text/')
+_coding = re.compile(r'\s*([^\s;,]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?')
+
+def qualities(header):
+    """Content coding -> q value of an Accept-Encoding header (codings lower-cased)."""
+    result = {}
+    for part in header.split(','):
+        match = _coding.match(part)
+        if match:
+            try:
+                result[match.group(1).lower()] = float(match.group(2) or 1)
+            except ValueError:
+                continue
+    return result
+
+def compress(content, coding):
+    if coding == 'br':
+        return brotli.compress(content, quality=BROTLI_QUALITY)
+    # mtime=0: the same body always compresses to the same bytes
+    return gzip.compress(content, compresslevel=GZIP_LEVEL, mtime=0)
+
+def choose(request):
+    """The coding to answer ``request`` with, or None."""
+    q = qualities(request.headers.get('Accept-Encoding', ''))
+    for coding in ('br', 'gzip') if brotli is not None else ('gzip',):
+        if q.get(coding, q.get('*', 0)) > 0:
+            return coding
+    return None
+
+class CompressionMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (response.streaming or response.has_header('Content-Encoding')
+                or not response.get('Content-Type', '').startswith(COMPRESSIBLE)
+                or len(response.content) < MIN_SIZE):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        coding = choose(request)
+        if coding is None:
+            return response
+        compressed = compress(response.content, coding)
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        response['Content-Encoding'] = coding
+        # the bytes differ from the identity response, so only a weak match is still valid
+        if response.has_header('ETag'):
+            response['ETag'] = re.sub(r'^(W/)?', 'W/', response['ETag'])
+        return response
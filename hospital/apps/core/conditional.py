@@ -0,0 +1,92 @@
+"""
+Conditional GET support (ETag / Last-Modified).
+
+Validators are computed from ``updated_at`` columns with a single aggregate
+or ``values_list`` query, so an unchanged resource is answered with a 304
+before any row is loaded or serialized.
+"""
+import hashlib
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+def _latest(values):
+    values = [v for v in values if v is not None]
+    return max(values) if values else None
+
+def collection_state(queryset, fields):
+    """``(row_count, latest_change)`` for a queryset; the count catches deletions."""
+    aggregates = queryset.order_by().aggregate(
+        count=Count('pk'), **{f'latest_{i}': Max(f) for i, f in enumerate(fields)})
+    latest = _latest(aggregates[f'latest_{i}'] for i in range(len(fields)))
+    return aggregates['count'], latest
+
+def row_state(queryset, fields):
+    """``(1, latest_change)`` for the single row in ``queryset``, or None if there isn't one."""
+    row = queryset.order_by().values_list(*fields).first()
+    return None if row is None else (1, _latest(row))
+
+async def acollection_state(queryset, fields):
+    aggregates = await queryset.order_by().aaggregate(
+        count=Count('pk'), **{f'latest_{i}': Max(f) for i, f in enumerate(fields)})
+    latest = _latest(aggregates[f'latest_{i}'] for i in range(len(fields)))
+    return aggregates['count'], latest
+
+async def arow_state(queryset, fields):
+    row = await queryset.order_by().values_list(*fields).afirst()
+    return None if row is None else (1, _latest(row))
+
+def _validators(request, state):
+    count, latest = state
+    # The path (pagination, filters) and user (``me`` endpoints) are part of the representation.
+    fingerprint = f'{request.get_full_path()}|{request.user.pk}|{count}|{latest.isoformat() if latest else ""}'
+    etag = quote_etag(hashlib.md5(fingerprint.encode()).hexdigest())
+    last_modified = int(latest.timestamp()) if latest else None
+    return etag, last_modified
+
+def _stamp(response, etag, last_modified):
+    if response.status_code in (200, 304):
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        response['Cache-Control'] = 'private, no-cache'
+    return response
+
+def conditional_get(request, state, render):
+    """
+    Answer 304 if the client's validators match ``state``; otherwise call
+    ``render()`` and attach ETag / Last-Modified to its response.
+    """
+    if state is None:
+        return render()
+    etag, last_modified = _validators(request, state)
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = render()
+    return _stamp(response, etag, last_modified)
+
+async def aconditional_get(request, state, render):
+    """``conditional_get`` for async views; ``render`` is a coroutine function."""
+    if state is None:
+        return await render()
+    etag, last_modified = _validators(request, state)
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = await render()
+    return _stamp(response, etag, last_modified)
+
+class ConditionalGetMixin:
+    """Adds ETag / Last-Modified handling to ``list`` and ``retrieve``."""
+    conditional_fields = ('updated_at',)
+
+    def list(self, request, *args, **kwargs):
+        state = collection_state(self.filter_queryset(self.get_queryset()), self.conditional_fields)
+        return conditional_get(request, state, lambda: super(ConditionalGetMixin, self).list(
+            request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        queryset = self.filter_queryset(self.get_queryset()).filter(
+            **{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        return conditional_get(request, row_state(queryset, self.conditional_fields),
+                               lambda: super(ConditionalGetMixin, self).retrieve(request, *args, **kwargs))
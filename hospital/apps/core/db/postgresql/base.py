@@ -0,0 +1,136 @@
+"""
+PostgreSQL backend with optional connection pooling and connection stats.
+
+Without ``OPTIONS['pool']`` this is Django's backend plus counters of how
+often and how long it connects; with persistent connections (CONN_MAX_AGE)
+those should stay close to the number of worker threads. With
+``OPTIONS['pool']`` -- a dict of ``psycopg_pool.ConnectionPool`` arguments,
+psycopg 3 only -- connections are borrowed from a per-process pool and handed
+back whenever Django would close them, so CONN_MAX_AGE should be 0.
+
+Every process publishes its stats to a Redis hash at most every
+``PUBLISH_INTERVAL`` seconds so one endpoint can report all workers.
+"""
+import json
+import os
+import socket
+import threading
+import time
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.postgresql import base
+from django.db.backends.postgresql.psycopg_any import IsolationLevel, is_psycopg3
+
+STATS_KEY = 'db_pool_stats'
+PUBLISH_INTERVAL = 10
+STATS_MAX_AGE = 120
+
+_pools = {}
+_counters = {}
+_lock = threading.Lock()
+_last_published = 0.0
+
+def _pool_for(wrapper):
+    options = wrapper.settings_dict['OPTIONS'].get('pool')
+    if not options:
+        return None
+    with _lock:
+        if wrapper.alias not in _pools:
+            if not is_psycopg3:
+                raise ImproperlyConfigured("OPTIONS['pool'] requires psycopg 3: pip install 'psycopg[binary,pool]'")
+            from psycopg_pool import ConnectionPool
+            _pools[wrapper.alias] = ConnectionPool(
+                kwargs=wrapper.get_connection_params(), name=wrapper.alias, open=True,
+                check=ConnectionPool.check_connection, **options)
+        return _pools[wrapper.alias]
+
+def process_stats():
+    """Connection stats of this process, per database alias."""
+    stats = {}
+    for alias, counters in list(_counters.items()):
+        entry = {
+            'pooled': alias in _pools,
+            'checkouts': counters['checkouts'],
+            'avg_checkout_ms': round(counters['checkout_ms'] / counters['checkouts'], 2),
+        }
+        if alias in _pools:
+            pool = _pools[alias].get_stats()
+            entry.update(pool)
+            entry['in_use'] = pool.get('pool_size', 0) - pool.get('pool_available', 0)
+            if pool.get('connections_num'):
+                entry['avg_connect_ms'] = round(pool.get('connections_ms', 0) / pool['connections_num'], 2)
+        stats[alias] = entry
+    return stats
+
+def _worker_id():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+def publish():
+    from redis.exceptions import RedisError
+    from hospital.apps.core.redis import get_redis
+    client = get_redis()
+    if client is None:
+        return
+    try:
+        client.hset(STATS_KEY, _worker_id(), json.dumps({'updated': time.time(), 'databases': process_stats()}))
+        client.expire(STATS_KEY, STATS_MAX_AGE * 2)
+    except RedisError:
+        pass
+
+def collect_stats():
+    """Recently published stats of every worker, keyed by ``host:pid``."""
+    from redis.exceptions import RedisError
+    from hospital.apps.core.redis import get_redis
+    publish()
+    client = get_redis()
+    workers = {}
+    if client is not None:
+        try:
+            entries = client.hgetall(STATS_KEY)
+        except RedisError:
+            entries = {}
+        for worker, raw in entries.items():
+            data = json.loads(raw)
+            if time.time() - data['updated'] <= STATS_MAX_AGE:
+                workers[worker.decode()] = data
+    workers.setdefault(_worker_id(), {'updated': time.time(), 'databases': process_stats()})
+    return workers
+
+def _record(alias, seconds):
+    global _last_published
+    with _lock:
+        counters = _counters.setdefault(alias, {'checkouts': 0, 'checkout_ms': 0.0})
+        counters['checkouts'] += 1
+        counters['checkout_ms'] += seconds * 1000
+        due = time.monotonic() - _last_published >= PUBLISH_INTERVAL
+        if due:
+            _last_published = time.monotonic()
+    if due:
+        publish()
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        params.pop('pool', None)  # the stock backend passes every OPTIONS key to connect()
+        return params
+
+    def get_new_connection(self, conn_params):
+        started = time.monotonic()
+        pool = _pool_for(self)
+        if pool is None:
+            connection = super().get_new_connection(conn_params)
+        else:
+            connection = pool.getconn()
+            options = self.settings_dict['OPTIONS']
+            self.isolation_level = IsolationLevel(options.get('isolation_level', IsolationLevel.READ_COMMITTED))
+            if 'isolation_level' in options:
+                connection.isolation_level = self.isolation_level
+        _record(self.alias, time.monotonic() - started)
+        return connection
+
+    def _close(self):
+        pool = _pools.get(self.alias)
+        if pool is None or self.connection is None:
+            return super()._close()
+        with self.wrap_database_errors:
+            # rolls back anything left open and discards broken connections
+            pool.putconn(self.connection)
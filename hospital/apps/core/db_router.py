@@ -0,0 +1,90 @@
+"""
+Read-replica routing with read-your-writes stickiness.
+
+Reads go to the ``replica`` alias only inside ``replica_reads()`` -- views
+opt in through ``ReplicaReadMixin`` -- and only when that alias is
+configured. Every write is routed to ``default`` and, through
+``ReplicaStickinessMiddleware``, pins the writing user to ``default`` for
+``REPLICA_STICKY_SECONDS`` so their next reads see the change even while the
+replica lags. Reads inside a transaction on ``default`` never leave it.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework.permissions import SAFE_METHODS
+
+REPLICA_DB_ALIAS = 'replica'
+STICKY_SECONDS = getattr(settings, 'REPLICA_STICKY_SECONDS', 5)
+
+_use_replica = ContextVar('use_replica', default=False)
+# set per request by the middleware; the router flags it when something is written
+_request_writes = ContextVar('request_writes', default=None)
+
+def replica_configured():
+    return REPLICA_DB_ALIAS in connections.databases
+
+def _sticky_key(user_id):
+    return f'db_sticky:{user_id}'
+
+def is_sticky(user):
+    return bool(user and user.is_authenticated and cache.get(_sticky_key(user.pk)))
+
+def stick(user):
+    cache.set(_sticky_key(user.pk), 1, STICKY_SECONDS)
+
+@contextmanager
+def replica_reads(enabled=True):
+    token = _use_replica.set(enabled and replica_configured())
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+def start_request():
+    """Begin tracking writes for the current request; returns the flag holder."""
+    writes = {'wrote': False}
+    _request_writes.set(writes)
+    return writes
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if not _use_replica.get() or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        writes = _request_writes.get()
+        if writes is not None and writes['wrote']:
+            return None
+        return REPLICA_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        writes = _request_writes.get()
+        if writes is not None:
+            writes['wrote'] = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # the replica mirrors default, so objects from either may be related
+        return True
+
+class ReplicaReadMixin:
+    """
+    Serve the safe requests of ``replica_actions`` from the replica unless
+    the user wrote something within the last ``REPLICA_STICKY_SECONDS``.
+    For a plain APIView the action is the lower-cased method.
+    """
+    replica_actions = ('list', 'retrieve', 'export')
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        action = getattr(self, 'action', None) or request.method.lower()
+        use = (replica_configured() and request.method in SAFE_METHODS
+               and action in self.replica_actions and not is_sticky(request.user))
+        self._replica_token = _use_replica.set(use)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        token = getattr(self, '_replica_token', None)
+        if token is not None:
+            _use_replica.reset(token)
+            self._replica_token = None
+        return super().finalize_response(request, response, *args, **kwargs)
@@ -0,0 +1,220 @@
+"""
+Change events pushed to dashboards over Server-Sent Events.
+
+Writers ``publish`` compact events such as ``{"type": "appointment",
+"action": "updated", "id": 7, "status": "completed", ...}`` together with
+the doctor and patient profile ids they concern; they go out once the
+transaction commits, one PUBLISH each on the ``events`` Redis channel. Every
+ASGI process holds a single subscription to that channel on a background
+thread and hands each message to the streams open in that process whose user
+may see it -- admins everything, doctors and patients only their own rows,
+the scope of the viewsets' ``get_queryset`` -- so an open stream costs a
+bounded queue, not a Redis connection.
+
+A stream that falls ``QUEUE_SIZE`` events behind, or that may have missed
+some while Redis was unreachable, gets a single ``resync`` event instead and
+should refetch its lists. ``EVENTS_BACKEND = 'memory'`` replaces Redis with
+an in-process broker of the same interface, for tests and single-process
+development.
+"""
+import asyncio
+import json
+import logging
+import threading
+import time
+from functools import lru_cache
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from redis.exceptions import RedisError
+from .redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = 'events'
+STREAM_PATH = '/api/events/'
+QUEUE_SIZE = 100
+RECONNECT_DELAY = 1
+RESYNC = '{"type":"resync"}'
+END = object()
+
+def encode(event, doctors, patients):
+    """One pub/sub message: the audience on the first line, the event's JSON on the second."""
+    audience = json.dumps([sorted({d for d in doctors if d}), sorted({p for p in patients if p})])
+    return f"{audience}\n{json.dumps(event, cls=DjangoJSONEncoder, separators=(',', ':'))}"
+
+def publish(events):
+    """Send ``(event, doctor_ids, patient_ids)`` triples to subscribers once the current transaction commits."""
+    messages = [encode(*event) for event in events]
+    if messages:
+        broker = get_broker()
+        transaction.on_commit(lambda: broker.publish(messages))
+
+class Subscription:
+    """The queue of one open stream; fed from any thread, read on the stream's event loop."""
+    def __init__(self, broker, user):
+        self.broker = broker
+        self.is_admin, self.is_doctor, self.profile_id = user.is_admin(), user.is_doctor(), user.profile_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(QUEUE_SIZE)
+
+    def wants(self, doctors, patients):
+        if self.is_admin:
+            return True
+        return self.profile_id in (doctors if self.is_doctor else patients)
+
+    def put(self, data):
+        try:
+            self.loop.call_soon_threadsafe(self._put, data)
+        except RuntimeError:  # the loop has closed under a stream nobody ended
+            self.broker.unsubscribe(self)
+
+    def _put(self, data):
+        if self.queue.full():
+            # a client this far behind refetches instead of replaying the backlog
+            self._clear()
+            data = RESYNC
+        self.queue.put_nowait(data)
+
+    def _clear(self):
+        while not self.queue.empty():
+            self.queue.get_nowait()
+
+    def end(self):
+        """Make ``next`` return END, dropping anything still queued; call on the event loop."""
+        self._clear()
+        self.queue.put_nowait(END)
+
+    async def next(self, timeout):
+        """The next event's JSON, RESYNC or END; None after ``timeout`` quiet seconds."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+class MemoryBroker:
+    """In-process pub/sub: messages published here reach this process's subscriptions only."""
+    def __init__(self):
+        self._subscriptions = set()
+        self._lock = threading.Lock()
+
+    def publish(self, messages):
+        for message in messages:
+            self.dispatch(message)
+
+    def subscribe(self, user):
+        """Start receiving the events ``user`` may see; call from the stream's event loop."""
+        subscription = Subscription(self, user)
+        with self._lock:
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def dispatch(self, message):
+        if isinstance(message, bytes):
+            message = message.decode()
+        audience, data = message.split('\n', 1)
+        doctors, patients = json.loads(audience)
+        for subscription in self._current():
+            if subscription.wants(doctors, patients):
+                subscription.put(data)
+
+    def broadcast(self, data):
+        for subscription in self._current():
+            subscription.put(data)
+
+    def _current(self):
+        with self._lock:
+            return list(self._subscriptions)
+
+class RedisBroker(MemoryBroker):
+    """Publishes on the Redis channel and relays it to local subscriptions from one listener thread."""
+    def __init__(self):
+        super().__init__()
+        self._listener = None
+
+    def publish(self, messages):
+        client = get_redis()
+        if client is None:
+            return
+        try:
+            pipe = client.pipeline(transaction=False)
+            for message in messages:
+                pipe.publish(CHANNEL, message)
+            pipe.execute()
+        except RedisError:
+            logger.warning('Could not publish %d change event(s)', len(messages), exc_info=True)
+
+    def subscribe(self, user):
+        subscription = super().subscribe(user)
+        with self._lock:
+            if self._listener is None:
+                self._listener = threading.Thread(target=self._listen, name='events-listener', daemon=True)
+                self._listener.start()
+        return subscription
+
+    def _listen(self):
+        missed = False
+        while True:
+            client = get_redis()
+            if client is None:
+                return
+            try:
+                with client.pubsub(ignore_subscribe_messages=True) as pubsub:
+                    pubsub.subscribe(CHANNEL)
+                    if missed:
+                        self.broadcast(RESYNC)
+                        missed = False
+                    for message in pubsub.listen():
+                        self.dispatch(message['data'])
+            except RedisError:
+                logger.warning('Lost the %r subscription; reconnecting', CHANNEL, exc_info=True)
+                missed = True
+                time.sleep(RECONNECT_DELAY)
+
+@lru_cache(maxsize=None)
+def get_broker():
+    """This process's broker, chosen by ``EVENTS_BACKEND`` ('redis' or 'memory')."""
+    return MemoryBroker() if getattr(settings, 'EVENTS_BACKEND', 'redis') == 'memory' else RedisBroker()
+
+def close_on_disconnect(application):
+    """
+    ASGI middleware that ends open event streams when their client leaves.
+
+    Django 4.2 stops reading from the client once the request body is in, so
+    a stream would only notice a closed connection when a write fails, which
+    uvicorn never reports. For ``STREAM_PATH`` this keeps listening for
+    ``http.disconnect`` and then calls the functions the view put in
+    ``scope['events.on_disconnect']``.
+    """
+    async def app(scope, receive, send):
+        if scope['type'] != 'http' or not scope['path'].startswith(STREAM_PATH):
+            return await application(scope, receive, send)
+        callbacks = scope['events.on_disconnect'] = []
+        watcher = None
+
+        async def watch():
+            while (await receive())['type'] != 'http.disconnect':
+                pass
+            for callback in callbacks:
+                callback()
+
+        async def read_body():
+            nonlocal watcher
+            message = await receive()
+            if message['type'] == 'http.request' and not message.get('more_body') and watcher is None:
+                watcher = asyncio.ensure_future(watch())
+            return message
+
+        try:
+            await application(scope, read_body, send)
+        finally:
+            if watcher is not None:
+                watcher.cancel()
+    return app
@@ -0,0 +1,91 @@
+"""
+A read-only fast path for list/retrieve.
+
+``ValuesSerializer`` compiles a ModelSerializer's output shape once into
+``.values()`` lookups plus one accessor per field, reusing each DRF field's own
+``to_representation`` so the rendered JSON is byte-for-byte the same. Rows
+are then rendered in a single pass with no model instances, no nested
+serializer instances and no per-row field binding.
+"""
+from django.shortcuts import get_object_or_404
+from rest_framework import serializers
+from rest_framework.relations import RelatedField
+from rest_framework.response import Response
+
+def _plain(lookup, to_representation):
+    def accessor(row):
+        value = row[lookup]
+        return None if value is None else to_representation(value)
+    return accessor
+
+def _raw(lookup):
+    return lambda row: row[lookup]
+
+def _computed(lookups, func):
+    return lambda row: func(*[row[lookup] for lookup in lookups])
+
+def _nested(accessors):
+    def accessor(row):
+        return {name: get(row) for name, get in accessors}
+    return accessor
+
+class ValuesSerializer:
+    """
+    ``computed`` maps SerializerMethodField names to ``(lookups, func)``; func
+    is called with the looked-up values and must match the method's output.
+    """
+    def __init__(self, serializer_class, computed=None):
+        self.computed = computed or {}
+        self.lookups = []
+        self.accessors = self._compile(serializer_class(), prefix='')
+
+    def _lookup(self, lookup):
+        if lookup not in self.lookups:
+            self.lookups.append(lookup)
+        return lookup
+
+    def _compile(self, serializer, prefix):
+        accessors = []
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            if isinstance(field, serializers.SerializerMethodField):
+                lookups, func = self.computed[prefix + name]
+                accessor = _computed([self._lookup(l) for l in lookups], func)
+            elif isinstance(field, serializers.BaseSerializer):
+                accessor = _nested(self._compile(field, prefix + field.source + '__'))
+            elif isinstance(field, RelatedField):
+                # PrimaryKeyRelatedField: .values() already yields the pk
+                accessor = _raw(self._lookup(prefix + field.source))
+            else:
+                lookup = self._lookup(prefix + field.source.replace('.', '__'))
+                accessor = _plain(lookup, field.to_representation)
+            accessors.append((name, accessor))
+        return accessors
+
+    def to_representation(self, row):
+        return {name: get(row) for name, get in self.accessors}
+
+    def many(self, rows):
+        accessors = self.accessors
+        return [{name: get(row) for name, get in accessors} for row in rows]
+
+class FastReadMixin:
+    """
+    Serve ``list`` and ``retrieve`` from ``fast_serializer``. Only for viewsets
+    whose permissions have no object-level checks.
+    """
+    fast_serializer = None
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset()).values(*self.fast_serializer.lookups)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(self.fast_serializer.many(page))
+        return Response(self.fast_serializer.many(queryset))
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        queryset = self.filter_queryset(self.get_queryset()).values(*self.fast_serializer.lookups)
+        row = get_object_or_404(queryset, **{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        return Response(self.fast_serializer.to_representation(row))
@@ -0,0 +1,346 @@
+"""
+A small background job queue on the Redis we already run.
+
+Functions decorated with ``@job`` are enqueued by dotted name with JSON
+arguments and run by ``manage.py run_worker``. A job is pushed only once the
+surrounding transaction commits, so the worker always sees the rows it was
+enqueued for. Failing jobs are retried ``retries`` times with exponential
+backoff through the same sorted set that holds jobs enqueued with ``delay``;
+the return value (or the last traceback) is kept for ``JOBS_RESULT_TTL``
+seconds and read back with ``get_job``.
+
+A worker takes a job by moving its id (LMOVE/BLMOVE) onto its own
+processing list and drops it from there once the outcome is stored, and it
+keeps a heartbeat key alive while it runs. A worker that starts up puts the
+ids left on the lists of workers whose heartbeat has expired -- killed by the
+OOM killer, a deploy or SIGKILL mid-job -- back on their queues; such a
+death counts as a failed attempt.
+
+With ``JOBS_ALWAYS_EAGER``, or when Redis is unreachable, jobs run inline as
+they did before the queue existed. Everything takes an optional Redis
+``connection`` so a fakeredis client can stand in for the real one.
+"""
+import json
+import logging
+import threading
+import time
+import traceback
+import uuid
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections, connections, transaction
+from django.utils.module_loading import import_string
+from redis.exceptions import RedisError
+from .redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+QUEUE_KEY = 'jobs:queue:{}'
+JOB_KEY = 'jobs:job:{}'
+SCHEDULED_KEY = 'jobs:scheduled'
+PROCESSING_KEY = 'jobs:processing:{}'
+WORKER_KEY = 'jobs:worker:{}'
+WORKERS_KEY = 'jobs:workers'
+WORKER_TTL = 30
+DEFAULT_QUEUE = 'default'
+MAX_BACKOFF = 60 * 60
+
+RESULT_TTL = getattr(settings, 'JOBS_RESULT_TTL', 60 * 60 * 24)
+DEFAULT_RETRIES = getattr(settings, 'JOBS_DEFAULT_RETRIES', 3)
+RETRY_BACKOFF = getattr(settings, 'JOBS_RETRY_BACKOFF', 10)
+
+def job(func=None, *, queue=DEFAULT_QUEUE, retries=None):
+    """
+    Register ``func`` as a job; ``func.enqueue(*args, **kwargs)`` then runs
+    it on a worker. Calling ``func`` directly still runs it inline.
+    """
+    def decorator(func):
+        func.job_options = {'queue': queue, 'retries': DEFAULT_RETRIES if retries is None else retries}
+        func.enqueue = lambda *args, **kwargs: enqueue(func, args, kwargs)
+        return func
+    return decorator(func) if func is not None else decorator
+
+def job_name(func):
+    return f'{func.__module__}.{func.__qualname__}'
+
+def _always_eager():
+    return getattr(settings, 'JOBS_ALWAYS_EAGER', False)
+
+def _dumps(value):
+    return json.dumps(value, cls=DjangoJSONEncoder)
+
+def _text(value):
+    return value.decode() if isinstance(value, bytes) else value
+
+def backoff(attempt):
+    """Seconds to wait before retrying after failed attempt number ``attempt``."""
+    return min(RETRY_BACKOFF * 2 ** (attempt - 1), MAX_BACKOFF)
+
+def enqueue(func, args=(), kwargs=None, *, delay=None, queue=None, retries=None, connection=None):
+    """
+    Queue ``func(*args, **kwargs)`` -- to run no sooner than ``delay``
+    seconds from now -- when the current transaction commits; returns the job id.
+    """
+    options = func.job_options
+    job_id = uuid.uuid4().hex
+    fields = {
+        'name': job_name(func),
+        'args': _dumps(list(args)),
+        'kwargs': _dumps(kwargs or {}),
+        'queue': queue or options['queue'],
+        'retries': options['retries'] if retries is None else retries,
+        'attempts': 0,
+        'enqueued_at': time.time(),
+    }
+    connection = connection or get_redis()
+
+    def push():
+        if connection is not None and not _always_eager():
+            try:
+                _push(connection, job_id, fields, delay)
+                return
+            except RedisError:
+                logger.warning('Could not enqueue %s, running it inline', fields['name'], exc_info=True)
+        run_inline(connection, job_id, fields)
+
+    transaction.on_commit(push)
+    return job_id
+
+def _push(connection, job_id, fields, delay):
+    key = JOB_KEY.format(job_id)
+    with connection.pipeline() as pipe:
+        if delay:
+            pipe.hset(key, mapping={**fields, 'status': 'scheduled'})
+            pipe.zadd(SCHEDULED_KEY, {job_id: time.time() + delay})
+        else:
+            pipe.hset(key, mapping={**fields, 'status': 'queued'})
+            pipe.lpush(QUEUE_KEY.format(fields['queue']), job_id)
+        pipe.execute()
+
+def run_inline(connection, job_id, fields):
+    """Run a job in this process, storing its outcome when Redis is available."""
+    if connection is not None:
+        try:
+            connection.hset(JOB_KEY.format(job_id), mapping={**fields, 'status': 'running'})
+        except RedisError:
+            connection = None
+    if connection is None:
+        return _resolve(fields['name'])(*json.loads(fields['args']), **json.loads(fields['kwargs']))
+    return perform(connection, job_id, retry=False)
+
+def _resolve(name):
+    func = import_string(name)
+    if not hasattr(func, 'job_options'):
+        raise ValueError(f'{name} is not a registered job.')
+    return func
+
+def perform(connection, job_id, retry=True):
+    """Run a dequeued job and record its result, or reschedule it if it fails and has retries left."""
+    key = JOB_KEY.format(job_id)
+    data = {_text(name): _text(value) for name, value in connection.hgetall(key).items()}
+    if not data:
+        return None  # its record expired while it waited
+    attempts = connection.hincrby(key, 'attempts', 1)
+    connection.hset(key, mapping={'status': 'running', 'started_at': time.time()})
+    try:
+        func = _resolve(data['name'])
+        result = func(*json.loads(data['args']), **json.loads(data['kwargs']))
+    except Exception:
+        error = traceback.format_exc()
+        if retry and attempts <= int(data['retries']):
+            logger.warning('Job %s (%s) failed, retrying', job_id, data['name'], exc_info=True)
+            with connection.pipeline() as pipe:
+                pipe.hset(key, mapping={'status': 'scheduled', 'error': error})
+                pipe.zadd(SCHEDULED_KEY, {job_id: time.time() + backoff(attempts)})
+                pipe.execute()
+            return None
+        logger.exception('Job %s (%s) failed', job_id, data['name'])
+        _finish(connection, key, {'status': 'failed', 'error': error})
+        if not retry:
+            raise
+        return None
+    _finish(connection, key, {'status': 'finished', 'result': _dumps(result)})
+    return result
+
+def _finish(connection, key, fields):
+    with connection.pipeline() as pipe:
+        pipe.hset(key, mapping={**fields, 'ended_at': time.time()})
+        pipe.expire(key, RESULT_TTL)
+        pipe.execute()
+
+def get_job(job_id, connection=None):
+    """Status, attempts, result and error of a job, or None if it is unknown or expired."""
+    connection = connection or get_redis()
+    if connection is None:
+        return None
+    data = {_text(name): _text(value) for name, value in connection.hgetall(JOB_KEY.format(job_id)).items()}
+    if not data:
+        return None
+    return {
+        'id': job_id,
+        'name': data['name'],
+        'queue': data['queue'],
+        'status': data['status'],
+        'attempts': int(data['attempts']),
+        'result': json.loads(data['result']) if 'result' in data else None,
+        'error': data.get('error'),
+        **{name: float(data[name]) if name in data else None
+           for name in ('enqueued_at', 'started_at', 'ended_at')},
+    }
+
+def promote_scheduled(connection, limit=100):
+    """Move scheduled jobs that are due onto their queues; returns how many were moved."""
+    moved = 0
+    for job_id in connection.zrangebyscore(SCHEDULED_KEY, 0, time.time(), start=0, num=limit):
+        # only the worker whose ZREM succeeds pushes the job, so it runs once
+        if not connection.zrem(SCHEDULED_KEY, job_id):
+            continue
+        job_id = _text(job_id)
+        queue = connection.hget(JOB_KEY.format(job_id), 'queue')
+        if queue is None:
+            continue
+        with connection.pipeline() as pipe:
+            pipe.hset(JOB_KEY.format(job_id), 'status', 'queued')
+            pipe.lpush(QUEUE_KEY.format(_text(queue)), job_id)
+            pipe.execute()
+        moved += 1
+    return moved
+
+def requeue_orphans(connection, into):
+    """
+    Put the jobs dead workers were running back on their queues, passing
+    each id through the processing list ``into`` so that it is never lost;
+    returns how many were requeued.
+    """
+    requeued = 0
+    for worker_id in connection.smembers(WORKERS_KEY):
+        worker_id = _text(worker_id)
+        if connection.exists(WORKER_KEY.format(worker_id)):
+            continue
+        orphans = PROCESSING_KEY.format(worker_id)
+        # one LMOVE per id, so two workers starting together never take the same one
+        while (job_id := connection.lmove(orphans, into, 'RIGHT', 'LEFT')) is not None:
+            job_id = _text(job_id)
+            requeued += _requeue(connection, job_id)
+            connection.lrem(into, 1, job_id)
+        connection.srem(WORKERS_KEY, worker_id)
+    return requeued
+
+def _requeue(connection, job_id):
+    key = JOB_KEY.format(job_id)
+    data = {_text(name): _text(value) for name, value in connection.hgetall(key).items()}
+    if data.get('status') not in ('queued', 'running'):
+        return 0  # expired, or its outcome was stored before the worker died
+    if int(data['attempts']) > int(data['retries']):
+        logger.error('Job %s (%s) was running on a worker that died', job_id, data['name'])
+        _finish(connection, key, {'status': 'failed', 'error': 'The worker running this job died.'})
+        return 0
+    with connection.pipeline() as pipe:
+        pipe.hset(key, 'status', 'queued')
+        pipe.rpush(QUEUE_KEY.format(data['queue']), job_id)  # the end workers pop from: it runs next
+        pipe.execute()
+    return 1
+
+class Worker:
+    """
+    Runs jobs from ``queues`` (earlier queues first) on ``concurrency``
+    threads. ``stop()`` lets every thread finish its current job; with
+    ``burst`` the threads return once nothing is left to run now.
+
+    Redis has no blocking move from several lists, so an idle worker blocks
+    on its first queue only and looks at the others every ``poll_interval``
+    seconds.
+    """
+    def __init__(self, queues=(DEFAULT_QUEUE,), concurrency=1, burst=False, connection=None, poll_interval=1):
+        self.keys = [QUEUE_KEY.format(queue) for queue in queues]
+        self.concurrency = concurrency
+        self.burst = burst
+        self.connection = connection or get_redis()
+        self.poll_interval = poll_interval
+        self.id = uuid.uuid4().hex
+        self.processing = PROCESSING_KEY.format(self.id)
+        self.processed = 0
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        self.threads = []
+
+    def start(self):
+        try:
+            self.beat()
+            self.connection.sadd(WORKERS_KEY, self.id)
+            requeued = requeue_orphans(self.connection, self.processing)
+            if requeued:
+                logger.warning('Requeued %d job(s) left running by dead workers', requeued)
+        except RedisError:
+            logger.warning('Could not requeue the jobs of dead workers', exc_info=True)
+        self.threads = [threading.Thread(target=self._loop, name=f'job-worker-{n}', daemon=True)
+                        for n in range(self.concurrency)]
+        for thread in self.threads:
+            thread.start()
+
+    def alive(self):
+        return any(thread.is_alive() for thread in self.threads)
+
+    def stop(self):
+        self._stopping.set()
+
+    def beat(self):
+        """Tell workers starting up that this one is alive and its processing list is in use."""
+        self.connection.set(WORKER_KEY.format(self.id), 1, ex=WORKER_TTL)
+
+    def work(self):
+        """Run until stopped (or drained, in burst mode); returns the number of jobs run."""
+        self.start()
+        while self.alive():
+            try:
+                self.beat()
+            except RedisError:
+                pass  # the threads log the outage
+            for thread in self.threads:
+                thread.join(timeout=0.5)  # short waits keep the main thread responsive to signals
+        try:
+            # every job has finished, so the processing list is empty
+            with self.connection.pipeline() as pipe:
+                pipe.srem(WORKERS_KEY, self.id)
+                pipe.delete(WORKER_KEY.format(self.id), self.processing)
+                pipe.execute()
+        except RedisError:
+            pass  # the next worker to start cleans up after this one
+        return self.processed
+
+    def _next(self):
+        for key in self.keys:
+            job_id = self.connection.lmove(key, self.processing, 'RIGHT', 'LEFT')
+            if job_id is not None:
+                return _text(job_id)
+        if self.burst:
+            return None
+        job_id = self.connection.blmove(self.keys[0], self.processing, self.poll_interval, 'RIGHT', 'LEFT')
+        return _text(job_id) if job_id is not None else None
+
+    def _loop(self):
+        try:
+            while not self._stopping.is_set():
+                try:
+                    promote_scheduled(self.connection)
+                    job_id = self._next()
+                except RedisError:
+                    logger.warning('Job queue unavailable, retrying', exc_info=True)
+                    self._stopping.wait(self.poll_interval)
+                    continue
+                if job_id is None:
+                    if self.burst:
+                        return
+                    continue
+                close_old_connections()
+                try:
+                    perform(self.connection, job_id)
+                    self.connection.lrem(self.processing, 1, job_id)
+                except RedisError:
+                    logger.exception('Lost the outcome of job %s', job_id)
+                finally:
+                    close_old_connections()
+                with self._lock:
+                    self.processed += 1
+        finally:
+            connections.close_all()
@@ -0,0 +1,178 @@
+"""
+A small asyncio HTTP/1.1 load generator, so load tests need no third-party
+client. ``concurrency`` connections send requests back to back (reusing the
+connection when the server allows keep-alive) until ``requests`` have been
+sent; latencies include reconnects, as real clients would see them. When
+the server sends ``Server-Timing`` (METRICS_SERVER_TIMING), the DB queries it
+reports are averaged too. ``burst`` instead fires a set of requests at once.
+"""
+import asyncio
+import itertools
+import re
+import ssl
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+QUERIES = re.compile(r'desc="(\d+) queries"')
+
+class _Closed(Exception):
+    pass
+
+async def _request(reader, writer, host, method, path, headers, body):
+    lines = [f'{method} {path} HTTP/1.1', f'Host: {host}']
+    lines += [f'{name}: {value}' for name, value in headers.items()]
+    if body:
+        lines.append(f'Content-Length: {len(body)}')
+    writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body)
+    await writer.drain()
+
+    status_line = await reader.readline()
+    if not status_line:
+        raise _Closed()
+    status = int(status_line.split()[1])
+    length, chunked, close, queries = None, False, False, None
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        name, value = name.strip().lower(), value.strip().lower()
+        if name == 'content-length':
+            length = int(value)
+        elif name == 'transfer-encoding':
+            chunked = 'chunked' in value
+        elif name == 'connection':
+            close = value == 'close'
+        elif name == 'server-timing' and (match := QUERIES.search(value)):
+            queries = int(match.group(1))
+
+    if chunked:
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            await reader.readexactly(size + 2)  # chunk + CRLF
+            if size == 0:
+                break
+    elif length:
+        await reader.readexactly(length)
+    elif length is None and method != 'HEAD' and status not in (204, 304):
+        await reader.read()  # body runs until the server closes
+        close = True
+    return status, close, queries
+
+def percentile(values, fraction):
+    """``fraction`` percentile of already sorted ``values`` (nearest rank)."""
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+def summarize(latencies, statuses, errors, elapsed, queries=()):
+    latencies = sorted(latencies)
+    ms = lambda value: None if value is None else round(value * 1000, 2)
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'statuses': dict(sorted(statuses.items())),
+        'elapsed_s': round(elapsed, 3),
+        'rps': round(len(latencies) / elapsed, 1) if elapsed else None,
+        'p50_ms': ms(percentile(latencies, 0.50)),
+        'p95_ms': ms(percentile(latencies, 0.95)),
+        'p99_ms': ms(percentile(latencies, 0.99)),
+        'max_ms': ms(latencies[-1] if latencies else None),
+        'queries_per_request': round(sum(queries) / len(queries), 2) if queries else None,
+    }
+
+def _target(base_url):
+    url = urlsplit(base_url)
+    secure = url.scheme == 'https'
+    return (url.hostname, url.port or (443 if secure else 80), ssl.create_default_context() if secure else None,
+            url.netloc, url.path.rstrip('/'))
+
+async def run(base_url, paths, concurrency=50, requests=1000, headers=None, method='GET', body=b''):
+    """Spread ``requests`` round-robin over ``paths``; returns ``summarize()`` output."""
+    hostname, port, context, netloc, prefix = _target(base_url)
+    headers = {'Accept': 'application/json', **(headers or {})}
+
+    sent = itertools.count()
+    latencies, statuses, queries = [], Counter(), []
+    errors = 0
+
+    async def client():
+        nonlocal errors
+        connection = None
+        while (n := next(sent)) < requests:
+            path = prefix + paths[n % len(paths)]
+            started = time.perf_counter()
+            try:
+                if connection is None:
+                    connection = await asyncio.open_connection(hostname, port, ssl=context)
+                status, close, count = await _request(*connection, netloc, method, path, headers, body)
+            except (OSError, ValueError, asyncio.IncompleteReadError, _Closed):
+                errors += 1
+                close = True
+            else:
+                latencies.append(time.perf_counter() - started)
+                statuses[status] += 1
+                if count is not None:
+                    queries.append(count)
+            if close and connection is not None:
+                connection[1].close()
+                connection = None
+        if connection is not None:
+            connection[1].close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return summarize(latencies, statuses, errors, time.perf_counter() - started, queries)
+
+async def burst(base_url, requests):
+    """
+    Open a connection for each ``(method, path, headers, body)`` in
+    ``requests``, then send them all at the same moment, as a crowd does when
+    bookings open. Returns ``summarize()`` output and each request's status
+    (None if it failed to connect or got no response), in order.
+    """
+    hostname, port, context, netloc, prefix = _target(base_url)
+    go = asyncio.Event()
+    waiting = len(requests)
+    latencies, statuses, queries = [], Counter(), []
+    outcomes = [None] * len(requests)
+    errors = 0
+
+    def connected():
+        nonlocal waiting
+        waiting -= 1
+        if not waiting:
+            go.set()
+
+    async def client(n, method, path, headers, body):
+        nonlocal errors
+        try:
+            reader, writer = await asyncio.open_connection(hostname, port, ssl=context)
+        except OSError:
+            errors += 1
+            connected()
+            return
+        connected()
+        await go.wait()
+        started = time.perf_counter()
+        try:
+            status, _, count = await _request(reader, writer, netloc, method, prefix + path,
+                                              {'Accept': 'application/json', **headers}, body)
+        except (OSError, ValueError, asyncio.IncompleteReadError, _Closed):
+            errors += 1
+        else:
+            latencies.append(time.perf_counter() - started)
+            statuses[status] += 1
+            outcomes[n] = status
+            if count is not None:
+                queries.append(count)
+        finally:
+            writer.close()
+
+    clients = [asyncio.create_task(client(n, *request)) for n, request in enumerate(requests)]
+    if clients:
+        await go.wait()
+    started = time.perf_counter()
+    await asyncio.gather(*clients)
+    return summarize(latencies, statuses, errors, time.perf_counter() - started, queries), outcomes
@@ -0,0 +1,152 @@
+import asyncio
+import json
+import subprocess
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, urlopen
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import URLResolver, get_resolver
+from rest_framework.routers import APIRootView
+from hospital.apps.core import loadtest
+from hospital.apps.core.events import STREAM_PATH
+from hospital.apps.core.metrics import clean_route
+from .loadtest import login
+
+ROLES = ('admin', 'doctor', 'patient')
+COMPARED = ('rps', 'p50_ms', 'p95_ms', 'p99_ms', 'queries_per_request')
+
+def _walk(patterns, prefix=''):
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from _walk(pattern.url_patterns, prefix + str(pattern.pattern))
+        else:
+            yield prefix + str(pattern.pattern), pattern.callback
+
+def get_routes():
+    """
+    URL patterns of every GET endpoint in hospital/urls.py, minus the admin,
+    root, endless event stream and format-suffix variants.
+    """
+    routes = []
+    for raw, callback in _walk(get_resolver().url_patterns):
+        template = clean_route(raw)
+        if (template in ('/', STREAM_PATH) or template.startswith('/admin/') or '{format}' in template
+                or template in routes):
+            continue
+        actions = getattr(callback, 'actions', None)
+        view_class = getattr(callback, 'cls', None) or getattr(callback, 'view_class', None)
+        if actions is not None:
+            serves_get = 'get' in actions
+        elif view_class is not None:
+            serves_get = hasattr(view_class, 'get') and not issubclass(view_class, APIRootView)
+        else:
+            serves_get = True  # function views
+        if serves_get:
+            routes.append(template)
+    return routes
+
+def fetch(url, headers):
+    """(status, parsed JSON body or None) of a GET."""
+    try:
+        with urlopen(Request(url, headers={'Accept': 'application/json', **headers}), timeout=30) as response:
+            status, body = response.status, response.read()
+    except HTTPError as e:
+        return e.code, None
+    except URLError as e:
+        raise CommandError(f'{url}: {e.reason}')
+    try:
+        return status, json.loads(body)
+    except ValueError:
+        return status, None
+
+def fill(template, base_url, headers):
+    """``template`` with ``{pk}`` set to the first id its list endpoint shows this user, or None."""
+    if '{' not in template:
+        return template
+    if template.count('{') > 1 or '{pk}' not in template:
+        return None
+    _, data = fetch(base_url + template.split('{pk}')[0], headers)
+    rows = data.get('results') if isinstance(data, dict) else data
+    if not rows or not isinstance(rows, list):
+        return None
+    return template.replace('{pk}', str(rows[0]['id']))
+
+def current_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+class Command(BaseCommand):
+    help = ('Benchmark every GET route in hospital/urls.py with the JWT of each role allowed to use it '
+            'and report latency percentiles, throughput and DB queries per request as JSON')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help='Base URL of the server under test')
+        parser.add_argument('--prefix', default='bench', help='Username prefix used by seed_bench')
+        parser.add_argument('--password', default='bench-pass')
+        parser.add_argument('--concurrency', type=int, default=20)
+        parser.add_argument('--requests', type=int, default=500, help='Requests per route and role')
+        parser.add_argument('--route', action='append', dest='routes', help='Only routes containing this, repeatable')
+        parser.add_argument('--exclude', action='append', default=[], help='Skip routes containing this, repeatable')
+        parser.add_argument('--output', help='Write the JSON report here instead of stdout')
+        parser.add_argument('--compare', help='Earlier JSON report to print relative changes against')
+
+    def handle(self, *args, **options):
+        base_url = options['url'].rstrip('/')
+        tokens = {role: login(base_url, f"{options['prefix']}_{role}{'' if role == 'admin' else '_0'}",
+                              options['password'])
+                  for role in ROLES}
+        routes = [route for route in get_routes()
+                  if (not options['routes'] or any(part in route for part in options['routes']))
+                  and not any(part in route for part in options['exclude'])]
+
+        results = []
+        for route in routes:
+            for role, headers, path in self._targets(route, base_url, tokens):
+                summary = asyncio.run(loadtest.run(base_url, [path], options['concurrency'],
+                                                   options['requests'], headers))
+                results.append({'route': route, 'role': role, 'path': path, **summary})
+                self.stderr.write(f"{route} ({role}): {summary['rps']} req/s, p50 {summary['p50_ms']}ms, "
+                                  f"p95 {summary['p95_ms']}ms, p99 {summary['p99_ms']}ms, "
+                                  f"{summary['queries_per_request']} queries/request")
+
+        report = {'commit': current_commit(), 'url': base_url, 'concurrency': options['concurrency'],
+                  'requests': options['requests'], 'results': results}
+        if options['compare']:
+            self._compare(options['compare'], results)
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2)
+        else:
+            self.stdout.write(json.dumps(report, indent=2))
+
+    def _targets(self, route, base_url, tokens):
+        """(role, headers, path) to benchmark: anonymous if no login is needed, else every role allowed in."""
+        if '{' not in route and fetch(base_url + route, {})[0] < 400:
+            return [('anonymous', {}, route)]
+        targets = []
+        for role, token in tokens.items():
+            headers = {'Authorization': f'Bearer {token}'}
+            path = fill(route, base_url, headers)
+            if path is None:
+                self.stderr.write(f'{route} ({role}): skipped, no id to fill in')
+            elif fetch(base_url + path, headers)[0] < 400:
+                targets.append((role, headers, path))
+        return targets
+
+    def _compare(self, baseline_path, results):
+        try:
+            with open(baseline_path) as baseline_file:
+                baseline = {(row['route'], row['role']): row for row in json.load(baseline_file)['results']}
+        except (OSError, ValueError, KeyError) as e:
+            raise CommandError(f'Cannot read {baseline_path}: {e}')
+        for row in results:
+            old = baseline.get((row['route'], row['role']))
+            if old is None:
+                continue
+            changes = []
+            for name in COMPARED:
+                if old.get(name) and row.get(name) is not None:
+                    changes.append(f'{name} {old[name]} -> {row[name]} ({(row[name] / old[name] - 1) * 100:+.1f}%)')
+            self.stderr.write(f"{row['route']} ({row['role']}): {', '.join(changes)}")
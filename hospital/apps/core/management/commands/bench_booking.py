@@ -0,0 +1,122 @@
+import asyncio
+import json
+from datetime import timedelta
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, urlopen
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from hospital.apps.core import loadtest
+from .bench_api import fetch
+from .loadtest import login
+
+SEARCH_WINDOWS = 12  # slot searches of 31 days each
+
+def post(url, headers, data):
+    """Status of a JSON POST."""
+    request = Request(url, data=json.dumps(data).encode(), method='POST',
+                      headers={'Content-Type': 'application/json', 'Accept': 'application/json', **headers})
+    try:
+        with urlopen(request, timeout=30) as response:
+            return response.status
+    except HTTPError as e:
+        return e.code
+    except URLError as e:
+        raise CommandError(f'{url}: {e.reason}')
+
+class Command(BaseCommand):
+    help = ('Send many patients at the same free slots at once and check that each slot is booked exactly once, '
+            'no request fails with a 5xx and latency stays bounded')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help='Base URL of the server under test')
+        parser.add_argument('--prefix', default='bench', help='Username prefix used by seed_bench')
+        parser.add_argument('--password', default='bench-pass')
+        parser.add_argument('--patients', type=int, default=50, help='Simultaneous requests per slot')
+        parser.add_argument('--slots', type=int, default=10, help='Slots to fight over, one burst each')
+        parser.add_argument('--doctor', type=int, help='Doctor id (default: the first one listed)')
+        parser.add_argument('--days-ahead', type=int, default=30, help='Search free slots from this many days out')
+        parser.add_argument('--hold', action='store_true',
+                            help='Burst POST /api/appointments/hold/ instead, then book as the winner')
+        parser.add_argument('--max-p99-ms', type=float, help='Fail if a burst p99 exceeds this')
+        parser.add_argument('--output', help='Write the JSON report here instead of stdout')
+
+    def handle(self, *args, **options):
+        base_url = options['url'].rstrip('/')
+        tokens = [login(base_url, f"{options['prefix']}_patient_{n}", options['password'])
+                  for n in range(options['patients'])]
+        headers = [{'Authorization': f'Bearer {token}'} for token in tokens]
+        patients = []
+        for patient_headers in headers:
+            code, profile = fetch(base_url + '/api/patients/me/', patient_headers)
+            if code >= 400 or not profile:
+                raise CommandError(f'Cannot read the patient profile ({code}).')
+            patients.append(profile['id'])
+        doctor_id = options['doctor'] or self._first_doctor(base_url, headers[0])
+        free = self._free_slots(base_url, headers[0], doctor_id, options)
+
+        results, failures = [], []
+        for day, time in free:
+            slot = {'doctor': doctor_id, 'appointment_date': day, 'appointment_time': time}
+            summary, outcomes = asyncio.run(loadtest.burst(base_url, self._requests(slot, headers, patients, options)))
+            result = {'slot': f'{day} {time}', **summary}
+            winners = [n for n, code in enumerate(outcomes) if code == 201]
+            if options['hold'] and len(winners) == 1:
+                # the winner's hold is confirmed by booking; anyone else is turned away by it
+                loser = (winners[0] + 1) % len(patients)
+                result['confirmed'] = post(f'{base_url}/api/appointments/', headers[winners[0]],
+                                           {**slot, 'patient': patients[winners[0]]}) == 201
+                result['loser_rejected'] = len(patients) == 1 or post(
+                    f'{base_url}/api/appointments/', headers[loser], {**slot, 'patient': patients[loser]}) == 409
+                if not (result['confirmed'] and result['loser_rejected']):
+                    failures.append(f'{day} {time}: the hold was not honoured')
+            server_errors = sum(count for code, count in summary['statuses'].items() if code >= 500)
+            if len(winners) != 1:
+                failures.append(f'{day} {time}: {len(winners)} requests won the slot')
+            if server_errors or summary['errors']:
+                failures.append(f"{day} {time}: {server_errors} 5xx responses, {summary['errors']} connection errors")
+            if options['max_p99_ms'] and summary['p99_ms'] > options['max_p99_ms']:
+                failures.append(f"{day} {time}: p99 {summary['p99_ms']}ms over {options['max_p99_ms']}ms")
+            results.append(result)
+            self.stderr.write(f"{day} {time}: statuses {summary['statuses']}, p50 {summary['p50_ms']}ms, "
+                              f"p99 {summary['p99_ms']}ms, max {summary['max_ms']}ms")
+
+        report = {'url': base_url, 'doctor': doctor_id, 'patients': len(patients), 'hold': options['hold'],
+                  'max_p99_ms': max((row['p99_ms'] or 0 for row in results), default=None),
+                  'failures': failures, 'results': results}
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2)
+        else:
+            self.stdout.write(json.dumps(report, indent=2))
+        if failures:
+            raise CommandError('\n'.join(failures))
+
+    def _first_doctor(self, base_url, headers):
+        _, data = fetch(base_url + '/api/doctors/', headers)
+        rows = data.get('results') if isinstance(data, dict) else data
+        if not rows:
+            raise CommandError('No doctors to book; run seed_bench first.')
+        return rows[0]['id']
+
+    def _free_slots(self, base_url, headers, doctor_id, options):
+        """The first ``--slots`` free (date, time) pairs of the doctor from ``--days-ahead`` days out."""
+        start = timezone.now().date() + timedelta(days=options['days_ahead'])
+        free = []
+        for _ in range(SEARCH_WINDOWS):
+            end = start + timedelta(days=30)
+            code, data = fetch(f'{base_url}/api/doctors/{doctor_id}/slots/?from={start}&to={end}', headers)
+            if code >= 400 or not data:
+                raise CommandError(f'Cannot read the free slots of doctor {doctor_id} ({code}).')
+            free += [(day['date'], time) for day in data['days'] for time in day['free']]
+            if len(free) >= options['slots']:
+                return free[:options['slots']]
+            start = end + timedelta(days=1)
+        raise CommandError(f'Doctor {doctor_id} has fewer than {options["slots"]} free slots ahead.')
+
+    def _requests(self, slot, headers, patients, options):
+        json_headers = [{**patient_headers, 'Content-Type': 'application/json'} for patient_headers in headers]
+        if options['hold']:
+            body = json.dumps(slot).encode()
+            return [('POST', '/api/appointments/hold/', h, body) for h in json_headers]
+        return [('POST', '/api/appointments/', h, json.dumps({**slot, 'patient': patient, 'reason': 'Burst'}).encode())
+                for h, patient in zip(json_headers, patients)]
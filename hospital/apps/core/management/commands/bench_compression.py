@@ -0,0 +1,80 @@
+import json
+import time
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from hospital.apps.accounts.models import User
+from hospital.apps.core import compression
+from hospital.apps.core.renderers import ORJSONRenderer
+from .bench_serializers import best_of
+
+LIST_PAGES = ('/api/appointments/', '/api/patients/', '/api/doctors/', '/api/billing/', '/api/prescriptions/')
+ENCODINGS = ('identity', 'gzip', 'br')
+
+class Command(BaseCommand):
+    help = ('Measure bytes on the wire and CPU per request of typical list pages with each response coding, '
+            'and compare the stock DRF JSON renderer with the orjson one')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Username to request as (default: the first admin)')
+        parser.add_argument('--route', action='append', dest='routes', help='List page to measure, repeatable')
+        parser.add_argument('--requests', type=int, default=200, help='Requests per page and coding')
+        parser.add_argument('--repeat', type=int, default=50, help='Timing repeats for rendering and compressing')
+        parser.add_argument('--output', help='Also write the JSON report here')
+
+    def handle(self, *args, **options):
+        users = User.objects.filter(username=options['user']) if options['user'] \
+            else User.objects.filter(role=User.Role.ADMIN).order_by('id')
+        user = users.first()
+        if user is None:
+            raise CommandError('No such user; run seed_bench or pass --user.')
+        client = APIClient()
+        client.force_authenticate(user)
+        encodings = [coding for coding in ENCODINGS if coding != 'br' or compression.brotli is not None]
+        if 'br' not in encodings:
+            self.stderr.write('brotli is not installed; measuring gzip only.')
+
+        results, mismatches = [], []
+        for route in options['routes'] or LIST_PAGES:
+            response = client.get(route, HTTP_ACCEPT_ENCODING='identity')
+            if response.status_code != 200:
+                self.stderr.write(f'{route}: skipped, status {response.status_code}')
+                continue
+            data = response.data if hasattr(response, 'data') else json.loads(response.content)
+            stock_time, stock = best_of(options['repeat'], lambda: JSONRenderer().render(data))
+            orjson_time, fast = best_of(options['repeat'], lambda: ORJSONRenderer().encode(data))
+            if fast != stock:
+                mismatches.append(route)
+            result = {'route': route, 'bytes': len(stock), 'render_ms': {
+                'json': round(stock_time * 1000, 3), 'orjson': round(orjson_time * 1000, 3)}, 'codings': {}}
+            for coding in encodings:
+                result['codings'][coding] = self._measure(client, route, coding, fast, options)
+            results.append(result)
+            self.stdout.write(f"{route:<22} {len(stock):>7} B  render json {result['render_ms']['json']:7.3f} ms  "
+                              f"orjson {result['render_ms']['orjson']:7.3f} ms  "
+                              f"{'identical' if fast == stock else 'DIFFERENT'}")
+            for coding, row in result['codings'].items():
+                self.stdout.write(f"{'':<22} {coding:<8} {row['wire_bytes']:>7} B ({row['ratio']:5.1%})  "
+                                  f"compress {row['compress_ms']:7.3f} ms  cpu/request {row['cpu_ms']:7.3f} ms")
+
+        report = {'user': user.username, 'min_size': compression.MIN_SIZE, 'gzip_level': compression.GZIP_LEVEL,
+                  'brotli_quality': compression.BROTLI_QUALITY, 'requests': options['requests'], 'results': results}
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2)
+        if mismatches:
+            raise CommandError(f'orjson output differs from DRF for: {", ".join(mismatches)}')
+
+    def _measure(self, client, route, coding, content, options):
+        """Wire bytes and CPU of whole requests with Accept-Encoding ``coding``, and of compressing alone."""
+        if coding == 'identity':
+            compress_time = 0
+        else:
+            compress_time, _ = best_of(options['repeat'], lambda: compression.compress(content, coding))
+        started = time.process_time()
+        for _ in range(options['requests']):
+            response = client.get(route, HTTP_ACCEPT_ENCODING=coding)
+        cpu = (time.process_time() - started) / options['requests']
+        sent = response.get('Content-Encoding', 'identity')
+        return {'sent': sent, 'wire_bytes': len(response.content), 'ratio': len(response.content) / len(content),
+                'compress_ms': round(compress_time * 1000, 3), 'cpu_ms': round(cpu * 1000, 3)}
@@ -0,0 +1,60 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+from hospital.apps.appointments.models import Appointment
+from hospital.apps.appointments.serializers import AppointmentSerializer
+from hospital.apps.appointments.views import AppointmentViewSet
+from hospital.apps.doctors.models import Doctor
+from hospital.apps.doctors.serializers import DoctorSerializer
+from hospital.apps.doctors.views import DoctorViewSet
+from hospital.apps.patients.models import Patient
+from hospital.apps.patients.serializers import PatientSerializer
+from hospital.apps.patients.views import PatientViewSet
+
+CASES = [
+    ('appointments', lambda: Appointment.objects.select_related('doctor__user', 'patient__user'),
+     AppointmentSerializer, AppointmentViewSet.fast_serializer),
+    ('doctors', lambda: Doctor.objects.select_related('user'), DoctorSerializer, DoctorViewSet.fast_serializer),
+    ('patients', lambda: Patient.objects.select_related('user'), PatientSerializer, PatientViewSet.fast_serializer),
+]
+
+def best_of(repeat, func):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        output = func()
+        timings.append(time.perf_counter() - started)
+    return min(timings), output
+
+class Command(BaseCommand):
+    help = 'Compare the DRF serializers with the .values() fast read path (time and output bytes)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000, help='Rows per list')
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        renderer = JSONRenderer()
+        mismatches = []
+        rows = options['rows']
+        for label, queryset, serializer_class, fast in CASES:
+
+            def classic():
+                return renderer.render(serializer_class(queryset()[:rows], many=True).data)
+
+            def fast_path():
+                return renderer.render(fast.many(queryset().values(*fast.lookups)[:rows]))
+
+            classic_time, classic_bytes = best_of(options['repeat'], classic)
+            fast_time, fast_bytes = best_of(options['repeat'], fast_path)
+            identical = classic_bytes == fast_bytes
+            if not identical:
+                mismatches.append(label)
+            self.stdout.write(
+                f'{label:<13} serializer {classic_time * 1000:8.1f} ms   '
+                f'fast {fast_time * 1000:8.1f} ms   '
+                f'speedup {classic_time / fast_time if fast_time else 0:5.1f}x   '
+                f'{len(fast_bytes)} bytes   {"identical" if identical else "DIFFERENT"}'
+            )
+        if mismatches:
+            raise CommandError(f'Fast path output differs for: {", ".join(mismatches)}')
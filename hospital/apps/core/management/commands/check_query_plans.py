@@ -0,0 +1,70 @@
+import json
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from hospital.apps.appointments.models import Appointment
+from hospital.apps.billing.models import Invoice
+from hospital.apps.doctors.models import Doctor
+from hospital.apps.prescriptions.models import Prescription
+
+PAGE = 10
+
+def hot_queries():
+    """The list queries behind the role-scoped viewsets and the dashboard, as served in production."""
+    doctor_id = Appointment.objects.values_list('doctor_id', flat=True).first()
+    patient_id = Appointment.objects.values_list('patient_id', flat=True).first()
+    today = date.today()
+    month_start = today.replace(day=1)
+    return {
+        'appointments: patient page': Appointment.objects.filter(patient_id=patient_id)[:PAGE],
+        'appointments: doctor page': Appointment.objects.filter(doctor_id=doctor_id)[:PAGE],
+        'appointments: admin page': Appointment.objects.all()[:PAGE],
+        'appointments: pending by date': Appointment.objects.filter(
+            status=Appointment.Status.PENDING).order_by('appointment_date')[:PAGE],
+        'appointments: current month': Appointment.objects.filter(
+            appointment_date__gte=month_start, appointment_date__lte=today)[:PAGE],
+        'invoices: admin page': Invoice.objects.all()[:PAGE],
+        'invoices: paid page': Invoice.objects.filter(
+            payment_status=Invoice.PaymentStatus.PAID)[:PAGE],
+        'invoices: doctor page': Invoice.objects.filter(appointment__doctor_id=doctor_id)[:PAGE],
+        'invoices: patient page': Invoice.objects.filter(appointment__patient_id=patient_id)[:PAGE],
+        'prescriptions: patient page': Prescription.objects.filter(
+            appointment__patient_id=patient_id)[:PAGE],
+        'doctors: available by specialization': Doctor.objects.filter(
+            is_available=True, specialization=Doctor.Specialization.CARDIOLOGY)[:PAGE],
+    }
+
+def seq_scans(plan):
+    """Yield relation names of every Seq Scan node in a JSON plan tree."""
+    if plan.get('Node Type') == 'Seq Scan':
+        yield plan['Relation Name']
+    for child in plan.get('Plans', []):
+        yield from seq_scans(child)
+
+class Command(BaseCommand):
+    help = ('EXPLAIN the hot list queries and fail if any of them sequentially scans a large table. '
+            'Run against a seeded dataset.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--min-rows', type=int, default=10000,
+                            help='Ignore seq scans on tables estimated smaller than this')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Query plan checks need PostgreSQL.')
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT relname, reltuples FROM pg_class WHERE relkind = 'r'")
+            sizes = dict(cursor.fetchall())
+
+        failures = []
+        for label, queryset in hot_queries().items():
+            plan = json.loads(queryset.explain(format='json'))[0]['Plan']
+            large = sorted({t for t in seq_scans(plan) if sizes.get(t, 0) >= options['min_rows']})
+            if large:
+                failures.append(label)
+                self.stdout.write(self.style.ERROR(f'FAIL  {label}: seq scan on {", ".join(large)}'))
+            else:
+                self.stdout.write(self.style.SUCCESS(f'ok    {label}'))
+
+        if failures:
+            raise CommandError(f'{len(failures)} hot queries regressed to a sequential scan.')
@@ -0,0 +1,47 @@
+import asyncio
+import json
+from urllib.error import URLError
+from urllib.request import Request, urlopen
+from django.core.management.base import BaseCommand, CommandError
+from hospital.apps.core import loadtest
+
+DEFAULT_PATHS = ['/api/doctors/', '/api/doctors/available/']
+
+def login(base_url, username, password):
+    request = Request(base_url.rstrip('/') + '/api/auth/login/',
+                      data=json.dumps({'username': username, 'password': password}).encode(),
+                      headers={'Content-Type': 'application/json'})
+    try:
+        with urlopen(request, timeout=10) as response:
+            return json.load(response)['access']
+    except (URLError, KeyError, ValueError) as e:
+        raise CommandError(f'Login failed: {e}')
+
+class Command(BaseCommand):
+    help = 'Fire concurrent authenticated GETs at a running server and report throughput and latency percentiles'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help='Base URL of the server under test')
+        parser.add_argument('--path', action='append', dest='paths',
+                            help=f'Endpoint to request, repeatable (default: {" ".join(DEFAULT_PATHS)})')
+        parser.add_argument('--token', help='Access token to send')
+        parser.add_argument('--username', help='Log in as this user instead of passing --token')
+        parser.add_argument('--password')
+        parser.add_argument('--concurrency', type=int, default=50)
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--json', action='store_true', help='Print the summary as JSON')
+
+    def handle(self, *args, **options):
+        token = options['token']
+        if options['username']:
+            token = login(options['url'], options['username'], options['password'] or '')
+        headers = {'Authorization': f'Bearer {token}'} if token else {}
+        summary = asyncio.run(loadtest.run(options['url'], options['paths'] or DEFAULT_PATHS,
+                                           options['concurrency'], options['requests'], headers))
+        if options['json']:
+            self.stdout.write(json.dumps(summary))
+            return
+        self.stdout.write(
+            f"{summary['requests']} requests ({summary['errors']} errors) in {summary['elapsed_s']}s: "
+            f"{summary['rps']} req/s, p50 {summary['p50_ms']}ms, p95 {summary['p95_ms']}ms, "
+            f"p99 {summary['p99_ms']}ms, max {summary['max_ms']}ms, statuses {summary['statuses']}")
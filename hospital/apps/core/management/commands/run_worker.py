@@ -0,0 +1,26 @@
+import signal
+from django.core.management.base import BaseCommand, CommandError
+from hospital.apps.core.jobs import DEFAULT_QUEUE, Worker
+from hospital.apps.core.redis import get_redis
+
+class Command(BaseCommand):
+    help = 'Run background jobs from the Redis queues until stopped'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--queue', action='append', dest='queues',
+                            help=f'Queue to consume, repeatable, earlier ones first (default: {DEFAULT_QUEUE})')
+        parser.add_argument('--concurrency', type=int, default=1, help='Jobs run at the same time (threads)')
+        parser.add_argument('--burst', action='store_true',
+                            help='Exit once the queues are empty; jobs scheduled for later stay scheduled')
+
+    def handle(self, *args, **options):
+        connection = get_redis()
+        if connection is None:
+            raise CommandError('The job queue needs the default cache to be django-redis.')
+        queues = options['queues'] or [DEFAULT_QUEUE]
+        worker = Worker(queues, options['concurrency'], options['burst'], connection)
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *_: worker.stop())
+        self.stdout.write(f'Worker consuming {", ".join(queues)} with {options["concurrency"]} thread(s).')
+        processed = worker.work()
+        self.stdout.write(f'Stopped after {processed} jobs.')
@@ -0,0 +1,130 @@
+import random
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from hospital.apps.accounts.models import User
+from hospital.apps.appointments.models import Appointment
+from hospital.apps.appointments.slots import SLOT_TIMES
+from hospital.apps.billing.invoicing import price
+from hospital.apps.billing.models import Invoice
+from hospital.apps.core.bulk import insert
+from hospital.apps.dashboard import counters, rollups
+from hospital.apps.doctors.models import Doctor
+from hospital.apps.patients.models import Patient
+from hospital.apps.prescriptions.models import Prescription
+
+MEDICATIONS = ['Paracetamol', 'Amoxicillin', 'Ibuprofen', 'Metformin', 'Atorvastatin', 'Omeprazole']
+
+class Command(BaseCommand):
+    help = ('Bulk-insert a reproducible synthetic dataset for benchmarks, bypassing per-row signals, '
+            'then rebuild the dashboard counters and rollups')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--doctors', type=int, default=50)
+        parser.add_argument('--patients', type=int, default=2000)
+        parser.add_argument('--appointments', type=int, default=20000)
+        parser.add_argument('--days', type=int, default=365,
+                            help='Days the appointments span; two thirds lie in the past')
+        parser.add_argument('--invoiced', type=float, default=0.9, help='Fraction of completed appointments invoiced')
+        parser.add_argument('--paid', type=float, default=0.7, help='Fraction of invoices paid')
+        parser.add_argument('--prescribed', type=float, default=0.8,
+                            help='Fraction of completed appointments with a prescription')
+        parser.add_argument('--prefix', default='bench', help='Username prefix of the generated users')
+        parser.add_argument('--password', default='bench-pass', help='Password of every generated user')
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        prefix, batch_size = options['prefix'], options['batch_size']
+        if User.objects.filter(username__startswith=f'{prefix}_').exists():
+            raise CommandError(f'Users named {prefix}_* already exist; use another --prefix or a fresh database.')
+        capacity = options['doctors'] * options['days'] * len(SLOT_TIMES)
+        if options['appointments'] > capacity:
+            raise CommandError(f'At most {capacity} appointments fit into {options["days"]} days of '
+                               f'{options["doctors"]} doctors.')
+        rng = random.Random(options['seed'])
+        started = time.perf_counter()
+
+        with transaction.atomic():
+            # one hash for everyone: hashing per user would dominate the run
+            password = make_password(options['password'])
+            users = [User(username=f'{prefix}_admin', role=User.Role.ADMIN, password=password, is_staff=True)]
+            users += [User(username=f'{prefix}_doctor_{n}', first_name='Doctor', last_name=str(n),
+                           role=User.Role.DOCTOR, password=password) for n in range(options['doctors'])]
+            users += [User(username=f'{prefix}_patient_{n}', first_name='Patient', last_name=str(n),
+                           role=User.Role.PATIENT, password=password) for n in range(options['patients'])]
+            # bulk inserts skip the post_save receiver that creates profiles one query at a time
+            insert(User, users, batch_size)
+            user_ids = dict(User.objects.filter(username__startswith=f'{prefix}_').values_list('id', 'role'))
+
+            specializations = Doctor.Specialization.values
+            insert(Doctor, [
+                Doctor(user_id=user_id, specialization=rng.choice(specializations),
+                       license_number=f'{prefix.upper()}-{user_id:07d}', experience_years=rng.randint(0, 35),
+                       consultation_fee=Decimal(rng.randrange(200, 2000, 50)))
+                for user_id, role in sorted(user_ids.items()) if role == User.Role.DOCTOR], batch_size)
+            insert(Patient, [
+                Patient(user_id=user_id, blood_group=rng.choice(Patient.BloodGroup.values))
+                for user_id, role in sorted(user_ids.items()) if role == User.Role.PATIENT], batch_size)
+            fees = dict(Doctor.objects.filter(user_id__in=user_ids).order_by('id').values_list('id', 'consultation_fee'))
+            patients = list(Patient.objects.filter(user_id__in=user_ids).order_by('id').values_list('id', flat=True))
+            self.stdout.write(f'Created {len(user_ids)} users, {len(fees)} doctors and {len(patients)} patients.')
+
+            insert(Appointment, self._appointments(rng, list(fees), patients, options), batch_size)
+            appointments = Appointment.objects.filter(doctor_id__in=fees, status=Appointment.Status.COMPLETED) \
+                .order_by('id').values_list('id', 'doctor_id', 'appointment_date', 'appointment_time')
+            self.stdout.write(f'Created {options["appointments"]} appointments.')
+            invoices, prescriptions = self._follow_ups(rng, appointments, fees, options)
+            insert(Invoice, invoices, batch_size)
+            insert(Prescription, prescriptions, batch_size)
+            self.stdout.write(f'Created {len(invoices)} invoices and {len(prescriptions)} prescriptions.')
+
+            counters.rebuild()
+            rollups.rebuild()
+        self.stdout.write(f'Seeded and rebuilt dashboard stats in {time.perf_counter() - started:.1f}s. '
+                          f'Log in as {prefix}_admin, {prefix}_doctor_0 or {prefix}_patient_0.')
+
+    def _appointments(self, rng, doctors, patients, options):
+        today = timezone.now().date()
+        first_day = today - timedelta(days=options['days'] * 2 // 3)
+        slots = len(SLOT_TIMES)
+        times = [datetime.strptime(value, '%H:%M').time() for value in SLOT_TIMES]
+        # sampling distinct (day, doctor, slot) cells keeps the unique_together constraint satisfied
+        for cell in rng.sample(range(options['days'] * len(doctors) * slots), options['appointments']):
+            day, rest = divmod(cell, len(doctors) * slots)
+            doctor, slot = divmod(rest, slots)
+            appointment_date = first_day + timedelta(days=day)
+            if appointment_date < today:
+                status = rng.choices([Appointment.Status.COMPLETED, Appointment.Status.CANCELLED], [8, 2])[0]
+            else:
+                status = rng.choices([Appointment.Status.PENDING, Appointment.Status.CONFIRMED,
+                                      Appointment.Status.CANCELLED], [6, 3, 1])[0]
+            yield Appointment(doctor_id=doctors[doctor], patient_id=rng.choice(patients),
+                              appointment_date=appointment_date, appointment_time=times[slot],
+                              status=status, reason='Routine check-up')
+
+    def _follow_ups(self, rng, appointments, fees, options):
+        tax_rate, discount_rate = Decimal(str(settings.INVOICE_TAX_RATE)), Decimal(str(settings.INVOICE_DISCOUNT_RATE))
+        invoices, prescriptions = [], []
+        for appointment_id, doctor_id, appointment_date, appointment_time in appointments.iterator():
+            if rng.random() < options['invoiced']:
+                amount, tax, discount, total = price(fees[doctor_id], tax_rate, discount_rate)
+                invoice = Invoice(appointment_id=appointment_id, amount=amount, tax=tax, discount=discount,
+                                  total_amount=total)
+                if rng.random() < options['paid']:
+                    invoice.payment_status = Invoice.PaymentStatus.PAID
+                    invoice.payment_method = rng.choice(Invoice.PaymentMethod.values)
+                    paid_at = datetime.combine(appointment_date, appointment_time)
+                    invoice.paid_at = timezone.make_aware(paid_at) if settings.USE_TZ else paid_at
+                invoices.append(invoice)
+            if rng.random() < options['prescribed']:
+                prescriptions.append(Prescription(
+                    appointment_id=appointment_id, diagnosis='Synthetic diagnosis',
+                    medications=[{'name': rng.choice(MEDICATIONS), 'dosage': '500mg',
+                                  'frequency': 'twice a day', 'duration': '5 days'}]))
+        return invoices, prescriptions
@@ -0,0 +1,224 @@
+"""
+Low-overhead request metrics, aggregated across workers in Redis.
+
+``MetricsMiddleware`` times every request and labels it with its URL
+pattern (``/api/billing/{pk}/mark_paid/``), never the raw path. While the
+request runs, an execute wrapper counts its DB queries and their time, the
+cache client (``cache_client.MetricsCacheClient``) counts hits and misses and
+the JSON renderer times serialization.
+
+Each process adds to in-memory deltas and, at most every
+``METRICS_FLUSH_INTERVAL`` seconds, moves them into one Redis hash with
+HINCRBYFLOAT, so ``/metrics`` reports the totals of every worker in the
+Prometheus text format. Counters only reset if Redis loses the hash, which
+Prometheus treats like a restart.
+"""
+import re
+import threading
+import time
+from collections import defaultdict
+from contextlib import ExitStack
+from contextvars import ContextVar
+from functools import lru_cache
+from django.conf import settings
+from django.db import connections
+from redis.exceptions import RedisError
+from .redis import get_redis
+
+METRICS_KEY = 'metrics'
+FLUSH_INTERVAL = getattr(settings, 'METRICS_FLUSH_INTERVAL', 10)
+SERVER_TIMING = getattr(settings, 'METRICS_SERVER_TIMING', False)
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+# family -> (type, help)
+FAMILIES = {
+    'http_request_duration_seconds': ('histogram', 'Request latency by method, URL pattern and status.'),
+    'http_request_db_queries': ('histogram', 'DB queries per request by URL pattern.'),
+    'http_request_db_seconds_total': ('counter', 'Time spent in DB queries by URL pattern.'),
+    'http_request_render_seconds_total': ('counter', 'Time spent serializing response bodies by URL pattern.'),
+    'cache_requests_total': ('counter', 'Cache lookups by result (hit or miss).'),
+}
+
+_current = ContextVar('request_metrics', default=None)
+_pending = defaultdict(float)
+_lock = threading.Lock()
+_last_flush = time.monotonic()
+
+class RequestMetrics:
+    __slots__ = ('queries', 'db_seconds', 'render_seconds', 'cache_hits', 'cache_misses')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = self.render_seconds = 0.0
+        self.cache_hits = self.cache_misses = 0
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_seconds += time.perf_counter() - started
+            self.queries += 1
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def series(name, labels):
+    return name + '{' + ','.join(f'{label}="{_escape(value)}"' for label, value in labels) + '}'
+
+CACHE_HIT = series('cache_requests_total', (('result', 'hit'),))
+CACHE_MISS = series('cache_requests_total', (('result', 'miss'),))
+
+@lru_cache(maxsize=4096)
+def _histogram_series(name, labels, buckets):
+    return ([(bound, series(f'{name}_bucket', labels + (('le', bound),))) for bound in buckets]
+            + [(float('inf'), series(f'{name}_bucket', labels + (('le', '+Inf'),)))],
+            series(f'{name}_sum', labels), series(f'{name}_count', labels))
+
+def _histogram(pending, name, labels, value, buckets):
+    bucket_series, sum_series, count_series = _histogram_series(name, labels, buckets)
+    for bound, bucket in bucket_series:
+        if value <= bound:
+            pending[bucket] += 1
+    pending[sum_series] += value
+    pending[count_series] += 1
+
+@lru_cache(maxsize=512)
+def clean_route(route):
+    """URL pattern as a label: regex groups and converters become ``{name}``."""
+    route = re.sub(r'\(\?P<(\w+)>[^)]*\)', r'{\1}', route)   # regex groups (DRF routers)
+    route = re.sub(r'<(?:\w+:)?(\w+)>', r'{\1}', route)       # path() converters
+    route = route.replace('\\.', '.').replace('/?', '/').replace('^', '')
+    return '/' + route.replace('$', '')
+
+def route_label(request):
+    match = getattr(request, 'resolver_match', None)
+    return clean_route(match.route) if match is not None else 'unmatched'
+
+def record_render(seconds):
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.render_seconds += seconds
+
+def record_cache(hits, misses):
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.cache_hits += hits
+        metrics.cache_misses += misses
+    else:
+        with _lock:
+            _pending[CACHE_HIT] += hits
+            _pending[CACHE_MISS] += misses
+
+@lru_cache(maxsize=1024)
+def _route_series(route):
+    labels = (('route', route),)
+    return labels, series('http_request_db_seconds_total', labels), series('http_request_render_seconds_total', labels)
+
+def record_request(method, route, status, seconds, metrics):
+    global _last_flush
+    labels, db_series, render_series = _route_series(route)
+    with _lock:
+        _histogram(_pending, 'http_request_duration_seconds',
+                   (('method', method), ('route', route), ('status', status)), seconds, DURATION_BUCKETS)
+        _histogram(_pending, 'http_request_db_queries', labels, metrics.queries, QUERY_BUCKETS)
+        _pending[db_series] += metrics.db_seconds
+        _pending[render_series] += metrics.render_seconds
+        _pending[CACHE_HIT] += metrics.cache_hits
+        _pending[CACHE_MISS] += metrics.cache_misses
+        due = time.monotonic() - _last_flush >= FLUSH_INTERVAL
+        if due:
+            _last_flush = time.monotonic()
+    if due:
+        flush()
+
+def flush(client=None):
+    """Move this process's deltas into the shared hash; they are kept for the next try if Redis fails."""
+    global _pending
+    client = client or get_redis()
+    if client is None:
+        return
+    with _lock:
+        deltas, _pending = _pending, defaultdict(float)
+    if not deltas:
+        return
+    try:
+        with client.pipeline(transaction=False) as pipe:
+            for name, value in deltas.items():
+                if value:
+                    pipe.hincrbyfloat(METRICS_KEY, name, value)
+            pipe.execute()
+    except RedisError:
+        with _lock:
+            for name, value in deltas.items():
+                _pending[name] += value
+
+def _family(name):
+    base = name.split('{', 1)[0]
+    for suffix in ('_bucket', '_sum', '_count'):
+        if base.endswith(suffix) and base[:-len(suffix)] in FAMILIES:
+            return base[:-len(suffix)]
+    return base
+
+def _sort_key(name):
+    # keeps each histogram's buckets in ascending order, then _sum and _count
+    labels = name.split('{', 1)[1] if '{' in name else ''
+    le = re.search(r',?le="([^"]+)"', labels)
+    bound = float(le.group(1)) if le else 0.0
+    return _family(name), re.sub(r',?le="[^"]+"', '', labels), name.split('{', 1)[0], bound
+
+def _number(value):
+    number = float(value)
+    return str(int(number)) if number.is_integer() else repr(number)
+
+def collect(client=None):
+    """All workers' totals as ``{series: value}``; only this process's when Redis is unavailable."""
+    client = client or get_redis()
+    flush(client)
+    if client is None:
+        with _lock:
+            return dict(_pending)
+    try:
+        return {name.decode(): float(value) for name, value in client.hgetall(METRICS_KEY).items()}
+    except RedisError:
+        with _lock:
+            return dict(_pending)
+
+def render(values):
+    """Prometheus text exposition of ``collect()`` output."""
+    lines, family = [], None
+    for name in sorted(values, key=_sort_key):
+        if _family(name) != family:
+            family = _family(name)
+            kind, help_text = FAMILIES.get(family, ('untyped', ''))
+            lines += [f'# HELP {family} {help_text}', f'# TYPE {family} {kind}']
+        lines.append(f'{name} {_number(values[name])}')
+    return '\n'.join(lines) + '\n'
+
+def server_timing(metrics, seconds):
+    return (f'db;dur={metrics.db_seconds * 1000:.1f};desc="{metrics.queries} queries", '
+            f'render;dur={metrics.render_seconds * 1000:.1f}, total;dur={seconds * 1000:.1f}')
+
+class MetricsMiddleware:
+    """Records latency, DB and cache usage and render time of each request under its URL pattern."""
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(metrics.execute_wrapper))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        seconds = time.perf_counter() - started
+        record_request(request.method, route_label(request), response.status_code, seconds, metrics)
+        if SERVER_TIMING:
+            response['Server-Timing'] = server_timing(metrics, seconds)
+        return response
@@ -0,0 +1,15 @@
+from . import db_router
+
+class ReplicaStickinessMiddleware:
+    """Pins a user to the primary database for a few seconds after one of their requests wrote to it."""
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        writes = db_router.start_request()
+        response = self.get_response(request)
+        # DRF copies the authenticated user onto the underlying request
+        user = getattr(request, 'user', None)
+        if writes['wrote'] and db_router.replica_configured() and user is not None and user.is_authenticated:
+            db_router.stick(user)
+        return response
@@ -0,0 +1,125 @@
+import base64
+import json
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+class KeysetPagination(PageNumberPagination):
+    """
+    Page-number pagination unless the client opts in to keyset paging with
+    ``?cursor=`` (empty for the first page). Keyset pages follow the model's
+    ``Meta.ordering`` with ``id`` as a tie-breaker, so every page is a single
+    index range scan with no OFFSET and no COUNT(*). A total is only computed
+    when ``?count=true`` is also passed. Ordering fields must be non-null.
+    Set ``keyset_only`` to always page by keyset.
+    """
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    keyset_only = False
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = self.keyset_only or self.cursor_query_param in request.query_params
+        if not self.keyset:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(queryset)
+        position, reverse = self.decode_cursor(request, queryset.model)
+        self.count = None
+        if request.query_params.get(self.count_query_param) in ('1', 'true'):
+            self.count = queryset.count()
+
+        if position is not None:
+            queryset = queryset.filter(self.after(position, reverse))
+        order_by = [('-' if desc != reverse else '') + name for name, desc in self.ordering]
+        rows = list(queryset.order_by(*order_by)[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+        self.has_next = has_more if not reverse else True
+        self.has_previous = position is not None and (has_more if reverse else True)
+        self.rows = rows
+        return rows
+
+    def get_ordering(self, queryset):
+        """Meta.ordering plus an ``id`` tie-breaker, as ``(field, descending)`` pairs."""
+        ordering = list(queryset.query.order_by or queryset.model._meta.ordering or ['-id'])
+        fields = [(f.lstrip('-'), f.startswith('-')) for f in ordering]
+        if 'id' not in [name for name, _ in fields] and 'pk' not in [name for name, _ in fields]:
+            fields.append(('id', fields[0][1]))
+        return fields
+
+    def after(self, position, reverse):
+        """Rows strictly after ``position`` in (possibly reversed) ordering order."""
+        condition = Q()
+        equal = {}
+        for (name, desc), value in zip(self.ordering, position):
+            lookup = 'lt' if desc != reverse else 'gt'
+            condition |= Q(**equal, **{f'{name}__{lookup}': value})
+            equal[name] = value
+        return condition
+
+    def decode_cursor(self, request, model):
+        """``(position, reverse)`` of the cursor, its values coerced to the ordering fields' types."""
+        raw = request.query_params.get(self.cursor_query_param)
+        if not raw:
+            return None, False
+        try:
+            padded = raw + '=' * (-len(raw) % 4)
+            data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            position, reverse = data['p'], bool(data.get('r'))
+            if not isinstance(position, list) or len(position) != len(self.ordering):
+                raise ValueError
+            position = [self.field(model, name).to_python(value) for (name, _), value in zip(self.ordering, position)]
+            if None in position:
+                raise ValueError
+        except (ValueError, KeyError, TypeError, ValidationError):
+            raise NotFound('Invalid cursor.')
+        return position, reverse
+
+    @staticmethod
+    def field(model, name):
+        """The model field an ordering name such as ``user__last_name`` refers to."""
+        *relations, name = name.split('__')
+        for relation in relations:
+            model = model._meta.get_field(relation).related_model
+        return model._meta.get_field('id' if name == 'pk' else name)
+
+    def encode_cursor(self, row, reverse):
+        position = [self.value(row, name) for name, _ in self.ordering]
+        data = json.dumps({'p': position, 'r': int(reverse)}, separators=(',', ':'), default=str)
+        encoded = base64.urlsafe_b64encode(data.encode()).decode().rstrip('=')
+        url = remove_query_param(self.request.build_absolute_uri(), self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, encoded)
+
+    @staticmethod
+    def value(row, name):
+        value = row[name] if isinstance(row, dict) else getattr(row, name)
+        return value.isoformat() if hasattr(value, 'isoformat') else value
+
+    def get_next_link(self):
+        if not self.keyset:
+            return super().get_next_link()
+        if not self.has_next or not self.rows:
+            return None
+        return self.encode_cursor(self.rows[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.keyset:
+            return super().get_previous_link()
+        if not self.has_previous or not self.rows:
+            return None
+        return self.encode_cursor(self.rows[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+        body = {'next': self.get_next_link(), 'previous': self.get_previous_link(), 'results': data}
+        if self.count is not None:
+            body = {'count': self.count, **body}
+        return Response(body)
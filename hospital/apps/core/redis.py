@@ -0,0 +1,8 @@
+from django_redis import get_redis_connection
+
+def get_redis():
+    """Raw client behind the default cache, or None when the cache isn't django-redis."""
+    try:
+        return get_redis_connection('default')
+    except NotImplementedError:
+        return None
@@ -0,0 +1,56 @@
+import codecs
+import time
+import orjson
+from rest_framework import parsers, renderers
+from rest_framework.exceptions import ParseError
+from rest_framework.utils.encoders import JSONEncoder
+from . import metrics
+
+# datetimes go to DRF's encoder as well, which trims microseconds to milliseconds and writes UTC as 'Z'
+ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+class JSONRenderer(renderers.JSONRenderer):
+    """DRF's JSON renderer, timed for the serialization metric."""
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        started = time.perf_counter()
+        try:
+            return self.encode(data, accepted_media_type, renderer_context)
+        finally:
+            metrics.record_render(time.perf_counter() - started)
+
+    def encode(self, data, accepted_media_type=None, renderer_context=None):
+        return super().render(data, accepted_media_type, renderer_context)
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    ``JSONRenderer`` encoding with orjson: the same bytes, several times
+    faster. Anything orjson has no native form for (Decimal, datetimes, lazy
+    strings, querysets, ...) is handed to DRF's encoder. Indented (browsable
+    API) and ASCII-only output still go through ``json``.
+    """
+    default = JSONEncoder().default
+
+    def encode(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if (self.ensure_ascii or not self.compact
+                or self.get_indent(accepted_media_type, renderer_context or {}) is not None):
+            return super().encode(data, accepted_media_type, renderer_context)
+        ret = orjson.dumps(data, default=self.default, option=ORJSON_OPTIONS)
+        # same strict javascript subset as DRF's renderer
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+class ORJSONParser(parsers.JSONParser):
+    """DRF's JSON parser with orjson decoding UTF-8 bodies; NaN and Infinity are rejected as in strict mode."""
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding', 'utf-8')
+        if not self.strict or codecs.lookup(encoding).name != 'utf-8':
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
@@ -0,0 +1,60 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponseNotAllowed, StreamingHttpResponse
+from rest_framework import exceptions
+from .asyncviews import authenticator, error_response, json_response
+from .events import END, get_broker
+
+HEARTBEAT = getattr(settings, 'EVENTS_HEARTBEAT', 15)
+STREAM_SECONDS = getattr(settings, 'EVENTS_STREAM_SECONDS', 300)
+RETRY_MS = 3000
+
+def _user(request):
+    # EventSource cannot set headers, so the access token may come as ?token= instead
+    token = request.GET.get('token')
+    if token is None:
+        result = authenticator.authenticate(request)
+        if result is None:
+            raise exceptions.NotAuthenticated()
+        return result[0]
+    return authenticator.get_user(authenticator.get_validated_token(token.encode()))
+
+async def _stream(user, on_disconnect):
+    subscription = get_broker().subscribe(user)
+    on_disconnect.append(subscription.end)
+    # ends after STREAM_SECONDS so the browser reconnects and the token is checked again
+    deadline = subscription.loop.time() + STREAM_SECONDS
+    try:
+        yield f'retry: {RETRY_MS}\n\n'
+        while (left := deadline - subscription.loop.time()) > 0:
+            data = await subscription.next(min(HEARTBEAT, left))
+            if data is END:
+                return
+            if data is None:
+                yield ': ping\n\n'
+            else:
+                yield f'data: {data}\n\n'
+    finally:
+        subscription.close()
+
+async def events(request):
+    """
+    Server-Sent Events stream of the appointment and invoice changes the user
+    may see (see core/events.py); each ``data:`` line is one JSON event.
+    """
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+    if not isinstance(request, ASGIRequest):
+        # the WSGI handler would buffer the whole, endless, stream
+        return json_response({'error': 'Event streams are only served over ASGI (hospital.asgi).'}, status=503)
+    try:
+        user = await sync_to_async(_user)(request)
+    except exceptions.APIException as exc:
+        return error_response(exc)
+
+    response = StreamingHttpResponse(_stream(user, request.scope.get('events.on_disconnect', [])),
+                                     content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,35 @@
+from django.db.models.signals import post_init, pre_save
+
+# model -> set of attnames whose loaded values are remembered
+_tracked = {}
+
+def track(model, *fields):
+    """
+    Remember the values ``fields`` had when an instance was loaded, so that
+    post_save/post_delete receivers can tell what a save actually changed.
+    Several modules may track different fields on the same model.
+    """
+    if model not in _tracked:
+        _tracked[model] = set()
+        post_init.connect(_snapshot, sender=model, weak=False)
+        pre_save.connect(_rotate, sender=model, weak=False)
+    _tracked[model].update(fields)
+
+def _values(sender, instance):
+    return {f: instance.__dict__.get(f) for f in _tracked[sender]}
+
+def _snapshot(sender, instance, **kwargs):
+    instance._loaded_values = _values(sender, instance)
+
+def _rotate(sender, instance, **kwargs):
+    # Runs once per save, so repeated saves of the same instance diff correctly.
+    instance._previous_values = {} if instance._state.adding else instance._loaded_values
+    instance._loaded_values = _values(sender, instance)
+
+def previous_values(instance):
+    """Values before the current save; empty for a freshly created row."""
+    return getattr(instance, '_previous_values', {})
+
+def loaded_values(instance):
+    """Values as last read from or written to the database."""
+    return getattr(instance, '_loaded_values', {})
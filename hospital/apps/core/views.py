@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.http import require_GET
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from hospital.apps.accounts.permissions import IsAdmin
+from . import metrics
+from .jobs import get_job
+
+class JobView(APIView):
+    """Status and result of a background job."""
+    permission_classes = [IsAdmin]
+
+    def get(self, request, job_id):
+        data = get_job(job_id)
+        if data is None:
+            return Response({'error': 'Unknown or expired job.'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(data)
+
+@require_GET
+def metrics_view(request):
+    """Prometheus metrics of all workers; needs ``Authorization: Bearer <METRICS_TOKEN>`` when that is set."""
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token and not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponse(status=status.HTTP_401_UNAUTHORIZED)
+    return HttpResponse(metrics.render(metrics.collect()), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,8 @@
+from django.apps import AppConfig
+
+class DashboardConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'hospital.apps.dashboard'
+
+    def ready(self):
+        import hospital.apps.dashboard.signals
@@ -0,0 +1,8 @@
+from hospital.apps.accounts.permissions import IsAdmin
+from hospital.apps.core.asyncviews import async_api, json_response
+from hospital.apps.core.cache import aget_or_compute
+from .views import CACHE_TIMEOUT, DASHBOARD_CACHE_KEY, DashboardView
+
+@async_api(DashboardView.as_view(), [IsAdmin], replica=True)
+async def dashboard(request):
+    return json_response(await aget_or_compute(DASHBOARD_CACHE_KEY, DashboardView.compute_stats, CACHE_TIMEOUT))
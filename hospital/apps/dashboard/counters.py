@@ -0,0 +1,83 @@
+"""
+Materialized dashboard statistics.
+
+Every counter is the sum of per-row contributions; a save adds the row's new
+contribution and subtracts its old one, so reads never touch the source tables.
+"""
+from collections import Counter
+from django.db import transaction
+from django.db.models import Case, Count, DecimalField, F, Sum, Value, When
+from django.db.models.functions import ExtractMonth, ExtractYear
+from hospital.apps.accounts.models import User
+from hospital.apps.appointments.models import Appointment
+from hospital.apps.billing.models import Invoice
+from hospital.apps.core.jobs import job
+from .models import StatCounter
+
+def month_key(year, month):
+    return f'appointments_month:{year:04d}-{month:02d}'
+
+def user_contribution(role):
+    return {
+        User.Role.DOCTOR: Counter(total_doctors=1),
+        User.Role.PATIENT: Counter(total_patients=1),
+    }.get(role, Counter())
+
+def appointment_contribution(status, appointment_date):
+    if status is None or appointment_date is None:
+        return Counter()
+    return Counter({
+        'total_appointments': 1,
+        f'appointments_{status}': 1,
+        month_key(appointment_date.year, appointment_date.month): 1,
+    })
+
+def invoice_contribution(payment_status, total_amount):
+    if payment_status == Invoice.PaymentStatus.PAID and total_amount:
+        return Counter(total_revenue=total_amount)
+    return Counter()
+
+def delta(new, old):
+    result = Counter(new)
+    result.subtract(old)
+    return {name: value for name, value in result.items() if value}
+
+def apply(deltas):
+    """Atomically add each delta to its counter in two queries, creating missing counters."""
+    if not deltas:
+        return
+    StatCounter.objects.bulk_create(
+        [StatCounter(name=name) for name in deltas], ignore_conflicts=True)
+    StatCounter.objects.filter(name__in=list(deltas)).update(value=F('value') + Case(
+        *[When(name=name, then=Value(value)) for name, value in deltas.items()],
+        default=Value(0), output_field=DecimalField(max_digits=14, decimal_places=2),
+    ))
+
+def read(names):
+    values = dict(StatCounter.objects.filter(name__in=names).values_list('name', 'value'))
+    return {name: values.get(name, 0) for name in names}
+
+@job
+@transaction.atomic
+def rebuild():
+    """Recompute every counter from the source tables."""
+    totals = Counter()
+    for role, n in User.objects.values_list('role').annotate(n=Count('id')).order_by():
+        for name, value in user_contribution(role).items():
+            totals[name] += value * n
+    for status, n in Appointment.objects.values_list('status').annotate(n=Count('id')).order_by():
+        totals['total_appointments'] += n
+        totals[f'appointments_{status}'] += n
+    months = Appointment.objects.annotate(
+        year=ExtractYear('appointment_date'), month=ExtractMonth('appointment_date'),
+    ).values_list('year', 'month').annotate(n=Count('id')).order_by()
+    for year, month, n in months:
+        totals[month_key(year, month)] += n
+    totals['total_revenue'] = Invoice.objects.filter(
+        payment_status=Invoice.PaymentStatus.PAID
+    ).aggregate(total=Sum('total_amount'))['total'] or 0
+
+    StatCounter.objects.all().delete()
+    StatCounter.objects.bulk_create(
+        StatCounter(name=name, value=value) for name, value in totals.items())
+    return dict(totals)
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from hospital.apps.dashboard import counters, rollups
+
+class Command(BaseCommand):
+    help = 'Recompute the materialized dashboard counters and analytics rollups from scratch'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--background', action='store_true', help='Enqueue the rebuild for run_worker')
+
+    def handle(self, *args, **options):
+        if options['background']:
+            job_ids = [counters.rebuild.enqueue(), rollups.rebuild.enqueue()]
+            self.stdout.write(f'Enqueued dashboard rebuild as jobs {", ".join(job_ids)}.')
+            return
+        totals = counters.rebuild()
+        self.stdout.write(f'Rebuilt {len(totals)} dashboard counters.')
+        rows = rollups.rebuild()
+        self.stdout.write(f'Rebuilt {rows["appointment_rollups"]} appointment and '
+                          f'{rows["revenue_rollups"]} revenue rollup rows.')
@@ -0,0 +1,48 @@
+# Generated by Django 4.2.30 on 2026-10-18 12:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doctors', '0004_doctor_updated_at'),
+        ('dashboard', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RevenueRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('specialization', models.CharField(max_length=50)),
+                ('payment_method', models.CharField(max_length=15)),
+                ('count', models.IntegerField(default=0)),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('doctor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='doctors.doctor')),
+            ],
+            options={
+                'ordering': ['date'],
+                'indexes': [models.Index(fields=['date', 'specialization'], name='rev_rollup_date_spec_idx')],
+                'unique_together': {('date', 'doctor', 'payment_method')},
+            },
+        ),
+        migrations.CreateModel(
+            name='AppointmentRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('specialization', models.CharField(max_length=50)),
+                ('status', models.CharField(max_length=15)),
+                ('count', models.IntegerField(default=0)),
+                ('doctor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='doctors.doctor')),
+            ],
+            options={
+                'ordering': ['date'],
+                'indexes': [models.Index(fields=['date', 'specialization'], name='appt_rollup_date_spec_idx')],
+                'unique_together': {('date', 'doctor', 'status')},
+            },
+        ),
+    ]
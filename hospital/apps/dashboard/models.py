@@ -0,0 +1,50 @@
+from django.db import models
+
+class StatCounter(models.Model):
+    """A named running total maintained by signals (see counters.py)."""
+    name = models.CharField(max_length=64, unique=True)
+    value = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['name']
+
+    def __str__(self):
+        return f"{self.name} = {self.value}"
+
+class AppointmentRollup(models.Model):
+    """Appointments per day, doctor and status, maintained by signals (see rollups.py)."""
+    date = models.DateField()
+    doctor = models.ForeignKey('doctors.Doctor', on_delete=models.CASCADE, related_name='+')
+    specialization = models.CharField(max_length=50)
+    status = models.CharField(max_length=15)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ['date']
+        unique_together = ['date', 'doctor', 'status']
+        indexes = [
+            models.Index(fields=['date', 'specialization'], name='appt_rollup_date_spec_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.date} doctor {self.doctor_id} {self.status} = {self.count}"
+
+class RevenueRollup(models.Model):
+    """Paid invoices and their total per payment day, doctor and payment method (see rollups.py)."""
+    date = models.DateField()
+    doctor = models.ForeignKey('doctors.Doctor', on_delete=models.CASCADE, related_name='+')
+    specialization = models.CharField(max_length=50)
+    payment_method = models.CharField(max_length=15)
+    count = models.IntegerField(default=0)
+    amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        ordering = ['date']
+        unique_together = ['date', 'doctor', 'payment_method']
+        indexes = [
+            models.Index(fields=['date', 'specialization'], name='rev_rollup_date_spec_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.date} doctor {self.doctor_id} {self.payment_method} = {self.amount}"
@@ -0,0 +1,122 @@
+"""
+Daily appointment and revenue rollups behind the analytics endpoint.
+
+``AppointmentRollup`` counts appointments per (date, doctor, status) and
+``RevenueRollup`` sums paid invoices per (payment day, doctor, payment
+method). Both carry the doctor's specialization, so every grouping and time
+bucket reads only these small tables. As with the counters, a save adds the
+row's new contribution and subtracts its old one; ``rebuild()`` recomputes
+everything from the source tables.
+"""
+from collections import Counter, defaultdict
+from functools import reduce
+from operator import or_
+from django.db import models, transaction
+from django.db.models import Case, Count, F, Q, Sum, Value, When
+from django.db.models.functions import Coalesce, TruncDate, TruncDay, TruncMonth, TruncWeek
+from django.utils import timezone
+from hospital.apps.appointments.models import Appointment
+from hospital.apps.billing.models import Invoice
+from hospital.apps.core.jobs import job
+from hospital.apps.doctors.models import Doctor
+from .models import AppointmentRollup, RevenueRollup
+
+KEYS = {
+    AppointmentRollup: ('date', 'doctor_id', 'status'),
+    RevenueRollup: ('date', 'doctor_id', 'payment_method'),
+}
+MEASURES = {
+    AppointmentRollup: {'count': models.IntegerField()},
+    RevenueRollup: {'count': models.IntegerField(), 'amount': models.DecimalField(max_digits=14, decimal_places=2)},
+}
+BUCKETS = {'day': TruncDay, 'week': TruncWeek, 'month': TruncMonth}
+GROUPS = {'doctor': 'doctor_id', 'specialization': 'specialization',
+          'status': 'status', 'payment_method': 'payment_method'}
+BATCH_SIZE = 1000
+
+def appointment_contribution(doctor_id, status, appointment_date):
+    if doctor_id is None or status is None or appointment_date is None:
+        return Counter()
+    return Counter({((appointment_date, doctor_id, status), 'count'): 1})
+
+def paid_on(paid_at, created_at):
+    moment = paid_at or created_at or timezone.now()
+    return timezone.localtime(moment).date() if timezone.is_aware(moment) else moment.date()
+
+def revenue_contribution(doctor_id, payment_status, payment_method, total_amount, paid_at, created_at):
+    if doctor_id is None or payment_status != Invoice.PaymentStatus.PAID or not total_amount:
+        return Counter()
+    key = (paid_on(paid_at, created_at), doctor_id, payment_method or '')
+    return Counter({(key, 'count'): 1, (key, 'amount'): total_amount})
+
+def apply(model, deltas):
+    """
+    Add ``{(key, measure): value}`` deltas to the rollup rows in at most two
+    queries. Rows are only created for keys that gain something, so removals
+    never resurrect rows of a doctor being deleted.
+    """
+    rows = defaultdict(dict)
+    for (key, measure), value in deltas.items():
+        if value:
+            rows[key][measure] = value
+    if not rows:
+        return
+    new = [key for key, measures in rows.items() if any(value > 0 for value in measures.values())]
+    if new:
+        specializations = dict(Doctor.objects.filter(pk__in={key[1] for key in new})
+                               .values_list('id', 'specialization'))
+        model.objects.bulk_create(
+            [model(**dict(zip(KEYS[model], key)), specialization=specializations.get(key[1], ''))
+             for key in new if key[1] in specializations],
+            ignore_conflicts=True)
+    matches = {key: Q(**dict(zip(KEYS[model], key))) for key in rows}
+    updates = {}
+    for measure, output_field in MEASURES[model].items():
+        whens = [When(matches[key], then=Value(measures[measure]))
+                 for key, measures in rows.items() if measure in measures]
+        if whens:
+            updates[measure] = F(measure) + Case(*whens, default=Value(0), output_field=output_field)
+    model.objects.filter(reduce(or_, matches.values())).update(**updates)
+
+def rename_specialization(doctor_id, specialization):
+    for model in KEYS:
+        model.objects.filter(doctor_id=doctor_id).update(specialization=specialization)
+
+@job
+@transaction.atomic
+def rebuild():
+    """Recompute both rollups from the source tables; returns their row counts."""
+    AppointmentRollup.objects.all().delete()
+    appointments = Appointment.objects.values(
+        'appointment_date', 'doctor_id', 'doctor__specialization', 'status',
+    ).annotate(n=Count('id')).order_by()
+    AppointmentRollup.objects.bulk_create((
+        AppointmentRollup(date=row['appointment_date'], doctor_id=row['doctor_id'],
+                          specialization=row['doctor__specialization'], status=row['status'], count=row['n'])
+        for row in appointments.iterator()), batch_size=BATCH_SIZE)
+
+    RevenueRollup.objects.all().delete()
+    revenue = Invoice.objects.filter(payment_status=Invoice.PaymentStatus.PAID).exclude(total_amount=0).annotate(
+        day=TruncDate(Coalesce('paid_at', 'created_at')),
+    ).values(
+        'day', 'appointment__doctor_id', 'appointment__doctor__specialization', 'payment_method',
+    ).annotate(n=Count('id'), amount=Sum('total_amount')).order_by()
+    RevenueRollup.objects.bulk_create((
+        RevenueRollup(date=row['day'], doctor_id=row['appointment__doctor_id'],
+                      specialization=row['appointment__doctor__specialization'],
+                      payment_method=row['payment_method'], count=row['n'], amount=row['amount'])
+        for row in revenue.iterator()), batch_size=BATCH_SIZE)
+    return {'appointment_rollups': AppointmentRollup.objects.count(),
+            'revenue_rollups': RevenueRollup.objects.count()}
+
+def series(model, bucket, group_by, start, end):
+    """Rollup sums per ``bucket`` period (and ``group_by`` value) between two dates, inclusive."""
+    group = [GROUPS[group_by]] if group_by else []
+    sums = {'appointments': Sum('count')} if model is AppointmentRollup \
+        else {'invoices': Sum('count'), 'revenue': Sum('amount')}
+    positive = 'appointments__gt' if model is AppointmentRollup else 'invoices__gt'
+    rows = model.objects.filter(date__range=(start, end)).annotate(period=BUCKETS[bucket]('date')) \
+        .values('period', *group).annotate(**sums).filter(**{positive: 0}).order_by('period', *group)
+    if group_by == 'doctor':
+        return [{'period': row.pop('period'), 'doctor': row.pop('doctor_id'), **row} for row in rows]
+    return [{'period': row.pop('period'), **row} for row in rows]
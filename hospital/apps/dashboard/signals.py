@@ -0,0 +1,97 @@
+from collections import Counter
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from hospital.apps.core.tracking import track, previous_values, loaded_values
+from hospital.apps.accounts.models import User
+from hospital.apps.accounts.signals import users_bulk_created
+from hospital.apps.appointments.models import Appointment
+from hospital.apps.appointments.signals import appointments_bulk_created
+from hospital.apps.billing.models import Invoice
+from hospital.apps.doctors.models import Doctor
+from . import counters, rollups
+from .models import AppointmentRollup, RevenueRollup
+
+track(User, 'role')
+track(Appointment, 'status', 'appointment_date', 'doctor_id')
+track(Invoice, 'payment_status', 'total_amount', 'payment_method', 'paid_at', 'created_at', 'appointment_id')
+track(Doctor, 'specialization')
+
+def _user(values):
+    return counters.user_contribution(values.get('role'))
+
+def _appointment(values):
+    return counters.appointment_contribution(values.get('status'), values.get('appointment_date'))
+
+def _invoice(values):
+    return counters.invoice_contribution(values.get('payment_status'), values.get('total_amount'))
+
+CONTRIBUTIONS = {User: _user, Appointment: _appointment, Invoice: _invoice}
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=Appointment)
+@receiver(post_save, sender=Invoice)
+def update_counters(sender, instance, created, **kwargs):
+    # pre_save already rotated the tracked values, so loaded_values() is the new state.
+    contribution = CONTRIBUTIONS[sender]
+    counters.apply(counters.delta(contribution(loaded_values(instance)),
+                                  contribution(previous_values(instance))))
+
+@receiver(post_delete, sender=User)
+@receiver(post_delete, sender=Appointment)
+@receiver(post_delete, sender=Invoice)
+def remove_from_counters(sender, instance, **kwargs):
+    counters.apply(counters.delta({}, CONTRIBUTIONS[sender](loaded_values(instance))))
+
+@receiver(users_bulk_created)
+def count_bulk_users(sender, instances, **kwargs):
+    total = Counter()
+    for instance in instances:
+        total.update(_user(loaded_values(instance)))
+    counters.apply(counters.delta(total, {}))
+
+@receiver(appointments_bulk_created)
+def count_bulk_appointments(sender, instances, **kwargs):
+    total = Counter()
+    for instance in instances:
+        total.update(_appointment(loaded_values(instance)))
+    counters.apply(counters.delta(total, {}))
+
+def _appointment_rollup(values):
+    return rollups.appointment_contribution(
+        values.get('doctor_id'), values.get('status'), values.get('appointment_date'))
+
+def _revenue_rollup(values):
+    if values.get('payment_status') != Invoice.PaymentStatus.PAID:
+        return Counter()  # skips the doctor lookup for unpaid invoices
+    doctor_id = Appointment.objects.filter(pk=values.get('appointment_id')).values_list('doctor_id', flat=True).first()
+    return rollups.revenue_contribution(
+        doctor_id, values['payment_status'], values.get('payment_method'), values.get('total_amount'),
+        values.get('paid_at'), values.get('created_at'))
+
+ROLLUPS = {Appointment: (AppointmentRollup, _appointment_rollup), Invoice: (RevenueRollup, _revenue_rollup)}
+
+@receiver(post_save, sender=Appointment)
+@receiver(post_save, sender=Invoice)
+def update_rollups(sender, instance, created, **kwargs):
+    model, contribution = ROLLUPS[sender]
+    rollups.apply(model, counters.delta(contribution(loaded_values(instance)),
+                                        contribution(previous_values(instance))))
+
+@receiver(post_delete, sender=Appointment)
+@receiver(post_delete, sender=Invoice)
+def remove_from_rollups(sender, instance, **kwargs):
+    model, contribution = ROLLUPS[sender]
+    rollups.apply(model, counters.delta({}, contribution(loaded_values(instance))))
+
+@receiver(appointments_bulk_created)
+def roll_up_bulk_appointments(sender, instances, **kwargs):
+    total = Counter()
+    for instance in instances:
+        total.update(_appointment_rollup(loaded_values(instance)))
+    rollups.apply(AppointmentRollup, total)
+
+@receiver(post_save, sender=Doctor)
+def rename_rollup_specialization(sender, instance, created, **kwargs):
+    specialization = loaded_values(instance).get('specialization')
+    if not created and specialization != previous_values(instance).get('specialization'):
+        rollups.rename_specialization(instance.pk, specialization)
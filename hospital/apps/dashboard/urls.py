@@ -1,6 +1,10 @@
 from django.urls import path
-from .views import DashboardView
+from hospital.apps.core import asyncviews
+from . import async_views
+from .views import AnalyticsView, DashboardView, DatabasePoolView
 
 urlpatterns = [
-    path('', DashboardView.as_view(), name='dashboard'),
+    path('', async_views.dashboard if asyncviews.enabled() else DashboardView.as_view(), name='dashboard'),
+    path('analytics/', AnalyticsView.as_view(), name='dashboard-analytics'),
+    path('db-pool/', DatabasePoolView.as_view(), name='dashboard-db-pool'),
 ]
\ No newline at end of file
@@ -1,38 +1,87 @@
-from django.core.cache import cache
-from django.db.models import Sum
+from datetime import date, timedelta
 from django.utils import timezone
+from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from hospital.apps.accounts.permissions import IsAdmin
-from hospital.apps.accounts.models import User
 from hospital.apps.appointments.models import Appointment
-from hospital.apps.billing.models import Invoice
+from hospital.apps.core.cache import get_or_compute
+from hospital.apps.core.db.postgresql.base import collect_stats
+from hospital.apps.core.db_router import ReplicaReadMixin
+from . import counters, rollups
+from .models import AppointmentRollup, RevenueRollup
 
 DASHBOARD_CACHE_KEY = 'dashboard_stats'
-CACHE_TIMEOUT = 60 * 5  # 5 minutes
+CACHE_TIMEOUT = 5  # counters are always current; this only absorbs bursts
+DEFAULT_SPAN = {'day': 30, 'week': 7 * 26, 'month': 365}
 
-class DashboardView(APIView):
+class DashboardView(ReplicaReadMixin, APIView):
     permission_classes = [IsAdmin]
+    replica_actions = ('get',)
 
     def get(self, request):
-        stats = cache.get(DASHBOARD_CACHE_KEY)
-
-        if not stats:
-            today = timezone.now().date()
-            stats = {
-                'total_doctors': User.objects.filter(role='doctor').count(),
-                'total_patients': User.objects.filter(role='patient').count(),
-                'total_appointments': Appointment.objects.count(),
-                'pending_appointments': Appointment.objects.filter(status='pending').count(),
-                'completed_appointments': Appointment.objects.filter(status='completed').count(),
-                'total_revenue': Invoice.objects.filter(
-                    payment_status='paid'
-                ).aggregate(total=Sum('total_amount'))['total'] or 0,
-                'monthly_appointments': Appointment.objects.filter(
-                    appointment_date__month=today.month,
-                    appointment_date__year=today.year
-                ).count(),
-            }
-            cache.set(DASHBOARD_CACHE_KEY, stats, CACHE_TIMEOUT)
-
-        return Response(stats)
\ No newline at end of file
+        return Response(get_or_compute(DASHBOARD_CACHE_KEY, self.compute_stats, CACHE_TIMEOUT))
+
+    @staticmethod
+    def compute_stats():
+        today = timezone.now().date()
+        month = counters.month_key(today.year, today.month)
+        values = counters.read([
+            'total_doctors', 'total_patients', 'total_appointments',
+            f'appointments_{Appointment.Status.PENDING}',
+            f'appointments_{Appointment.Status.COMPLETED}',
+            'total_revenue', month,
+        ])
+        return {
+            'total_doctors': int(values['total_doctors']),
+            'total_patients': int(values['total_patients']),
+            'total_appointments': int(values['total_appointments']),
+            'pending_appointments': int(values[f'appointments_{Appointment.Status.PENDING}']),
+            'completed_appointments': int(values[f'appointments_{Appointment.Status.COMPLETED}']),
+            'total_revenue': values['total_revenue'],
+            'monthly_appointments': int(values[month]),
+        }
+
+class DatabasePoolView(APIView):
+    """Per-worker connection checkouts, pool occupancy, waits and connect times."""
+    permission_classes = [IsAdmin]
+
+    def get(self, request):
+        return Response({'workers': collect_stats()})
+
+class AnalyticsView(ReplicaReadMixin, APIView):
+    """
+    Appointment counts and paid revenue per day, week or month, optionally
+    grouped by doctor, specialization, status or payment method. Reads only
+    the rollup tables.
+    """
+    permission_classes = [IsAdmin]
+    replica_actions = ('get',)
+
+    def get(self, request):
+        bucket = request.query_params.get('bucket', 'day')
+        group_by = request.query_params.get('group_by') or None
+        if bucket not in rollups.BUCKETS:
+            return Response({'error': f"bucket must be one of: {', '.join(rollups.BUCKETS)}."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if group_by is not None and group_by not in rollups.GROUPS:
+            return Response({'error': f"group_by must be one of: {', '.join(rollups.GROUPS)}."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            end = date.fromisoformat(request.query_params['end']) \
+                if 'end' in request.query_params else timezone.now().date()
+            start = date.fromisoformat(request.query_params['start']) \
+                if 'start' in request.query_params else end - timedelta(days=DEFAULT_SPAN[bucket])
+        except ValueError:
+            return Response({'error': 'Dates must be in YYYY-MM-DD format.'}, status=status.HTTP_400_BAD_REQUEST)
+        except OverflowError:
+            return Response({'error': 'Dates are out of range.'}, status=status.HTTP_400_BAD_REQUEST)
+        if start > end:
+            return Response({'error': 'start must not be after end.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        data = {'bucket': bucket, 'group_by': group_by, 'start': start, 'end': end}
+        if group_by != 'payment_method':
+            data['appointments'] = rollups.series(AppointmentRollup, bucket, group_by, start, end)
+        if group_by != 'status':
+            data['revenue'] = rollups.series(RevenueRollup, bucket, group_by, start, end)
+        return Response(data)
@@ -0,0 +1,61 @@
+"""
+A doctor's appointments for one day, built from a single ``.values()`` query
+and cached briefly per doctor and date (see signals.py for invalidation).
+"""
+from django.core.cache import cache
+from django.db import transaction
+from hospital.apps.appointments.models import Appointment
+from hospital.apps.appointments.serializers import patient_name
+from hospital.apps.core.cache import get_or_compute
+
+AGENDA_CACHE_TIMEOUT = 30
+
+FIELDS = ('id', 'appointment_time', 'status', 'reason', 'notes', 'patient_id',
+          'patient__user__first_name', 'patient__user__last_name', 'patient__user__username',
+          'patient__user__phone', 'patient__date_of_birth', 'patient__blood_group',
+          'prescription__id', 'invoice__payment_status')
+
+def _key(doctor_id, day):
+    return f'agenda:{doctor_id}:{day.isoformat()}'
+
+def _entry(row):
+    dob = row['patient__date_of_birth']
+    return {
+        'id': row['id'],
+        'appointment_time': row['appointment_time'].isoformat(),
+        'status': row['status'],
+        'reason': row['reason'],
+        'notes': row['notes'],
+        'patient': {
+            'id': row['patient_id'],
+            'name': patient_name(row['patient__user__first_name'], row['patient__user__last_name'],
+                                 row['patient__user__username']),
+            'phone': row['patient__user__phone'],
+            'date_of_birth': dob.isoformat() if dob else None,
+            'blood_group': row['patient__blood_group'],
+        },
+        'has_prescription': row['prescription__id'] is not None,
+        'invoice_status': row['invoice__payment_status'],
+    }
+
+def build(doctor_id, day):
+    rows = Appointment.objects.filter(doctor_id=doctor_id, appointment_date=day) \
+        .order_by('appointment_time', 'id').values(*FIELDS)
+    appointments = [_entry(row) for row in rows]
+    counts = dict.fromkeys(Appointment.Status.values, 0)
+    for entry in appointments:
+        counts[entry['status']] += 1
+    return {
+        'date': day.isoformat(),
+        'counts': {**counts, 'total': len(appointments)},
+        'appointments': appointments,
+    }
+
+def get(doctor_id, day):
+    return get_or_compute(_key(doctor_id, day), lambda: build(doctor_id, day), AGENDA_CACHE_TIMEOUT)
+
+def invalidate(*pairs):
+    """Drop the cached agendas for ``(doctor_id, date)`` pairs once the transaction commits."""
+    keys = {_key(doctor_id, day) for doctor_id, day in pairs if doctor_id is not None and day is not None}
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(list(keys)))
@@ -0,0 +1,8 @@
+from django.apps import AppConfig
+
+class DoctorsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'hospital.apps.doctors'
+
+    def ready(self):
+        import hospital.apps.doctors.signals
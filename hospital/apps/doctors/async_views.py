@@ -0,0 +1,41 @@
+from rest_framework.permissions import IsAuthenticated
+from hospital.apps.core.asyncviews import async_api, json_response, paginate
+from hospital.apps.core.cache import aget_or_compute
+from hospital.apps.core.conditional import aconditional_get, acollection_state, arow_state
+from .models import Doctor
+from .views import AVAILABLE_CACHE_KEY, AVAILABLE_CACHE_TIMEOUT, DoctorViewSet, available_doctors
+
+FIELDS = DoctorViewSet.conditional_fields
+FAST = DoctorViewSet.fast_serializer
+
+@async_api(DoctorViewSet.as_view({'get': 'list', 'post': 'create'}, basename='doctor', detail=False),
+           [IsAuthenticated], replica=True)
+async def doctor_list(request):
+    doctors = DoctorViewSet.queryset.all()
+    state = await acollection_state(doctors, FIELDS)
+
+    async def render():
+        return json_response(await paginate(request, doctors.values(*FAST.lookups), FAST.many))
+    return await aconditional_get(request, state, render)
+
+@async_api(DoctorViewSet.as_view({'get': 'available'}, basename='doctor', detail=False), [IsAuthenticated],
+           replica=True)
+async def available(request):
+    state = await acollection_state(Doctor.objects.filter(is_available=True), FIELDS)
+
+    async def render():
+        return json_response(await aget_or_compute(AVAILABLE_CACHE_KEY, available_doctors, AVAILABLE_CACHE_TIMEOUT))
+    return await aconditional_get(request, state, render)
+
+@async_api(DoctorViewSet.as_view({'get': 'me', 'put': 'me', 'patch': 'me'}, basename='doctor', detail=False),
+           [IsAuthenticated])
+async def me(request):
+    doctor = Doctor.objects.filter(user_id=request.user.pk)
+    state = await arow_state(doctor, FIELDS)
+
+    async def render():
+        row = await doctor.values(*FAST.lookups).afirst()
+        if row is None:
+            return json_response({'error': 'Doctor profile not found.'}, status=404)
+        return json_response(FAST.to_representation(row))
+    return await aconditional_get(request, state, render)
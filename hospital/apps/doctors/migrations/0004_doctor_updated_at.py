@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 12:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doctors', '0003_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='doctor',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
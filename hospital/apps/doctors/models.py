@@ -18,9 +18,13 @@ class Doctor(models.Model):
     consultation_fee = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
     is_available = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['is_available', 'specialization'], name='doctor_available_spec_idx'),
+        ]
 
     def __str__(self):
         return f"Dr. {self.user.get_full_name()} - {self.specialization}"
\ No newline at end of file
@@ -0,0 +1,56 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from hospital.apps.accounts.models import User
+from hospital.apps.accounts.signals import users_bulk_created
+from hospital.apps.appointments.models import Appointment
+from hospital.apps.appointments.signals import appointments_bulk_created
+from hospital.apps.billing.models import Invoice
+from hospital.apps.billing.signals import invoices_bulk_created
+from hospital.apps.core.cache import invalidate
+from hospital.apps.core.tracking import track, previous_values
+from hospital.apps.prescriptions.models import Prescription
+from .models import Doctor
+from .views import AVAILABLE_CACHE_KEY
+from . import agenda
+
+AGENDA_FIELDS = ('doctor_id', 'appointment_date')
+track(Appointment, *AGENDA_FIELDS)
+
+@receiver(post_save, sender=Doctor)
+@receiver(post_delete, sender=Doctor)
+def invalidate_available_doctors(sender, instance, **kwargs):
+    invalidate(AVAILABLE_CACHE_KEY)
+
+@receiver(post_save, sender=User)
+def invalidate_doctor_names(sender, instance, **kwargs):
+    if instance.role == User.Role.DOCTOR:
+        invalidate(AVAILABLE_CACHE_KEY)
+
+@receiver(users_bulk_created)
+def invalidate_imported_doctors(sender, instances, **kwargs):
+    if any(instance.role == User.Role.DOCTOR for instance in instances):
+        invalidate(AVAILABLE_CACHE_KEY)
+
+@receiver(post_save, sender=Appointment)
+@receiver(post_delete, sender=Appointment)
+def invalidate_appointment_agenda(sender, instance, **kwargs):
+    before = previous_values(instance)
+    agenda.invalidate((instance.doctor_id, instance.appointment_date),
+                      tuple(before.get(f) for f in AGENDA_FIELDS))
+
+@receiver(appointments_bulk_created)
+def invalidate_booked_agendas(sender, instances, **kwargs):
+    agenda.invalidate(*((a.doctor_id, a.appointment_date) for a in instances))
+
+@receiver(post_save, sender=Prescription)
+@receiver(post_delete, sender=Prescription)
+@receiver(post_save, sender=Invoice)
+@receiver(post_delete, sender=Invoice)
+def invalidate_attachment_agenda(sender, instance, **kwargs):
+    agenda.invalidate(*Appointment.objects.filter(pk=instance.appointment_id)
+                      .values_list('doctor_id', 'appointment_date'))
+
+@receiver(invoices_bulk_created)
+def invalidate_invoiced_agendas(sender, appointment_ids, **kwargs):
+    agenda.invalidate(*Appointment.objects.filter(pk__in=appointment_ids)
+                      .values_list('doctor_id', 'appointment_date').distinct())
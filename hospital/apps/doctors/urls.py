@@ -1,8 +1,17 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
+from hospital.apps.core import asyncviews
+from . import async_views
 from .views import DoctorViewSet
 
 router = DefaultRouter()
 router.register(r'', DoctorViewSet, basename='doctor')
 
-urlpatterns = router.urls
\ No newline at end of file
+urlpatterns = router.urls
+
+if asyncviews.enabled():
+    urlpatterns = [
+        path('', async_views.doctor_list, name='doctor-list'),
+        path('available/', async_views.available, name='doctor-available'),
+        path('me/', async_views.me, name='doctor-me'),
+    ] + urlpatterns
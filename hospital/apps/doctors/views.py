@@ -1,14 +1,56 @@
+from datetime import date, timedelta
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from django.utils import timezone
 from .models import Doctor
 from .serializers import DoctorSerializer, DoctorUpdateSerializer
+from . import agenda as doctor_agenda
+from hospital.apps.accounts.models import User
 from hospital.apps.accounts.permissions import IsAdmin, IsAdminOrDoctor
+from hospital.apps.appointments import slots
+from hospital.apps.core.cache import get_or_compute
+from hospital.apps.core.conditional import ConditionalGetMixin, collection_state, conditional_get, row_state
+from hospital.apps.core.db_router import ReplicaReadMixin
+from hospital.apps.core.fastread import FastReadMixin, ValuesSerializer
 
-class DoctorViewSet(viewsets.ModelViewSet):
+AVAILABLE_CACHE_KEY = 'doctors_available'
+AVAILABLE_CACHE_TIMEOUT = 60
+
+MAX_SLOT_RANGE_DAYS = 31
+
+def _slot_range(request):
+    """Parse ``from``/``to`` query params into a list of days (defaults to the next week)."""
+    try:
+        start = date.fromisoformat(request.query_params['from']) \
+            if 'from' in request.query_params else timezone.now().date()
+        end = date.fromisoformat(request.query_params['to']) \
+            if 'to' in request.query_params else start + timedelta(days=6)
+    except ValueError:
+        raise ValueError('Dates must be in YYYY-MM-DD format.')
+    except OverflowError:
+        raise ValueError('Dates are out of range.')
+    if end < start:
+        raise ValueError("'to' must not be before 'from'.")
+    if (end - start).days >= MAX_SLOT_RANGE_DAYS:
+        raise ValueError(f'Range cannot exceed {MAX_SLOT_RANGE_DAYS} days.')
+    return [start + timedelta(days=i) for i in range((end - start).days + 1)]
+
+def available_doctors():
+    doctors = Doctor.objects.filter(is_available=True).select_related('user')
+    return DoctorSerializer(doctors, many=True).data
+
+def _slot_days(busy, doctor_id, days):
+    return [{'date': day.isoformat(), 'free': slots.free_slots(busy[(doctor_id, day)])}
+            for day in days]
+
+class DoctorViewSet(ReplicaReadMixin, ConditionalGetMixin, FastReadMixin, viewsets.ModelViewSet):
     queryset = Doctor.objects.select_related('user').all()
     permission_classes = [IsAuthenticated]
+    conditional_fields = ('updated_at', 'user__updated_at')
+    fast_serializer = ValuesSerializer(DoctorSerializer)
+    replica_actions = ('list', 'retrieve', 'available')
 
     def get_serializer_class(self):
         if self.action in ['update', 'partial_update']:
@@ -16,18 +58,68 @@ class DoctorViewSet(viewsets.ModelViewSet):
         return DoctorSerializer
 
     def get_permissions(self):
-        if self.action in ['list', 'retrieve', 'me', 'available']:
+        if self.action in ['list', 'retrieve', 'me', 'agenda', 'available', 'slots', 'all_slots']:
             return [IsAuthenticated()]
         return [IsAdmin()]
 
     @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
     def available(self, request):
-        doctors = Doctor.objects.filter(is_available=True).select_related('user')
-        serializer = DoctorSerializer(doctors, many=True)
-        return Response(serializer.data)
+        state = collection_state(Doctor.objects.filter(is_available=True), self.conditional_fields)
+        return conditional_get(request, state, lambda: Response(
+            get_or_compute(AVAILABLE_CACHE_KEY, available_doctors, AVAILABLE_CACHE_TIMEOUT)))
+
+    @action(detail=True, methods=['get'], permission_classes=[IsAuthenticated])
+    def slots(self, request, pk=None):
+        try:
+            days = _slot_range(request)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        doctor_id = self.get_object().pk
+        busy = slots.busy_slots([doctor_id], days)
+        return Response({
+            'doctor': doctor_id,
+            'slot_minutes': slots.SLOT_MINUTES,
+            'days': _slot_days(busy, doctor_id, days),
+        })
+
+    @action(detail=False, methods=['get'], url_path='slots', permission_classes=[IsAuthenticated])
+    def all_slots(self, request):
+        try:
+            days = _slot_range(request)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        doctors = Doctor.objects.filter(is_available=True)
+        specialization = request.query_params.get('specialization')
+        if specialization:
+            doctors = doctors.filter(specialization=specialization)
+        doctor_ids = list(doctors.values_list('id', flat=True))
+        busy = slots.busy_slots(doctor_ids, days)
+        return Response({
+            'slot_minutes': slots.SLOT_MINUTES,
+            'doctors': [{'doctor': doctor_id, 'days': _slot_days(busy, doctor_id, days)}
+                        for doctor_id in doctor_ids],
+        })
 
     @action(detail=False, methods=['get', 'put', 'patch'], permission_classes=[IsAuthenticated])
     def me(self, request):
+        if request.method == 'GET':
+            state = row_state(Doctor.objects.filter(user_id=request.user.pk), self.conditional_fields)
+            return conditional_get(request, state, lambda: self._me(request))
+        return self._me(request)
+
+    @action(detail=False, methods=['get'], url_path='me/agenda', permission_classes=[IsAuthenticated])
+    def agenda(self, request):
+        doctor_id = request.user.profile_id if request.user.role == User.Role.DOCTOR else None
+        if doctor_id is None:
+            return Response({'error': 'Doctor profile not found.'}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            day = date.fromisoformat(request.query_params['date']) \
+                if 'date' in request.query_params else timezone.now().date()
+        except ValueError:
+            return Response({'error': 'Dates must be in YYYY-MM-DD format.'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(doctor_agenda.get(doctor_id, day))
+
+    def _me(self, request):
         try:
             doctor = request.user.doctor_profile
         except Doctor.DoesNotExist:
@@ -38,4 +130,4 @@ class DoctorViewSet(viewsets.ModelViewSet):
             serializer = DoctorUpdateSerializer(doctor, data=request.data, partial=True)
             serializer.is_valid(raise_exception=True)
             serializer.save()
-        return Response(serializer.data)
\ No newline at end of file
+        return Response(serializer.data)
@@ -0,0 +1,8 @@
+from django.apps import AppConfig
+
+class PatientsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'hospital.apps.patients'
+
+    def ready(self):
+        import hospital.apps.patients.signals
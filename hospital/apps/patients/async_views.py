@@ -0,0 +1,21 @@
+from rest_framework.permissions import IsAuthenticated
+from hospital.apps.core.asyncviews import async_api, json_response
+from hospital.apps.core.conditional import aconditional_get, arow_state
+from .models import Patient
+from .views import PatientViewSet
+
+FIELDS = PatientViewSet.conditional_fields
+FAST = PatientViewSet.fast_serializer
+
+@async_api(PatientViewSet.as_view({'get': 'me', 'put': 'me', 'patch': 'me'}, basename='patient', detail=False),
+           [IsAuthenticated])
+async def me(request):
+    patient = Patient.objects.filter(user_id=request.user.pk)
+    state = await arow_state(patient, FIELDS)
+
+    async def render():
+        row = await patient.values(*FAST.lookups).afirst()
+        if row is None:
+            return json_response({'error': 'Patient profile not found.'}, status=404)
+        return json_response(FAST.to_representation(row))
+    return await aconditional_get(request, state, render)
@@ -19,6 +19,7 @@ class Patient(models.Model):
     emergency_contact = models.CharField(max_length=15, blank=True)
     medical_history = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-created_at']
@@ -1,6 +1,10 @@
 from rest_framework import serializers
 from .models import Patient
 from hospital.apps.accounts.serializers import UserSerializer
+from hospital.apps.appointments.models import Appointment
+from hospital.apps.appointments.serializers import doctor_name
+from hospital.apps.billing.serializers import InvoiceSerializer
+from hospital.apps.prescriptions.serializers import PrescriptionSerializer
 
 class PatientSerializer(serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
@@ -14,4 +18,19 @@ class PatientUpdateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Patient
         fields = ('date_of_birth', 'blood_group', 'address',
-                  'emergency_contact', 'medical_history')
\ No newline at end of file
+                  'emergency_contact', 'medical_history')
+
+class TimelineEntrySerializer(serializers.ModelSerializer):
+    doctor_name = serializers.SerializerMethodField()
+    specialization = serializers.CharField(source='doctor.specialization', read_only=True)
+    prescription = PrescriptionSerializer(read_only=True)
+    invoice = InvoiceSerializer(read_only=True)
+
+    class Meta:
+        model = Appointment
+        fields = ('id', 'doctor', 'doctor_name', 'specialization', 'appointment_date',
+                  'appointment_time', 'status', 'reason', 'notes', 'prescription', 'invoice')
+
+    def get_doctor_name(self, obj):
+        u = obj.doctor.user
+        return doctor_name(u.first_name, u.last_name, u.username)
@@ -0,0 +1,34 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from hospital.apps.appointments.models import Appointment
+from hospital.apps.appointments.signals import appointments_bulk_created
+from hospital.apps.billing.models import Invoice
+from hospital.apps.billing.signals import invoices_bulk_created
+from hospital.apps.core.tracking import track, previous_values
+from hospital.apps.prescriptions.models import Prescription
+from . import timeline
+
+track(Appointment, 'patient_id')
+
+@receiver(post_save, sender=Appointment)
+@receiver(post_delete, sender=Appointment)
+def invalidate_appointment_timeline(sender, instance, **kwargs):
+    # a reassigned appointment leaves its previous patient's timeline too
+    timeline.invalidate(instance.patient_id, previous_values(instance).get('patient_id'))
+
+@receiver(appointments_bulk_created)
+def invalidate_booked_timelines(sender, instances, **kwargs):
+    timeline.invalidate(*(a.patient_id for a in instances))
+
+@receiver(post_save, sender=Prescription)
+@receiver(post_delete, sender=Prescription)
+@receiver(post_save, sender=Invoice)
+@receiver(post_delete, sender=Invoice)
+def invalidate_attachment_timeline(sender, instance, **kwargs):
+    timeline.invalidate(*Appointment.objects.filter(pk=instance.appointment_id)
+                        .values_list('patient_id', flat=True))
+
+@receiver(invoices_bulk_created)
+def invalidate_invoiced_timelines(sender, appointment_ids, **kwargs):
+    timeline.invalidate(*Appointment.objects.filter(pk__in=appointment_ids)
+                        .values_list('patient_id', flat=True).distinct())
@@ -0,0 +1,36 @@
+"""
+Per-patient cache for ``/api/patients/me/timeline/`` pages.
+
+Every page key embeds the patient's current version, so one write to any of
+their appointments, prescriptions or invoices drops all cached pages at once
+by replacing the version (see signals.py). Versions expire with the pages:
+a patient whose version has expired simply starts on a new one.
+"""
+import hashlib
+import time
+from django.core.cache import cache
+from django.db import transaction
+
+TIMELINE_CACHE_TIMEOUT = 300
+
+def _version_key(patient_id):
+    return f'timeline:{patient_id}:version'
+
+def version(patient_id):
+    key = _version_key(patient_id)
+    current = cache.get(key)
+    if current is None:
+        cache.add(key, time.time_ns(), TIMELINE_CACHE_TIMEOUT)
+        current = cache.get(key)
+    return current
+
+def page_key(patient_id, request):
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return f'timeline:{patient_id}:{version(patient_id)}:{path}'
+
+def invalidate(*patient_ids):
+    """Bump the version of each patient once the current transaction commits."""
+    patient_ids = {pid for pid in patient_ids if pid is not None}
+    if patient_ids:
+        transaction.on_commit(lambda: cache.set_many(
+            {_version_key(pid): time.time_ns() for pid in patient_ids}, TIMELINE_CACHE_TIMEOUT))
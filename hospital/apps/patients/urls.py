@@ -1,8 +1,15 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
+from hospital.apps.core import asyncviews
+from . import async_views
 from .views import PatientViewSet
 
 router = DefaultRouter()
 router.register(r'', PatientViewSet, basename='patient')
 
-urlpatterns = router.urls
\ No newline at end of file
+urlpatterns = router.urls
+
+if asyncviews.enabled():
+    urlpatterns = [
+        path('me/', async_views.me, name='patient-me'),
+    ] + urlpatterns
@@ -3,12 +3,25 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from .models import Patient
-from .serializers import PatientSerializer, PatientUpdateSerializer
+from .serializers import PatientSerializer, PatientUpdateSerializer, TimelineEntrySerializer
+from . import timeline
+from hospital.apps.accounts.models import User
 from hospital.apps.accounts.permissions import IsAdmin, IsAdminOrDoctor
+from hospital.apps.appointments.models import Appointment
+from hospital.apps.core.cache import get_or_compute
+from hospital.apps.core.conditional import ConditionalGetMixin, conditional_get, row_state
+from hospital.apps.core.db_router import ReplicaReadMixin
+from hospital.apps.core.fastread import FastReadMixin, ValuesSerializer
+from hospital.apps.core.pagination import KeysetPagination
 
-class PatientViewSet(viewsets.ModelViewSet):
+class TimelinePagination(KeysetPagination):
+    keyset_only = True
+
+class PatientViewSet(ReplicaReadMixin, ConditionalGetMixin, FastReadMixin, viewsets.ModelViewSet):
     queryset = Patient.objects.select_related('user').all()
     permission_classes = [IsAuthenticated]
+    conditional_fields = ('updated_at', 'user__updated_at')
+    fast_serializer = ValuesSerializer(PatientSerializer)
 
     def get_serializer_class(self):
         if self.action in ['update', 'partial_update']:
@@ -18,12 +31,18 @@ class PatientViewSet(viewsets.ModelViewSet):
     def get_permissions(self):
         if self.action in ['list', 'retrieve']:
             return [IsAdminOrDoctor()]
-        if self.action in ['update', 'partial_update', 'me']:
+        if self.action in ['update', 'partial_update', 'me', 'timeline']:
             return [IsAuthenticated()]
         return [IsAdmin()]
 
     @action(detail=False, methods=['get', 'put', 'patch'], permission_classes=[IsAuthenticated])
     def me(self, request):
+        if request.method == 'GET':
+            state = row_state(Patient.objects.filter(user_id=request.user.pk), self.conditional_fields)
+            return conditional_get(request, state, lambda: self._me(request))
+        return self._me(request)
+
+    def _me(self, request):
         try:
             patient = request.user.patient_profile
         except Patient.DoesNotExist:
@@ -34,4 +53,19 @@ class PatientViewSet(viewsets.ModelViewSet):
             serializer = PatientUpdateSerializer(patient, data=request.data, partial=True)
             serializer.is_valid(raise_exception=True)
             serializer.save()
-        return Response(serializer.data)
\ No newline at end of file
+        return Response(serializer.data)
+
+    @action(detail=False, methods=['get'], url_path='me/timeline', permission_classes=[IsAuthenticated])
+    def timeline(self, request):
+        patient_id = request.user.profile_id if request.user.role == User.Role.PATIENT else None
+        if patient_id is None:
+            return Response({'error': 'Patient profile not found.'}, status=status.HTTP_404_NOT_FOUND)
+
+        def compute():
+            appointments = Appointment.objects.filter(patient_id=patient_id) \
+                .select_related('doctor__user', 'prescription', 'invoice')
+            paginator = TimelinePagination()
+            page = paginator.paginate_queryset(appointments, request, self)
+            return paginator.get_paginated_response(TimelineEntrySerializer(page, many=True).data).data
+        return Response(get_or_compute(timeline.page_key(patient_id, request), compute,
+                                       timeline.TIMELINE_CACHE_TIMEOUT))
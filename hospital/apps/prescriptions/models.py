@@ -11,6 +11,10 @@ class Prescription(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # keyset pagination over Meta.ordering + id
+            models.Index(fields=['-created_at', '-id'], name='rx_ordering_idx'),
+        ]
 
     def __str__(self):
         return f"Prescription for {self.appointment}"
\ No newline at end of file
@@ -3,10 +3,21 @@ from rest_framework.permissions import IsAuthenticated
 from .models import Prescription
 from .serializers import PrescriptionSerializer
 from hospital.apps.accounts.permissions import IsAdminOrDoctor
+from hospital.apps.core.db_router import ReplicaReadMixin
+from hospital.apps.core.export import ExportMixin
+from hospital.apps.core.pagination import KeysetPagination
 
-class PrescriptionViewSet(viewsets.ModelViewSet):
+class PrescriptionViewSet(ReplicaReadMixin, ExportMixin, viewsets.ModelViewSet):
     serializer_class = PrescriptionSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    export_name = 'prescriptions'
+    export_columns = [
+        ('id', 'id'), ('appointment_id', 'appointment_id'),
+        ('doctor_id', 'appointment__doctor_id'), ('patient_id', 'appointment__patient_id'),
+        ('diagnosis', 'diagnosis'), ('medications', 'medications'), ('instructions', 'instructions'),
+        ('follow_up_date', 'follow_up_date'), ('created_at', 'created_at'),
+    ]
 
     def get_queryset(self):
         user = self.request.user
@@ -15,14 +26,14 @@ class PrescriptionViewSet(viewsets.ModelViewSet):
                 return Prescription.objects.select_related('appointment').all()
             elif user.is_doctor():
                 return Prescription.objects.select_related('appointment').filter(
-                    appointment__doctor=user.doctor_profile)
+                    appointment__doctor_id=user.profile_id)
             else:
                 return Prescription.objects.select_related('appointment').filter(
-                    appointment__patient=user.patient_profile)
+                    appointment__patient_id=user.profile_id)
         except Exception:
             return Prescription.objects.none()
 
     def get_permissions(self):
         if self.action in ['create', 'update', 'partial_update', 'destroy']:
             return [IsAdminOrDoctor()]
-        return [IsAuthenticated()]
\ No newline at end of file
+        return [IsAuthenticated()]
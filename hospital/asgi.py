@@ -0,0 +1,15 @@
+import os
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'hospital.settings')
+# Persistent connections belong to the thread that opened them, and under ASGI
+# sync code runs on whichever thread is free, so they would only pile up on
+# PostgreSQL; connections are reused here through DB_POOL=True instead.
+os.environ['DB_CONN_MAX_AGE'] = '0'
+
+application = get_asgi_application()
+
+# imported once Django is set up
+from hospital.apps.core.events import close_on_disconnect  # noqa: E402
+
+application = close_on_disconnect(application)
@@ -1,6 +1,7 @@
 from pathlib import Path
 from decouple import config
 from datetime import timedelta
+from decimal import Decimal
 import os
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -22,6 +23,7 @@ INSTALLED_APPS = [
     'rest_framework_simplejwt.token_blacklist',
     'corsheaders',
     # Local apps
+    'hospital.apps.core',
     'hospital.apps.accounts',
     'hospital.apps.doctors',
     'hospital.apps.patients',
@@ -34,6 +36,8 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',    # Whitenoise right after security
+    'hospital.apps.core.metrics.MetricsMiddleware',  # after Whitenoise so static files aren't timed
+    'hospital.apps.core.compression.CompressionMiddleware',  # inside metrics so compression is timed
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -41,6 +45,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'hospital.apps.core.middleware.ReplicaStickinessMiddleware',
 ]
 
 ROOT_URLCONF = 'hospital.urls'
@@ -62,18 +67,50 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'hospital.wsgi.application'
+ASGI_APPLICATION = 'hospital.asgi.application'
+
+# Route hot GET endpoints to async views; enable when serving hospital.asgi
+ASYNC_VIEWS = config('ASYNC_VIEWS', default=False, cast=bool)
 
 # ─── Database ───────────────────────────────────────────────────────────────
+# Pool connections per process with psycopg_pool (psycopg 3); otherwise keep persistent connections
+DB_POOL = config('DB_POOL', default=False, cast=bool)
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': 'hospital.apps.core.db.postgresql',
         'NAME': config('DB_NAME'),
         'USER': config('DB_USER'),
         'PASSWORD': config('DB_PASSWORD'),
         'HOST': config('DB_HOST', default='db'),
         'PORT': config('DB_PORT', default='5432'),
+        # pooled connections go back to the pool after every request instead
+        'CONN_MAX_AGE': 0 if DB_POOL else config('DB_CONN_MAX_AGE', default=60, cast=int),
+        'CONN_HEALTH_CHECKS': config('DB_CONN_HEALTH_CHECKS', default=True, cast=bool),
+        'OPTIONS': {},
     }
 }
+if DB_POOL:
+    DATABASES['default']['OPTIONS']['pool'] = {
+        'min_size': config('DB_POOL_MIN_SIZE', default=2, cast=int),
+        'max_size': config('DB_POOL_MAX_SIZE', default=10, cast=int),
+        'max_lifetime': config('DB_POOL_MAX_LIFETIME', default=3600, cast=float),
+        'max_idle': config('DB_POOL_MAX_IDLE', default=600, cast=float),
+        'timeout': config('DB_POOL_TIMEOUT', default=10, cast=float),
+    }
+
+# Optional read replica for list/retrieve, dashboard and export reads (see core/db_router.py)
+if config('DB_REPLICA_HOST', default=''):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': config('DB_REPLICA_NAME', default=DATABASES['default']['NAME']),
+        'HOST': config('DB_REPLICA_HOST'),
+        'PORT': config('DB_REPLICA_PORT', default=DATABASES['default']['PORT']),
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_ROUTERS = ['hospital.apps.core.db_router.ReplicaRouter']
+# After a write, the user's reads stay on default this long so they see their own changes
+REPLICA_STICKY_SECONDS = config('REPLICA_STICKY_SECONDS', default=5, cast=int)
 
 # ─── Redis Cache ─────────────────────────────────────────────────────────────
 CACHES = {
@@ -81,34 +118,98 @@ CACHES = {
         'BACKEND': 'django_redis.cache.RedisCache',
         'LOCATION': config('REDIS_URL', default='redis://redis:6379/1'),
         'OPTIONS': {
-            'CLIENT_CLASS': 'django_redis.client.DefaultClient',
+            'CLIENT_CLASS': 'hospital.apps.core.cache_client.MetricsCacheClient',
             'IGNORE_EXCEPTIONS': True,  # ← add this so Redis errors don't crash the app
         }
     }
 }
 
+# ─── Metrics ─────────────────────────────────────────────────────────────────
+# Workers push their counters to Redis this often; /metrics serves the totals
+METRICS_FLUSH_INTERVAL = config('METRICS_FLUSH_INTERVAL', default=10, cast=int)
+METRICS_TOKEN = config('METRICS_TOKEN', default='')  # required as a Bearer token when set
+METRICS_SERVER_TIMING = config('METRICS_SERVER_TIMING', default=False, cast=bool)
+
+# ─── Response Compression ────────────────────────────────────────────────────
+# gzip, or brotli when the brotli package is installed, for JSON/text bodies of at least this many bytes
+COMPRESSION_MIN_SIZE = config('COMPRESSION_MIN_SIZE', default=1024, cast=int)
+COMPRESSION_GZIP_LEVEL = config('COMPRESSION_GZIP_LEVEL', default=6, cast=int)
+COMPRESSION_BROTLI_QUALITY = config('COMPRESSION_BROTLI_QUALITY', default=4, cast=int)
+
+# ─── Background Jobs ─────────────────────────────────────────────────────────
+# Jobs run inline when eager; otherwise `manage.py run_worker` picks them up
+JOBS_ALWAYS_EAGER = config('JOBS_ALWAYS_EAGER', default=False, cast=bool)
+JOBS_DEFAULT_RETRIES = config('JOBS_DEFAULT_RETRIES', default=3, cast=int)
+JOBS_RETRY_BACKOFF = config('JOBS_RETRY_BACKOFF', default=10, cast=int)  # seconds, doubled per attempt
+JOBS_RESULT_TTL = config('JOBS_RESULT_TTL', default=60 * 60 * 24, cast=int)
+
+# ─── User Import ─────────────────────────────────────────────────────────────
+# Processes hashing initial passwords in import_users (0 = one per CPU)
+USER_IMPORT_HASH_WORKERS = config('USER_IMPORT_HASH_WORKERS', default=0, cast=int)
+# Uploads larger than this (except dry runs) are imported by run_worker, not in the request
+USER_IMPORT_INLINE_MAX_BYTES = config('USER_IMPORT_INLINE_MAX_BYTES', default=2048, cast=int)
+
+# ─── Appointment Slots ───────────────────────────────────────────────────────
+SLOT_DAY_START = config('SLOT_DAY_START', default='09:00')
+SLOT_DAY_END = config('SLOT_DAY_END', default='17:00')
+SLOT_MINUTES = config('SLOT_MINUTES', default=30, cast=int)
+# A hold (POST /api/appointments/hold/ or any booking) reserves its slot this long in Redis
+SLOT_HOLD_SECONDS = config('SLOT_HOLD_SECONDS', default=120, cast=int)
+# Live holds one user may keep through POST /api/appointments/hold/
+SLOT_HOLD_MAX_PER_USER = config('SLOT_HOLD_MAX_PER_USER', default=5, cast=int)
+
+# ─── Billing ─────────────────────────────────────────────────────────────────
+# Applied to the consultation fee by generate_invoices (fractions, e.g. 0.18)
+INVOICE_TAX_RATE = config('INVOICE_TAX_RATE', default='0', cast=Decimal)
+INVOICE_DISCOUNT_RATE = config('INVOICE_DISCOUNT_RATE', default='0', cast=Decimal)
+
+# ─── Change Events ───────────────────────────────────────────────────────────
+# Server-Sent Events at /api/events/ (ASGI only); 'memory' keeps them inside one process
+EVENTS_BACKEND = config('EVENTS_BACKEND', default='redis')
+EVENTS_HEARTBEAT = config('EVENTS_HEARTBEAT', default=15, cast=int)  # seconds between keep-alive comments
+# Streams end after this long and the browser reconnects, re-checking the token
+EVENTS_STREAM_SECONDS = config('EVENTS_STREAM_SECONDS', default=300, cast=int)
+
 # ─── Auth ────────────────────────────────────────────────────────────────────
 AUTH_USER_MODEL = 'accounts.User'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'hospital.apps.accounts.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'hospital.apps.core.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'hospital.apps.core.renderers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
 }
 
+# Resolved users are cached in Redis and, briefly, in each worker's memory
+AUTH_USER_CACHE_TIMEOUT = config('AUTH_USER_CACHE_TIMEOUT', default=60 * 15, cast=int)
+AUTH_LOCAL_CACHE_TTL = config('AUTH_LOCAL_CACHE_TTL', default=30, cast=int)
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=config('ACCESS_TOKEN_LIFETIME_MINUTES', default=60, cast=int)),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=config('REFRESH_TOKEN_LIFETIME_DAYS', default=7, cast=int)),
     'ROTATE_REFRESH_TOKENS': True,
     'BLACKLIST_AFTER_ROTATION': True,
     'AUTH_HEADER_TYPES': ('Bearer',),
+    'TOKEN_OBTAIN_SERIALIZER': 'hospital.apps.accounts.serializers.LoginSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'hospital.apps.accounts.serializers.RefreshSerializer',
 }
 
+# 'redis' keeps outstanding/blacklisted refresh-token JTIs in Redis with TTLs; 'db' uses the simplejwt tables
+JWT_TOKEN_STORE = config('JWT_TOKEN_STORE', default='redis')
+
 # ─── Static Files ────────────────────────────────────────────────────────────
 
 STATIC_URL = '/static/'
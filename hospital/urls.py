@@ -2,6 +2,8 @@ from django.contrib import admin
 from django.urls import path, include
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from django.views.generic import RedirectView
+from hospital.apps.core.sse import events
+from hospital.apps.core.views import JobView, metrics_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -16,6 +18,9 @@ urlpatterns = [
     path('api/prescriptions/', include('hospital.apps.prescriptions.urls')),
     path('api/billing/', include('hospital.apps.billing.urls')),
     path('api/dashboard/', include('hospital.apps.dashboard.urls')),
+    path('api/jobs/<str:job_id>/', JobView.as_view(), name='job-detail'),
+    path('api/events/', events, name='events'),
+    path('metrics', metrics_view, name='metrics'),
     # Frontend — redirect root to login
     path('', RedirectView.as_view(url='/static/login.html')),
 ]
\ No newline at end of file